@@ -9,7 +9,9 @@ import re
 import random
 import string
 from datetime import datetime
-from difflib import SequenceMatcher
+
+from product_index import get_product_index
+from quantities import aggregate, canonical_item, format_amount, packages_needed
 
 
 class AmazonFreshService:
@@ -57,44 +59,44 @@ class AmazonFreshService:
         'mustard': {'asin': 'B001234596', 'name': 'Yellow Mustard, 14 oz', 'price': 2.49, 'category': 'Condiments'},
     }
 
+    # Bump whenever MOCK_PRODUCTS changes, so the product index is rebuilt
+    CATALOG_VERSION = 1
+
     def __init__(self, db=None, AmazonFreshProduct=None):
         self.db = db
         self.AmazonFreshProduct = AmazonFreshProduct
 
+    @property
+    def product_index(self):
+        """Token index over MOCK_PRODUCTS, built once per CATALOG_VERSION"""
+        return get_product_index(self.MOCK_PRODUCTS, ('amazon_fresh', self.CATALOG_VERSION))
+
     def match_ingredient_to_product(self, ingredient_text):
         """
         Match an ingredient to an Amazon Fresh product
 
-        Uses fuzzy matching to find the best product match
+        Whole-word keyword match through the catalog's ProductIndex, then
+        fuzzy matching to find the best product match
         """
-        ingredient_lower = ingredient_text.lower()
+        index = self.product_index
 
         # First try exact keyword match
-        for keyword, product in self.MOCK_PRODUCTS.items():
-            if keyword in ingredient_lower:
-                return {
-                    'matched': True,
-                    'confidence': 0.9,
-                    'product': product,
-                    'original_ingredient': ingredient_text
-                }
+        exact = index.exact(ingredient_text)
+        if exact:
+            return {
+                'matched': True,
+                'confidence': 0.9,
+                'product': exact[1],
+                'original_ingredient': ingredient_text
+            }
 
         # Fuzzy match if no exact match
-        best_match = None
-        best_score = 0
-
-        for keyword, product in self.MOCK_PRODUCTS.items():
-            # Check similarity
-            score = SequenceMatcher(None, ingredient_lower, keyword).ratio()
-            if score > best_score and score > 0.4:
-                best_score = score
-                best_match = product
-
-        if best_match:
+        fuzzy = index.fuzzy(ingredient_text, threshold=0.4)
+        if fuzzy:
             return {
                 'matched': True,
-                'confidence': best_score,
-                'product': best_match,
+                'confidence': fuzzy[0],
+                'product': fuzzy[2],
                 'original_ingredient': ingredient_text
             }
 
@@ -116,30 +118,59 @@ class AmazonFreshService:
         Create an Amazon Fresh Data Package from ingredients
 
         Implements: "Amazon Fresh Data Package" in process flow
-        """
-        products = []
-        total_price = 0
 
+        Lines are matched to products first (once per canonical item) and
+        merged by the product they match (quantities.aggregate), so "2 cups
+        all-purpose flour" and "1/2 cup flour, sifted" buy one bag of flour,
+        in as many packages as the total amount needs. Unmatched items merge
+        by canonical item. products[i]['ingredient_indexes'] lists the input
+        lines it covers; line_products[j] is the products index of input line j.
+        """
+        ingredient_texts = []
         for ingredient in ingredients:
             if isinstance(ingredient, str):
-                ingredient_text = ingredient
+                ingredient_texts.append(ingredient)
             else:
-                ingredient_text = ingredient.get('text', str(ingredient))
+                ingredient_texts.append(ingredient.get('text', str(ingredient)))
+
+        matches = {}
+
+        def product_key(item):
+            canonical = canonical_item(item) or item.lower()
+            match = matches.get(canonical)
+            if match is None:
+                match = matches[canonical] = self.match_ingredient_to_product(item)
+            if match['matched']:
+                return ('product', match['product']['asin'])
+            return ('item', canonical)
 
-            match = self.match_ingredient_to_product(ingredient_text)
-            product_data = {
-                'ingredient_text': ingredient_text,
+        products = []
+        line_products = [None] * len(ingredient_texts)
+        total_price = 0
+
+        for line in aggregate(ingredient_texts, key=product_key):
+            match = matches[canonical_item(line.item) or line.item.lower()]
+            # Product names end in their package size: "All-Purpose Flour, 5 lb"
+            package = match['product']['name'].rpartition(',')[2] if match['matched'] else ''
+            quantity = packages_needed(line, package) if package else 1
+            subtotal = round(match['product']['price'] * quantity, 2)
+            for index in line.indexes:
+                line_products[index] = len(products)
+            products.append({
+                'ingredient_text': '; '.join(line.texts),
+                'ingredient_indexes': line.indexes,
                 'product': match['product'],
                 'matched': match['matched'],
                 'confidence': match['confidence'],
-                'quantity': 1,
-                'subtotal': match['product']['price']
-            }
-            products.append(product_data)
-            total_price += match['product']['price']
+                'amount': f"{format_amount(line.amount)} {line.unit}".strip() if line.amount is not None else '',
+                'quantity': quantity,
+                'subtotal': subtotal
+            })
+            total_price += subtotal
 
         return {
             'products': products,
+            'line_products': line_products,
             'subtotal': round(total_price, 2),
             'tax': round(total_price * 0.08, 2),  # 8% tax
             'delivery_fee': 4.99 if total_price < 35 else 0,  # Free delivery over $35
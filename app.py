@@ -5,15 +5,19 @@ with Holistic Market widget integration and Amazon Fresh checkout
 """
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import SQLAlchemyError
 import os
 from datetime import datetime
 
 from models import (
     db, User, Recipe, Ingredient, PartnerContentProvider,
-    PCPSchema, LocalStorageCache, AmazonFreshProduct, Order, OrderItem
+    PCPSchema, LocalStorageCache, CanonicalURL, AmazonFreshProduct, Order, OrderItem
 )
 from recipe_parser import RecipeParser
-from widget_service import WidgetService, LocalStorageService, SchemaService
+from fetcher import get_fetcher
+from http_cache import HTTPCache
+from politeness import PolitenessScheduler
+from widget_service import WidgetService, LocalStorageService, SchemaService, CanonicalURLService
 from amazon_fresh_service import AmazonFreshService, FulfillmentService
 from checkout_service import CheckoutService, EmailService
 
@@ -28,7 +32,17 @@ login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 # Initialize services
-parser = RecipeParser()
+# The fetcher is shared so every route reuses the same keep-alive connection pools
+fetcher = get_fetcher()
+# Optional per-domain rate limit for on-demand parses (requests/second)
+if os.environ.get('FETCH_RATE_PER_DOMAIN'):
+    fetcher.scheduler = PolitenessScheduler(fetcher, rate=float(os.environ['FETCH_RATE_PER_DOMAIN']),
+                                            respect_robots=False)
+# Conditional-GET cache so expired LocalStorageCache entries revalidate instead of re-downloading
+http_cache = HTTPCache(os.environ.get('HTTP_CACHE_DIR', os.path.join(app.instance_path, 'http_cache')))
+parser = RecipeParser(fetcher=fetcher, http_cache=http_cache)
+# Alias -> canonical URL map shared by all requests (memoizes resolved aliases)
+canonical_urls = CanonicalURLService(db, CanonicalURL)
 amazon_fresh_service = AmazonFreshService()
 email_service = EmailService(app)
 
@@ -44,13 +58,29 @@ def get_checkout_service():
 
 
 def get_local_storage_service():
-    return LocalStorageService(db, LocalStorageCache)
+    return LocalStorageService(db, LocalStorageCache, canonical_urls=canonical_urls)
 
 
 def get_schema_service():
     return SchemaService(db, PCPSchema)
 
 
+def record_aliases(url, page):
+    """
+    Record a parse's redirect / rel=canonical aliases; a failed or alias-free parse changes nothing
+
+    Best effort: another worker recording the same alias at the same time
+    makes the insert fail, which must not fail the request.
+    """
+    if not (page.redirects or page.canonical_url):
+        return
+    try:
+        canonical_urls.record(url, page.final_url, page.redirects, page.canonical_url)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Warning: Could not record canonical URL for {url}: {e}")
+
+
 # ============================================================================
 # Authentication Routes
 # ============================================================================
@@ -150,7 +180,10 @@ def parse_recipe():
                 title = cached['recipe_data'].get('title', 'Cached Recipe')
             else:
                 # Parse the recipe using web scraper
-                ingredients = parser.get_ingredients(url)
+                page = parser.parse(url)
+                ingredients = page.ingredients
+                # Redirects and rel=canonical make this URL an alias of the canonical page
+                record_aliases(url, page)
 
                 if not ingredients:
                     flash('Could not extract ingredients from this URL.', 'warning')
@@ -180,10 +213,13 @@ def parse_recipe():
             db.session.add(recipe)
             db.session.flush()
 
-            for ing_text in ingredients:
+            for ing_text, details in zip(ingredients, parser.parse_ingredient_batch(ingredients)):
                 ingredient = Ingredient(
                     recipe_id=recipe.id,
                     text=ing_text,
+                    quantity=details.quantity[:50] or None,
+                    unit=details.unit[:50] or None,
+                    item=details.item[:200] or None,
                     in_cart=True
                 )
                 db.session.add(ingredient)
@@ -416,8 +452,10 @@ def widget_get_ingredients():
         schema_service = get_schema_service()
         schema = schema_service.get_schema_for_url(pcp.id, recipe_url)
 
-        # Use parser with schema if available
-        ingredients = parser.get_ingredients(recipe_url)
+        # The PCP's css/xpath/json-ld schema is tried before the generic strategies
+        page = parser.parse(recipe_url, schema=schema)
+        ingredients = page.ingredients
+        record_aliases(recipe_url, page)
 
         # Cache the data
         local_storage.cache_recipe_data(recipe_url, {
@@ -533,6 +571,15 @@ def get_amazon_fresh_products():
     return jsonify(amazon_data)
 
 
+@app.route('/api/fetcher/stats')
+@login_required
+def fetcher_stats():
+    """Connection pool and HTTP cache statistics for the shared recipe fetcher"""
+    stats = fetcher.pool_stats()
+    stats['http_cache'] = dict(http_cache.stats)
+    return jsonify(stats)
+
+
 # ============================================================================
 # CLI Commands
 # ============================================================================
@@ -548,13 +595,23 @@ def init_db():
 def download_nltk_data():
     """Download required NLTK data"""
     import nltk
-    nltk.download('punkt')
-    nltk.download('averaged_perceptron_tagger')
+    from nlp import PACKAGES
+    for packages in PACKAGES.values():
+        for package in packages:
+            nltk.download(package)
     nltk.download('maxent_ne_chunker')
     nltk.download('words')
     print('NLTK data downloaded!')
 
 
+@app.cli.command()
+def build_lexicons():
+    """Compile the word lists into the binary lexicon artifact"""
+    import build_lexicons as builder
+    stats = builder.build()
+    print(f"Lexicon artifact built: {stats}")
+
+
 # ============================================================================
 # Main
 # ============================================================================
@@ -0,0 +1,569 @@
+"""
+Benchmarks
+Timing harness for the fetch, parse and matching layers
+
+Usage:
+    python benchmarks.py            # run every benchmark
+    python benchmarks.py resolver   # run selected benchmarks by name
+
+Parsing benchmarks run over the pages in LANES_ARCHIVE_DIR (an HTMLArchive
+written by `crawler.py --archive`, e.g. of urls.csv) when it is set, and over
+synthetic recipe-blog pages otherwise. BENCH_PAGES caps the page count.
+"""
+import os
+import sys
+import time
+import json
+from collections import OrderedDict
+
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(func):
+    """Register a benchmark under its function name"""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def time_per_call(func, number=1000, repeat=5):
+    """Best-of-repeat seconds per call of func()"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def report(name, seconds, unit='us'):
+    scale = {'s': 1, 'ms': 1e3, 'us': 1e6}[unit]
+    print(f"  {name:<45} {seconds * scale:>12.2f} {unit}")
+
+
+def cold_start(code, repeat=3):
+    """
+    Best-of-repeat wall time of a fresh interpreter running code
+
+    Returns:
+        (seconds, modules) where modules is the set of nltk/streamlit/bs4/lxml
+        top-level modules the code left imported
+    """
+    import subprocess
+    probe = (code + "\nimport sys\n"
+             "print(','.join(sorted({m.split('.')[0] for m in sys.modules} & {'nltk', 'bs4', 'lxml', 'pip'})))")
+    best, modules = float('inf'), set()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        best = min(best, time.perf_counter() - started)
+        lines = result.stdout.strip().splitlines()
+        modules = set(lines[-1].split(',')) - {''} if lines else set()
+    return best, modules
+
+
+def synthetic_recipe_page(comments=400, seed=0):
+    """A recipe-blog-like page: nav, JSON-LD, nested layout, ingredient list, long comment thread"""
+    ingredients = ['2 cups all-purpose flour', '1 teaspoon baking soda', '1/2 teaspoon salt',
+                   '1 cup butter, softened', '3/4 cup brown sugar', '2 large eggs',
+                   '2 teaspoons vanilla extract', '2 cups chocolate chips']
+    recipe = {'@context': 'https://schema.org', '@graph': [
+        {'@type': 'WebPage', 'name': f'Cookies {seed}'},
+        {'@type': 'Recipe', 'name': f'Cookies {seed}', 'image': [f'https://example.com/{seed}.jpg'],
+         'recipeIngredient': ingredients}
+    ]}
+    nav = ''.join(f'<li class="menu-item"><a href="/c/{i}">Category {i}</a></li>' for i in range(40))
+    items = ''.join(f'<li class="wprm-recipe-ingredient">{text}</li>' for text in ingredients)
+    thread = ''.join(
+        f'<div class="comment"><div class="comment-body"><div class="author">Reader {i}</div>'
+        f'<p>Made these with extra butter and sugar, my family loved them! {i}</p></div></div>'
+        for i in range(comments))
+    return (f'<!DOCTYPE html><html><head><title>Cookies {seed}</title>'
+            f'<link rel="canonical" href="https://example.com/cookies-{seed}">'
+            f'<script type="application/ld+json">{json.dumps(recipe)}</script></head>'
+            f'<body><header><nav><ul>{nav}</ul></nav></header>'
+            f'<div class="wrap"><div class="content"><article><h1>Cookies {seed}</h1>'
+            f'<div class="wprm-recipe-container"><div class="wprm-recipe-ingredients-container">'
+            f'<ul class="wprm-recipe-ingredients">{items}</ul></div></div>'
+            f'<section class="comments">{thread}</section></article></div></div>'
+            f'<footer><p>Copyright</p></footer></body></html>').encode('utf-8')
+
+
+def corpus_pages(default_count=20):
+    """Benchmark pages: the LANES_ARCHIVE_DIR archive if set, else synthetic pages"""
+    limit = int(os.environ.get('BENCH_PAGES', 0)) or None
+    archive_dir = os.environ.get('LANES_ARCHIVE_DIR')
+    if archive_dir:
+        from html_archive import HTMLArchive
+        archive = HTMLArchive(archive_dir)
+        pages = [archive.get(url).content for url in archive.urls()[:limit]]
+        archive.close()
+        print(f"  {len(pages)} archived pages from {archive_dir}")
+        return pages
+    pages = [synthetic_recipe_page(seed=i) for i in range(limit or default_count)]
+    print(f"  {len(pages)} synthetic pages ({sum(map(len, pages)) // len(pages) // 1024} KB each)")
+    return pages
+
+
+@benchmark
+def resolver():
+    """Latency the SSRF guard adds per fetch: cached lookup vs fresh DNS"""
+    from resolver import HostResolver, UnsafeURLError
+
+    url = 'https://www.allrecipes.com/recipe/12345/sample-recipe/'
+
+    def legacy_prefix_check():
+        hostname = 'www.allrecipes.com'
+        hostname in ('localhost', '127.0.0.1', '::1')
+        hostname.startswith(('10.', '172.16.', '192.168.'))
+
+    report('legacy string-prefix check', time_per_call(legacy_prefix_check, 100000))
+
+    resolver = HostResolver()
+    try:
+        started = time.perf_counter()
+        resolver.check_url(url)
+        report('first lookup (DNS + validation)', time.perf_counter() - started, 'ms')
+    except UnsafeURLError as e:
+        print(f"  DNS unavailable ({e}), using a stub answer")
+        resolver = HostResolver(getaddrinfo=lambda host, port, proto=0: [(2, 1, 6, '', ('93.184.216.34', 0))])
+        resolver.check_url(url)
+
+    report('cached check_url (parse + cache hit)', time_per_call(lambda: resolver.check_url(url), 100000))
+    report('cached resolve (connection pinning)', time_per_call(lambda: resolver.resolve('www.allrecipes.com'), 100000))
+
+
+@benchmark
+def parse_backends():
+    """Tree construction and full extraction per page: html.parser vs lxml"""
+    from html_backends import make_soup, LXML_AVAILABLE
+    from recipe_parser import RecipeParser
+
+    if not LXML_AVAILABLE:
+        print("  lxml is not installed")
+        return
+
+    pages = corpus_pages()
+    parser = RecipeParser()
+    results = {}
+    for backend in ('html.parser', 'lxml'):
+        started = time.perf_counter()
+        for page in pages:
+            make_soup(page, backend)
+        report(f'{backend}: build tree', (time.perf_counter() - started) / len(pages), 'ms')
+
+        started = time.perf_counter()
+        results[backend] = [parser._extract_from_soup(make_soup(page, backend)) for page in pages]
+        report(f'{backend}: build tree + extract', (time.perf_counter() - started) / len(pages), 'ms')
+
+    agree = sum(a == b for a, b in zip(results['html.parser'], results['lxml']))
+    print(f"  identical results on {agree}/{len(pages)} pages")
+
+
+@benchmark
+def jsonld_fast_path():
+    """Recipe JSON-LD extraction: raw-bytes fast path vs soup + script tags"""
+    from html_backends import make_soup
+    from jsonld import extract_recipe, iter_recipe_nodes, ORJSON_AVAILABLE
+
+    def soup_json_ld(page):
+        # The pre-fast-path strategy: full tree, then json.loads per script tag
+        for script in make_soup(page).find_all('script', type='application/ld+json'):
+            try:
+                for node in iter_recipe_nodes(json.loads(script.string)):
+                    if node.get('recipeIngredient'):
+                        return node['recipeIngredient']
+            except (ValueError, TypeError):
+                continue
+        return None
+
+    pages = corpus_pages()
+    print(f"  orjson {'installed' if ORJSON_AVAILABLE else 'not installed, using json'}")
+
+    started = time.perf_counter()
+    slow = [soup_json_ld(page) for page in pages]
+    report('soup + script tags', (time.perf_counter() - started) / len(pages), 'ms')
+
+    started = time.perf_counter()
+    fast = [extract_recipe(page) for page in pages]
+    report('raw-bytes fast path', (time.perf_counter() - started) / len(pages), 'ms')
+
+    found = sum(1 for recipe in fast if recipe)
+    agree = sum(1 for a, b in zip(slow, fast) if (b.ingredients if b else None) == a)
+    print(f"  recipe found on {found}/{len(pages)} pages, same ingredients on {agree}")
+
+
+@benchmark
+def selector_engine():
+    """Ingredient selector cascade: one soup.select per selector vs one SelectorSet pass"""
+    from html_backends import make_soup
+    from recipe_parser import RecipeParser
+    from selector_engine import SelectorSet
+
+    # The parser's cascade plus plugin selectors like the Streamlit extractor's
+    selectors = RecipeParser.SEMANTIC_SELECTORS.selectors + [
+        '.wprm-recipe-ingredient', '.wprm-recipe-ingredients li', '.tasty-recipes-ingredients li',
+        '.recipe-card-ingredients li', '.mv-create-ingredients li', '.zlrecipe-ingredient',
+        '.ERSIngredients li', '.schema-recipe-ingredients li', '.jetpack-recipe-ingredients li',
+        '.ingredients-list li', '.recipe__ingredients li', '.ingredient-item', '.ingredientsList li',
+        '[data-ingredient]', '[class*="ingredient"] li',
+    ]
+    selector_set = SelectorSet(selectors)
+
+    for comments in (100, 2000):
+        soup = make_soup(synthetic_recipe_page(comments=comments))
+        size = len(soup.find_all(True))
+        assert selector_set.select(soup) == [soup.select(s) for s in selectors]
+        report(f'{size} elements: {len(selectors)} x soup.select',
+               time_per_call(lambda: [soup.select(s) for s in selectors], 3, 3), 'ms')
+        report(f'{size} elements: SelectorSet.select', time_per_call(lambda: selector_set.select(soup), 3, 3), 'ms')
+
+
+@benchmark
+def food_density():
+    """Food-density strategy on deeply nested layouts: top-down get_text vs bottom-up counts"""
+    from html_backends import make_soup
+    from recipe_parser import RecipeParser
+    from test_parser import legacy_food_density  # the original implementation
+
+    parser = RecipeParser()
+    for depth in (10, 50, 200):
+        page = ('<html><body>' + '<div class="wrap"><p>Jump to recipe, print, pin it, share.</p>' * depth +
+                '<ul>' + '<li>1 cup flour and sugar</li>' * 10 + '</ul>' + '</div>' * depth + '</body></html>')
+        soups = [make_soup(page) for _ in range(3)]
+        started = time.perf_counter()
+        expected = [legacy_food_density(parser, soup) for soup in soups]
+        report(f'depth {depth}: top-down get_text', (time.perf_counter() - started) / 3, 'ms')
+
+        soups = [make_soup(page) for _ in range(3)]
+        started = time.perf_counter()
+        actual = [parser._extract_by_food_density(soup) for soup in soups]
+        report(f'depth {depth}: bottom-up', (time.perf_counter() - started) / 3, 'ms')
+        assert actual == expected
+
+
+@benchmark
+def lexicon():
+    """Food-word membership per token: list scan + regex clean vs compiled Lexicon"""
+    import re
+    from lexicon import load_csv_words, load_lexicon
+
+    words = list(load_csv_words('food_words_.csv'))
+    food_words = load_lexicon('food_words_.csv')
+    tokens = ('2 cups (all-purpose) flour, sifted; 1 tsp baking soda and a pinch of salt '
+              'for the butter cream frosting').split()
+
+    def legacy():
+        return sum(1 for token in tokens if re.sub(r'[<>\[\]()@#$%^&*;:?"]', '', token.lower().strip()) in words)
+
+    assert legacy() == food_words.count(tokens)
+    report(f'{len(tokens)} tokens, list of {len(words)} words', time_per_call(legacy, number=20))
+    report(f'{len(tokens)} tokens, Lexicon.count', time_per_call(lambda: food_words.count(tokens)))
+
+
+@benchmark
+def collocations():
+    """Collocation scoring per ingredient line: n-gram string lookups vs Aho-Corasick"""
+    from collocations import load_phrase_matcher, tokenize
+
+    matcher = load_phrase_matcher()
+    phrases = set(matcher.phrases)
+    longest = max(len(phrase.split()) for phrase in phrases)
+    lines = ['2 cups andouille sausage, sliced', '1 anise pod fennel seeds, crushed',
+             'a pinch of black pepper', '1 bag baby spinach leaves, washed and dried'] * 5
+
+    def ngrams():
+        count = 0
+        for line in lines:
+            tokens = tokenize(line)
+            for n in range(2, longest + 1):
+                count += sum(1 for i in range(len(tokens) - n + 1) if ' '.join(tokens[i:i + n]) in phrases)
+        return count
+
+    assert ngrams() == sum(matcher.count(line, min_words=2) for line in lines)
+    report(f'{len(lines)} lines, 2..{longest}-gram lookups', time_per_call(ngrams))
+    report(f'{len(lines)} lines, automaton', time_per_call(lambda: [matcher.count(line, min_words=2) for line in lines]))
+
+
+@benchmark
+def lexicon_startup():
+    """Word lists + collocation automaton: compile from CSV vs load the binary artifact"""
+    import os
+    import tempfile
+    import build_lexicons
+    from lexicon import load_artifact
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicons.bin')
+        build_lexicons.build(path)
+        report('compile from CSV', time_per_call(build_lexicons.compile_artifact, number=3), 'ms')
+        report('load artifact', time_per_call(lambda: load_artifact.__wrapped__(path), number=10), 'ms')
+
+
+@benchmark
+def startup():
+    """Cold start of a fresh interpreter: import app, and a bare run of streamlit_app.py"""
+    for name, code in (
+        ('python (baseline)', 'pass'),
+        ('import recipe_parser', 'import recipe_parser; recipe_parser.RecipeParser()'),
+        ('import app', 'import app'),
+        ('streamlit_app.py (bare mode)', "import runpy; runpy.run_path('streamlit_app.py')"),
+    ):
+        seconds, modules = cold_start(code)
+        report(f"{name} [{', '.join(sorted(modules)) or '-'}]", seconds, 'ms')
+
+    # A Streamlit rerun re-executes the script; st.cache_resource keeps the parser and lexicons
+    import runpy
+    import logging
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
+    runpy.run_path(script)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('streamlit'):
+            logging.getLogger(name).setLevel(logging.CRITICAL)
+    report('streamlit_app.py rerun (cached resources)', time_per_call(lambda: runpy.run_path(script), number=3, repeat=3), 'ms')
+
+
+@benchmark
+def extraction_pipeline():
+    """Per-strategy timings of the single-fetch pipeline, with and without JSON-LD"""
+    import re
+    from collections import Counter, defaultdict
+    from extraction_pipeline import ExtractionPipeline
+    from recipe_parser import RecipeParser
+
+    pages = corpus_pages()
+    pipeline = ExtractionPipeline(parser=RecipeParser())
+    without_json_ld = [re.sub(rb'<script[^>]*ld\+json.*?</script>', b'', page, flags=re.S | re.I) for page in pages]
+    for label, variant in (('as served', pages), ('JSON-LD removed', without_json_ld)):
+        totals, winners = defaultdict(float), Counter()
+        for page in variant:
+            result = pipeline.run(page)
+            winners[result.strategy] += 1
+            for name, seconds in result.timings.items():
+                totals[name] += seconds
+        print(f"  {label}: won by {dict(winners)}")
+        for name, seconds in totals.items():
+            report(f'{label}: {name}', seconds / len(variant), 'ms')
+
+
+@benchmark
+def ingredient_parser():
+    """Structured ingredient parsing: agreement with qu_w_set.csv labels and lines per second"""
+    from lexicon import read_csv_words
+    from ingredient_parser import IngredientParseEngine, labelled_lines, parse_ingredient
+
+    labelled = labelled_lines()
+    parsed = IngredientParseEngine().parse_many(line for line, _, _ in labelled)
+    quantity_hits = sum(result.quantity == quantity for result, (_, quantity, _) in zip(parsed, labelled))
+    with_unit = [(result, unit) for result, (_, _, unit) in zip(parsed, labelled) if unit is not None]
+    unit_hits = sum(result.unit.lower() == unit.lower() for result, unit in with_unit)
+    print(f"  quantity agreement {quantity_hits}/{len(labelled)} ({quantity_hits / len(labelled):.1%}), "
+          f"unit agreement {unit_hits}/{len(with_unit)} ({unit_hits / len(with_unit):.1%})")
+
+    # tag_patterns.csv: ~2750 raw ingredient lines under an 'ing' header
+    lines = list(read_csv_words('tag_patterns.csv')[1:])
+    seconds = time_per_call(lambda: [parse_ingredient(line) for line in lines], number=3)
+    report(f'{len(lines)} lines, parse_ingredient', seconds, 'ms')
+    print(f"  {len(lines) / seconds:,.0f} lines/s")
+    seconds = time_per_call(lambda: IngredientParseEngine().parse_many(lines * 4), number=3)
+    report(f'{len(lines) * 4} lines (each 4x), parse_many', seconds, 'ms')
+    print(f"  {len(lines) * 4 / seconds:,.0f} lines/s")
+
+
+@benchmark
+def pos_patterns():
+    """coded_patterns.csv classification: list scan vs tag-trie automaton, and lines tagged for repeated input"""
+    from lexicon import read_csv_words
+    from pos_patterns import PatternScorer, TagPatternAutomaton, load_tag_patterns
+    from pos_tagger import TaggingService
+
+    patterns = load_tag_patterns()
+    automaton = TagPatternAutomaton(patterns)
+    pattern_list = [list(pattern) for pattern in patterns]
+    sequences = [list(pattern) for pattern in patterns[::7]] + [['CD', 'NNS', 'DT', 'NN', 'VBD'] * 3] * 20
+
+    def list_scan():
+        return [any(sequence == pattern for pattern in pattern_list) for sequence in sequences]
+
+    assert list_scan() == [automaton.match(sequence) for sequence in sequences]
+    report(f'{len(sequences)} sequences, {len(patterns)} patterns, list scan', time_per_call(list_scan, number=50))
+    report(f'{len(sequences)} sequences, automaton',
+           time_per_call(lambda: [automaton.match(sequence) for sequence in sequences]))
+
+    # Recipes repeat lines; the memo tags each normalized line once
+    lines = list(read_csv_words('tag_patterns.csv')[1:]) * 3
+    try:
+        scorer = PatternScorer(automaton, TaggingService())
+        started = time.perf_counter()
+        matched = sum(scorer.is_ingredient(line) for line in lines)
+        report(f"{len(lines)} lines, {scorer.service.stats['tagged']} tagged, {matched} matched",
+               time.perf_counter() - started, 'ms')
+    except LookupError as e:
+        print(f"  tagging skipped: {e}")
+
+
+@benchmark
+def pos_tagging():
+    """Tagging tag_patterns.csv lines: one pos_tag call per line vs TaggingService batches"""
+    import nlp
+    from lexicon import read_csv_words
+    from pos_tagger import TaggingService, normalize_line
+
+    # Recipes share lines: the corpus three times over, in batches of one recipe's worth
+    lines = list(read_csv_words('tag_patterns.csv')[1:]) * 3
+    batches = [lines[i:i + 15] for i in range(0, len(lines), 15)]
+
+    def stub_tagger(sentences):
+        return [[(token, 'NN') for token in tokens] for tokens in sentences]
+
+    service = TaggingService(stub_tagger)
+    seconds = time_per_call(lambda: [service.tag_many(batch) for batch in batches], number=1, repeat=1)
+    report(f'{len(lines)} lines, service overhead (stub tagger, cold)', seconds, 'ms')
+    seconds = time_per_call(lambda: [service.tag_many(batch) for batch in batches], number=3)
+    report(f'{len(lines)} lines, service overhead (warm)', seconds, 'ms')
+
+    try:
+        started = time.perf_counter()
+        for line in lines:
+            nlp.pos_tag(normalize_line(line).split())
+        per_line = time.perf_counter() - started
+        service = TaggingService()
+        started = time.perf_counter()
+        for batch in batches:
+            service.tag_many(batch)
+        batched = time.perf_counter() - started
+    except LookupError as e:
+        print(f"  tagger skipped: {e}")
+        return
+    report(f'{len(lines)} lines, pos_tag per line', per_line, 'ms')
+    report(f"{len(lines)} lines, TaggingService ({service.stats['tagged']} tagged)", batched, 'ms')
+    print(f"  {len(lines) / per_line:,.0f} vs {len(lines) / batched:,.0f} lines/s")
+
+
+@benchmark
+def cart_aggregation():
+    """Large carts: aggregate lines by item, then match and price each item once"""
+    from lexicon import read_csv_words
+    from quantities import aggregate
+    from amazon_fresh_service import AmazonFreshService
+
+    service = AmazonFreshService()
+    lines = list(read_csv_words('tag_patterns.csv')[1:])
+    for size in (100, 1000, len(lines)):
+        cart = lines[:size]
+        merged = aggregate(cart)
+        report(f'{size} lines -> {len(merged)} items, aggregate', time_per_call(lambda: aggregate(cart), number=3), 'ms')
+        report(f'{size} lines, data package', time_per_call(
+            lambda: service.get_amazon_fresh_data_package(cart), number=1, repeat=3), 'ms')
+
+
+@benchmark
+def spacing():
+    """clean_ingredient_text over patterns.csv: ~70 re.sub passes per line vs one compiled pass"""
+    import re
+    from ingredient_parser import SPACING_UNITS, normalize_spacing
+
+    def legacy(text):
+        text = re.sub(r'([½¼¾⅓⅔⅛⅜⅝⅞])([a-zA-Z])', r'\1 \2', text)
+        text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
+        for m in SPACING_UNITS:
+            text = re.sub(rf'(\d)({m})\b', rf'\1 {m}', text, flags=re.IGNORECASE)
+            text = re.sub(rf'\b({m})([a-zA-Z])', rf'\1 \2', text, flags=re.IGNORECASE)
+        text = re.sub(r'\s+', ' ', text)
+        return text.strip()
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.csv')
+    with open(path, encoding='cp1252', errors='replace') as f:
+        spaced = [' '.join(line.split()) for line in f]
+    # Glued variants with a known tokenization: the spaced line. Gluing the amount
+    # ('2cups flour') is never ambiguous; gluing the unit too ('2cupsflour') can be
+    # ('2cupsmashed' is 'cups mashed' or 'cup smashed'), so it only has to be mostly right
+    units = re.compile(r'(\d) (' + '|'.join(sorted(SPACING_UNITS, key=len, reverse=True)) + r') (?=[a-zA-Z])',
+                       re.IGNORECASE)
+    amount_glued = [(re.sub(r'(\d) (?=[a-zA-Z])', r'\1', line, count=1), line) for line in spaced]
+    unit_glued = [(units.sub(r'\1\2', line, count=1), line) for line in spaced]
+    unit_glued = [(glued, line) for glued, line in unit_glued if glued != line]
+    lines = spaced + [glued for glued, _ in amount_glued]
+
+    assert all(normalize_spacing(glued) == line for glued, line in amount_glued)
+    misses = [glued for glued, line in unit_glued if normalize_spacing(glued) != line]
+    assert len(misses) <= len(unit_glued) // 100, misses
+    print(f"  {len(amount_glued)} amount-glued lines split as written; {len(unit_glued) - len(misses)}/"
+          f"{len(unit_glued)} unit-glued ({', '.join(repr(normalize_spacing(glued)) for glued in misses[:2])} missed)")
+
+    old = [legacy(line) for line in lines]
+    new = [normalize_spacing(line) for line in lines]
+    identical = sum(before == after for before, after in zip(old, new))
+    # The legacy loop also split units from their own endings ('2 cup s flour', 'head less')
+    print(f"  {identical}/{len(lines)} lines identical to the legacy loop")
+    report(f'{len(lines)} lines, legacy re.sub loop', time_per_call(lambda: [legacy(line) for line in lines],
+                                                                     number=1, repeat=3), 'ms')
+    report(f'{len(lines)} lines, normalize_spacing', time_per_call(
+        lambda: [normalize_spacing(line) for line in lines], number=3), 'ms')
+
+
+@benchmark
+def product_matching():
+    """Ingredient -> product matching: substring + SequenceMatcher scan vs ProductIndex, by catalog size"""
+    import itertools
+    from difflib import SequenceMatcher
+    from lexicon import load_csv_words, read_csv_words
+    from product_index import ProductIndex
+    from amazon_fresh_service import AmazonFreshService
+
+    def legacy(catalog, ingredient_text):
+        ingredient_lower = ingredient_text.lower()
+        for keyword in catalog:
+            if keyword in ingredient_lower:
+                return keyword
+        best_match, best_score = None, 0
+        for keyword in catalog:
+            score = SequenceMatcher(None, ingredient_lower, keyword).ratio()
+            if score > best_score and score > 0.4:
+                best_score, best_match = score, keyword
+        return best_match
+
+    def indexed(index, ingredient_text):
+        match = index.exact(ingredient_text) or index.fuzzy(ingredient_text)
+        return match[-2] if match else None
+
+    lines = list(read_csv_words('tag_patterns.csv')[1:])
+    mock = AmazonFreshService.MOCK_PRODUCTS
+    index = ProductIndex(mock)
+    agree = sum(legacy(mock, line) == indexed(index, line) for line in lines)
+    print(f"  MOCK_PRODUCTS: {agree}/{len(lines)} lines match the same keyword "
+          f"(the rest: phrase priority, plurals, no matches inside words)")
+
+    # Synthetic catalogs of food-word pairs ("almonds bag", ...) after the mock products
+    words = sorted({word for word in load_csv_words('food_words_.csv') if word.isalpha()})
+    pairs = (f'{first} {second}' for first, second in itertools.permutations(words, 2))
+    sample = lines[::50]
+    for size in (1000, 20000):
+        catalog = dict(mock)
+        catalog.update((keyword, {'name': keyword}) for keyword in itertools.islice(pairs, size - len(catalog)))
+        started = time.perf_counter()
+        index = ProductIndex(catalog)
+        report(f'{len(catalog)} products, build index', time.perf_counter() - started, 'ms')
+        report(f'{len(catalog)} products, legacy scan per line', time_per_call(
+            lambda: [legacy(catalog, line) for line in sample], number=1, repeat=1) / len(sample), 'ms')
+        report(f'{len(catalog)} products, ProductIndex per line', time_per_call(
+            lambda: [indexed(index, line) for line in sample], number=1, repeat=3) / len(sample), 'ms')
+        report(f'{len(catalog)} products, ProductIndex exact stage per line', time_per_call(
+            lambda: [index.exact(line) for line in sample], number=3) / len(sample), 'ms')
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            return 1
+        print(f"\n{name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
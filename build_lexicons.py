@@ -0,0 +1,95 @@
+"""
+Build Lexicons Module
+Compiles the word lists into the binary lexicon artifact
+
+Every gunicorn worker and every Streamlit rerun used to re-read and
+re-normalize the word-list CSVs and rebuild the collocation automaton. This
+build step does it once and writes the results, with the sha256 of each
+source CSV, to one pickle (lexicon.ARTIFACT_PATH). lexicon.load_artifact()
+picks it up automatically and falls back to the CSVs when it is stale.
+
+Usage:
+    python build_lexicons.py [--output lexicons.bin]
+    flask build-lexicons
+"""
+import os
+import time
+import pickle
+import argparse
+
+from lexicon import ARTIFACT_PATH, ARTIFACT_VERSION, Lexicon, read_csv_words, source_checksum
+from collocations import COLLOCATION_FILES, PhraseMatcher
+
+
+# Raw word tuples served by load_csv_words()
+CSV_WORDS = ('food_words_.csv', 'coll_words_.csv', 'lookup_words.csv')
+
+# (filename, normalizer) pairs served by load_lexicon()
+LEXICONS = (('food_words_.csv', 'clean'), ('coll_words_.csv', 'clean'))
+
+# Filename tuples served by load_phrase_matcher()
+PHRASE_MATCHERS = (COLLOCATION_FILES,)
+
+
+def compile_artifact():
+    """
+    Compile every lexicon and automaton from the source CSVs
+
+    Returns:
+        The artifact dict lexicon.load_artifact() expects
+    """
+    filenames = set(CSV_WORDS) | {filename for filename, _ in LEXICONS}
+    for group in PHRASE_MATCHERS:
+        filenames.update(group)
+    csv_words = {filename: read_csv_words(filename) for filename in sorted(filenames)}
+
+    return {
+        'version': ARTIFACT_VERSION,
+        'sources': {filename: source_checksum(filename) for filename in csv_words},
+        'csv_words': {filename: csv_words[filename] for filename in CSV_WORDS},
+        'lexicons': {
+            (filename, normalizer): Lexicon(csv_words[filename], normalizer)
+            for filename, normalizer in LEXICONS
+        },
+        'phrase_matchers': {
+            group: PhraseMatcher(word for filename in group for word in csv_words[filename])
+            for group in PHRASE_MATCHERS
+        }
+    }
+
+
+def build(path=ARTIFACT_PATH):
+    """
+    Compile the artifact and write it atomically
+
+    Args:
+        path: Output file, defaults to lexicon.ARTIFACT_PATH
+
+    Returns:
+        Dictionary with the path, size in bytes and build seconds
+    """
+    started = time.perf_counter()
+    artifact = compile_artifact()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return {
+        'path': path,
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Compile the word lists into the binary lexicon artifact')
+    arg_parser.add_argument('--output', default=ARTIFACT_PATH, help='Artifact file (default %(default)s)')
+    args = arg_parser.parse_args(argv)
+
+    stats = build(args.output)
+    print(f"Lexicon artifact built: {stats}")
+    return stats
+
+
+if __name__ == '__main__':
+    main()
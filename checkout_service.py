@@ -70,13 +70,13 @@ class CheckoutService:
         self.db.session.add(order)
         self.db.session.flush()  # Get order.id
 
-        # Create order items
-        for i, product_data in enumerate(amazon_data['products']):
-            item = cart_items[i] if i < len(cart_items) else None
+        # Create order items: one per product, which may cover several merged cart lines
+        for product_data in amazon_data['products']:
+            item = cart_items[product_data['ingredient_indexes'][0]]
             order_item = self.OrderItem(
                 order_id=order.id,
-                ingredient_id=item.id if hasattr(item, 'id') else None,
-                ingredient_text=product_data['ingredient_text'],
+                ingredient_id=item.id if hasattr(item, 'id') else item.get('id'),
+                ingredient_text=product_data['ingredient_text'][:500],
                 product_name=product_data['product']['name'],
                 quantity=product_data['quantity'],
                 price=product_data['subtotal']
@@ -0,0 +1,152 @@
+"""
+Collocations Module
+Aho-Corasick matcher for multi-word food phrases
+
+coll_words_.csv and lookup_words.csv hold ingredient phrases of any length
+("andouille sausage", "anise pod fennel seeds", "a pinch of black pepper").
+Checking them by building every adjacent word pair (or triple, or 4-gram)
+and looking it up costs one string per n-gram size per position. A
+PhraseMatcher compiles the phrases into a word-level Aho-Corasick automaton
+once, then reports every phrase occurrence in a text in a single left to
+right pass over its words, whatever the phrase lengths.
+
+Text and phrases go through the same tokenizer: lowercased runs of letters
+and digits, so punctuation and hyphens never break a match.
+"""
+import re
+from collections import deque, namedtuple
+from functools import lru_cache
+
+from lexicon import load_artifact, load_csv_words
+
+
+# Phrase lists the recipe extractors score collocations against
+COLLOCATION_FILES = ('coll_words_.csv', 'lookup_words.csv')
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+PhraseMatch = namedtuple('PhraseMatch', ['start', 'end', 'phrase'])
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens (letters and digits only)"""
+    return _TOKEN.findall(text.lower())
+
+
+class PhraseMatcher:
+    """
+    Word-level Aho-Corasick automaton over a list of phrases
+
+    States are trie nodes; each has a dict of word transitions, a failure
+    link to the longest proper suffix that is also a trie path, and the
+    lengths of every phrase ending there (its own plus its suffixes').
+    """
+
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases: Iterable of phrases (strings); duplicates and phrases
+                with no word characters are dropped
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        unique = []
+        seen = set()
+        for phrase in phrases:
+            words = tuple(tokenize(phrase))
+            if words and words not in seen:
+                seen.add(words)
+                unique.append(words)
+        self.phrases = tuple(' '.join(words) for words in unique)
+
+        for words in unique:
+            state = 0
+            for word in words:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = (len(words),)
+
+        # Breadth-first, so a state's failure target is final before its children
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _ends(self, tokens, min_words):
+        """Yield (end offset, phrase length) for every occurrence"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, token in enumerate(tokens, 1):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length in out[state]:
+                if length >= min_words:
+                    yield position, length
+
+    def finditer(self, text, min_words=1):
+        """
+        Yield every phrase occurrence, overlapping ones included
+
+        Args:
+            text: String, or a list of tokens from tokenize()
+            min_words: Ignore phrases shorter than this many words
+
+        Yields:
+            PhraseMatch(start, end, phrase) with token offsets [start, end),
+            ordered by end offset, longest phrase first
+        """
+        tokens = tokenize(text) if isinstance(text, str) else text
+        for end, length in self._ends(tokens, min_words):
+            yield PhraseMatch(end - length, end, ' '.join(tokens[end - length:end]))
+
+    def find_all(self, text, min_words=1):
+        """Get every phrase occurrence as a list (see finditer)"""
+        return list(self.finditer(text, min_words))
+
+    def count(self, text, min_words=1):
+        """Count phrase occurrences"""
+        tokens = tokenize(text) if isinstance(text, str) else text
+        return sum(1 for _ in self._ends(tokens, min_words))
+
+    def any(self, text, min_words=1):
+        """Check if at least one phrase occurs"""
+        tokens = tokenize(text) if isinstance(text, str) else text
+        for _ in self._ends(tokens, min_words):
+            return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def load_phrase_matcher(filenames=COLLOCATION_FILES):
+    """
+    Get the shared PhraseMatcher over one or more phrase-list CSVs
+
+    Args:
+        filenames: Tuple of CSV file names next to this module
+    """
+    artifact = load_artifact()
+    if artifact and filenames in artifact['phrase_matchers']:
+        return artifact['phrase_matchers'][filenames]
+
+    phrases = []
+    for filename in filenames:
+        phrases.extend(load_csv_words(filename))
+    return PhraseMatcher(phrases)
@@ -0,0 +1,325 @@
+"""
+Bulk Crawler Module
+asyncio-based re-parse of the recipe URL corpus (urls.csv)
+
+Replaces the serial requests loop from Parser v.3.0 for cache warming and
+corpus refreshes. Pages are fetched with high global concurrency through the
+pooled RecipeFetcher while each domain is capped to a few in-flight requests.
+Every page is run through RecipeParser's extraction strategies and the result
+is appended to a JSON Lines file as soon as it is ready, so a run can be
+interrupted and resumed. A PolitenessScheduler orders URLs round-robin across
+domains, honours robots.txt and rate-limits each host with a token bucket.
+
+With --archive every fetched page is kept in an HTMLArchive; --replay then
+re-runs extraction over the archived pages on all CPU cores without touching
+the network, which is how parser changes are evaluated against the corpus.
+
+Usage:
+    python crawler.py --urls urls.csv --output crawl_results.jsonl --archive html_archive
+    python crawler.py --replay --archive html_archive --output replay_results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from fetcher import RecipeFetcher
+from html_archive import HTMLArchive
+from politeness import PolitenessScheduler
+from resolver import get_resolver
+from recipe_parser import RecipeParser
+
+
+def load_urls(path):
+    """Load recipe URLs from a CSV file (one URL per line), de-duplicated in order"""
+    urls = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            url = line.strip().strip('"').split(',')[0]
+            if url.startswith('http') and url not in seen:
+                seen.add(url)
+                urls.append(url)
+    return urls
+
+
+def load_completed(path):
+    """Get the URLs already written to a previous results file"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                completed.add(json.loads(line)['url'])
+            except (ValueError, KeyError):
+                continue
+    return completed
+
+
+class BulkCrawler:
+    """
+    Concurrent crawler feeding pages into RecipeParser
+
+    Concurrency model:
+    - A global semaphore bounds the total number of in-flight fetches
+    - A per-domain semaphore caps in-flight fetches to any single host
+    - Blocking fetch/parse work runs on a thread pool sized to the global
+      limit, sharing the fetcher's keep-alive connection pools
+    - An optional PolitenessScheduler is waited on (asynchronously) before a
+      global slot is taken, so rate-limited domains never idle a slot
+    """
+
+    def __init__(self, parser=None, fetcher=None, concurrency=64, per_domain=4, timeout=15,
+                 scheduler=None, archive=None):
+        self.concurrency = concurrency
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self.fetcher = fetcher or RecipeFetcher(
+            pool_connections=concurrency * 2,
+            pool_maxsize=per_domain,
+            timeout=timeout,
+            resolver=get_resolver(),
+            archive=archive
+        )
+        self.parser = parser or RecipeParser(fetcher=self.fetcher)
+        self.scheduler = scheduler
+        self._domain_limits = {}
+        self.stats = {'fetched': 0, 'parsed': 0, 'empty': 0, 'errors': 0, 'robots_skipped': 0}
+
+    def _domain_semaphore(self, url):
+        domain = (urlparse(url).hostname or '').lower()
+        if domain not in self._domain_limits:
+            self._domain_limits[domain] = asyncio.Semaphore(self.per_domain)
+        return self._domain_limits[domain]
+
+    def _fetch_and_parse(self, url):
+        """Blocking fetch + extraction, run on the worker pool"""
+        started = time.perf_counter()
+        # The crawler waits on the scheduler itself, the fetcher must not wait again
+        page = self.fetcher.fetch_page(url, timeout=self.timeout, polite=False)
+        if self.scheduler:
+            self.scheduler.record_response(url, page.status_code)
+        page.raise_for_status()
+        fetched = time.perf_counter()
+        ingredients = self.parser.extract_ingredients(page.content)
+        return {
+            'url': url,
+            'final_url': page.url,
+            'status': page.status_code,
+            'bytes': len(page.content),
+            'stopped_early': page.stopped_early,
+            'ingredients': ingredients,
+            'fetch_seconds': round(fetched - started, 3),
+            'parse_seconds': round(time.perf_counter() - fetched, 3),
+        }
+
+    async def _crawl_one(self, url, loop, executor, global_limit, output):
+        # Take the domain slot first so URLs queued behind a busy host
+        # don't hold global slots other domains could use
+        async with self._domain_semaphore(url):
+            if self.scheduler:
+                if not await loop.run_in_executor(executor, self.scheduler.allowed, url):
+                    self.stats['robots_skipped'] += 1
+                    output.write(json.dumps({'url': url, 'status': None, 'ingredients': [],
+                                             'error': 'disallowed by robots.txt'}) + '\n')
+                    output.flush()
+                    return
+                await self.scheduler.acquire_async(url)
+
+            async with global_limit:
+                try:
+                    result = await loop.run_in_executor(executor, self._fetch_and_parse, url)
+                    self.stats['fetched'] += 1
+                    if result['ingredients']:
+                        self.stats['parsed'] += 1
+                    else:
+                        self.stats['empty'] += 1
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    result = {'url': url, 'status': None, 'ingredients': [], 'error': str(e)}
+
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    async def crawl(self, urls, output_path, resume=True, progress_every=250):
+        """
+        Crawl URLs and append one JSON result per line to output_path
+
+        Args:
+            urls: Iterable of recipe URLs
+            output_path: JSON Lines file results are appended to
+            resume: Skip URLs already present in output_path
+            progress_every: Print a progress line every N completed URLs
+
+        Returns:
+            Dictionary of crawl statistics
+        """
+        urls = list(urls)
+        if resume:
+            completed = load_completed(output_path)
+            urls = [u for u in urls if u not in completed]
+        if self.scheduler:
+            urls = list(self.scheduler.round_robin(urls))
+
+        loop = asyncio.get_running_loop()
+        global_limit = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                open(output_path, 'a', encoding='utf-8') as output:
+            tasks = [
+                asyncio.ensure_future(self._crawl_one(url, loop, executor, global_limit, output))
+                for url in urls
+            ]
+            for done, task in enumerate(asyncio.as_completed(tasks), 1):
+                await task
+                if progress_every and done % progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"[crawl] {done}/{len(urls)} URLs, {done / elapsed:.1f} URLs/s, {self.stats}")
+
+        self.stats['urls'] = len(urls)
+        self.stats['seconds'] = round(time.perf_counter() - started, 2)
+        return dict(self.stats)
+
+    def run(self, urls, output_path, **kwargs):
+        """Synchronous entry point for crawl()"""
+        return asyncio.run(self.crawl(urls, output_path, **kwargs))
+
+
+# Per-process state for replay workers
+_replay_state = {}
+
+
+def _init_replay_worker(archive_dir):
+    archive = HTMLArchive(archive_dir)
+    _replay_state['archive'] = archive
+    _replay_state['parser'] = RecipeParser(fetcher=RecipeFetcher(archive=archive, replay=True))
+
+
+def _replay_one(url):
+    """Re-run extraction on one archived page, run in a worker process"""
+    page = _replay_state['archive'].get(url)
+    if page is None:
+        return {'url': url, 'status': None, 'ingredients': [], 'error': 'not in archive'}
+    started = time.perf_counter()
+    try:
+        ingredients = _replay_state['parser'].extract_ingredients(page.content)
+    except Exception as e:
+        return {'url': url, 'status': page.status_code, 'ingredients': [], 'error': str(e)}
+    return {
+        'url': url,
+        'final_url': page.final_url,
+        'status': page.status_code,
+        'bytes': len(page.content),
+        'ingredients': ingredients,
+        'parse_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def replay(archive_dir, output_path, urls=None, processes=None, progress_every=1000, limit=None):
+    """
+    Re-run extraction over archived pages, no network access
+
+    Parsing is CPU-bound, so pages are spread over a process pool (each
+    worker opens the archive read-only and builds its own RecipeParser).
+
+    Args:
+        archive_dir: HTMLArchive directory written by an earlier crawl
+        output_path: JSON Lines file results are written to (overwritten)
+        urls: URLs to replay, defaults to every archived URL
+        processes: Worker processes, defaults to the CPU count
+        progress_every: Print a progress line every N pages
+        limit: Only replay the first N URLs
+
+    Returns:
+        Dictionary of replay statistics
+    """
+    if urls is None:
+        archive = HTMLArchive(archive_dir)
+        urls = archive.urls()
+        archive.close()
+    urls = list(urls)
+    if limit:
+        urls = urls[:limit]
+
+    stats = {'parsed': 0, 'empty': 0, 'missing': 0, 'errors': 0}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_replay_worker,
+                             initargs=(archive_dir,)) as executor, \
+            open(output_path, 'w', encoding='utf-8') as output:
+        for done, result in enumerate(executor.map(_replay_one, urls, chunksize=32), 1):
+            if result['ingredients']:
+                stats['parsed'] += 1
+            elif result.get('error') == 'not in archive':
+                stats['missing'] += 1
+            elif result.get('error'):
+                stats['errors'] += 1
+            else:
+                stats['empty'] += 1
+            output.write(json.dumps(result) + '\n')
+            if progress_every and done % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"[replay] {done}/{len(urls)} pages, {done / elapsed:.1f} pages/s")
+
+    stats['urls'] = len(urls)
+    stats['seconds'] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Bulk re-parse recipe URLs')
+    arg_parser.add_argument('--urls', default=None,
+                            help='CSV file with one URL per line (default urls.csv, '
+                                 'or every archived URL with --replay)')
+    arg_parser.add_argument('--output', default='crawl_results.jsonl', help='JSON Lines results file')
+    arg_parser.add_argument('--concurrency', type=int, default=64, help='Global in-flight request limit')
+    arg_parser.add_argument('--per-domain', type=int, default=4, help='In-flight request limit per domain')
+    arg_parser.add_argument('--timeout', type=float, default=15, help='Per-request timeout in seconds')
+    arg_parser.add_argument('--rate', type=float, default=1.0,
+                            help='Requests per second per domain (0 disables politeness)')
+    arg_parser.add_argument('--burst', type=int, default=3, help='Token bucket burst size per domain')
+    arg_parser.add_argument('--ignore-robots', action='store_true', help='Do not check robots.txt')
+    arg_parser.add_argument('--limit', type=int, default=None, help='Only crawl the first N URLs')
+    arg_parser.add_argument('--no-resume', action='store_true', help='Re-crawl URLs already in the output file')
+    arg_parser.add_argument('--archive', default=None, help='HTMLArchive directory fetched pages are stored in')
+    arg_parser.add_argument('--replay', action='store_true',
+                            help='Re-run extraction over the --archive pages instead of fetching')
+    arg_parser.add_argument('--processes', type=int, default=None, help='Worker processes for --replay')
+    args = arg_parser.parse_args(argv)
+
+    if args.replay:
+        if not args.archive:
+            arg_parser.error('--replay needs --archive')
+        urls = load_urls(args.urls) if args.urls else None
+        stats = replay(args.archive, args.output, urls=urls, processes=args.processes, limit=args.limit)
+        print(f"Replay finished: {stats}")
+        return stats
+
+    urls = load_urls(args.urls or 'urls.csv')
+    if args.limit:
+        urls = urls[:args.limit]
+
+    crawler = BulkCrawler(
+        concurrency=args.concurrency,
+        per_domain=args.per_domain,
+        timeout=args.timeout,
+        archive=HTMLArchive(args.archive) if args.archive else None
+    )
+    if args.rate > 0:
+        crawler.scheduler = PolitenessScheduler(
+            crawler.fetcher,
+            rate=args.rate,
+            burst=args.burst,
+            respect_robots=not args.ignore_robots
+        )
+    stats = crawler.run(urls, args.output, resume=not args.no_resume)
+    print(f"Crawl finished: {stats}")
+    return stats
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,422 @@
+"""
+Extraction Pipeline Module
+Fetches a recipe page once and runs every extraction strategy on it
+
+The Streamlit app used to run its own extractor and, when that found
+nothing, RecipeParser.get_ingredients(), which downloaded and parsed the
+same page a second time. ExtractionPipeline fetches the page once, builds
+the DOM at most once (and only when a strategy needs it) and runs one
+ordered registry of strategies from both extractors over that document,
+timing each of them.
+
+Strategies are functions (pipeline, content, soup) -> list of ingredient
+strings; the first non-empty result wins. The pipeline argument is a
+per-run DocumentRun, so a pipeline shared across threads (the Streamlit
+app caches one per process) keeps no per-document state.
+"""
+import re
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlparse
+
+from fetcher import get_fetcher
+from html_backends import make_soup
+from jsonld import extract_recipe
+from selector_engine import SelectorSet
+from lexicon import load_lexicon
+from collocations import load_phrase_matcher
+from pos_patterns import get_pattern_scorer, pos_patterns_enabled
+from nlp import nltk_available
+from resolver import get_resolver, UnsafeURLError
+
+
+# A registered strategy; needs_dom strategies get the BeautifulSoup tree
+Strategy = namedtuple('Strategy', ['name', 'func', 'needs_dom'])
+
+# Outcome of a pipeline run: the winning strategy (None if none found any)
+# and an ordered name -> seconds map of the fetch, DOM build and strategies run
+ExtractionResult = namedtuple('ExtractionResult', ['url', 'ingredients', 'strategy', 'timings'])
+
+# Browser-like headers; some recipe sites reject obvious bots
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+}
+
+# Retried with just this when the browser headers get a 403
+SIMPLE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
+}
+
+# Microdata attributes (itemprop), tried first
+MICRODATA_SELECTORS = [
+    '[itemprop="recipeIngredient"]',
+    '[itemprop="ingredients"]',
+]
+
+# Popular recipe plugin selectors, in priority order
+PLUGIN_SELECTORS = [
+    # WPRM (WP Recipe Maker) - very popular
+    '.wprm-recipe-ingredient',
+    '.wprm-recipe-ingredients li',
+    '.wprm-recipe-ingredient-group li',
+
+    # Tasty Recipes
+    '.tasty-recipes-ingredients li',
+    '.tasty-recipes-ingredients-body li',
+    '.tasty-recipe-ingredients li',
+
+    # Recipe Card Blocks
+    '.recipe-card-ingredients li',
+    '.recipe-card__ingredient',
+
+    # Mediavine Create
+    '.mv-create-ingredients li',
+    '.mv-create-ingredient',
+
+    # Zip Recipes
+    '.zlrecipe-ingredient',
+    '.zip-recipe-ingredients li',
+
+    # EasyRecipe
+    '.ERSIngredients li',
+    '.ingredient',
+
+    # Yoast/Schema
+    '.schema-recipe-ingredients li',
+
+    # Jetpack Recipe
+    '.jetpack-recipe-ingredients li',
+
+    # Generic recipe classes
+    '.recipe-ingredients li',
+    '.ingredients-list li',
+    '.ingredient-list li',
+    '.recipe__ingredients li',
+    '.recipe-content__ingredients li',
+
+    # List-based ingredients
+    '.ingredients li',
+    '.ingredient-item',
+    '.ingredientsList li',
+
+    # Structured content
+    '[data-ingredient]',
+    '[class*="ingredient"] li',
+]
+
+# Both cascades are matched in a single walk over the page (see selector_engine)
+INGREDIENT_SELECTORS = SelectorSet(MICRODATA_SELECTORS + PLUGIN_SELECTORS)
+
+_WHITESPACE = re.compile(r'\s+')
+_LEADING_QUANTITY = re.compile(r'^[\d½¼¾⅓⅔⅛]+')
+_PARAGRAPH_DELIMITERS = re.compile(r'[,\n•·–-]')
+_INGREDIENT_HEADER = re.compile(r'ingredient', re.I)
+
+
+def _item_texts(elements, max_length=300):
+    """Whitespace-normalized text of each element, 3 to max_length characters"""
+    texts = []
+    for elem in elements:
+        text = _WHITESPACE.sub(' ', elem.get_text(strip=True))
+        if text and 2 < len(text) < max_length:
+            texts.append(text)
+    return texts
+
+
+# ============================================================================
+# Strategies
+# ============================================================================
+
+def json_ld(pipeline, content, soup):
+    """schema.org Recipe JSON-LD, read from the raw bytes"""
+    recipe = extract_recipe(content)
+    if not recipe:
+        return []
+    return [text.strip() for text in recipe.ingredients if len(text.strip()) > 1]
+
+
+def microdata(pipeline, content, soup):
+    """itemprop microdata; the first selector with matches wins"""
+    for elements in pipeline.selector_matches(soup)[:len(MICRODATA_SELECTORS)]:
+        ingredients = _item_texts(elements)
+        if ingredients:
+            return ingredients
+    return []
+
+
+def plugin_selectors(pipeline, content, soup):
+    """Recipe plugin markup (WPRM, Tasty...), accumulated until 3 items are found"""
+    ingredients = []
+    for elements in pipeline.selector_matches(soup)[len(MICRODATA_SELECTORS):]:
+        ingredients.extend(text for text in _item_texts(elements)
+                           if not text.lower().startswith(('instructions', 'directions', 'steps')))
+        if len(ingredients) >= 3:
+            return ingredients
+    return []
+
+
+def header_lists(pipeline, content, soup):
+    """The first list following an "Ingredients" heading"""
+    for header in soup.find_all(['h2', 'h3', 'h4', 'strong', 'b'], string=_INGREDIENT_HEADER):
+        next_list = header.find_next(['ul', 'ol'])
+        if next_list:
+            ingredients = _item_texts(next_list.find_all('li'))
+            if ingredients:
+                return ingredients
+    return []
+
+
+def recipe_containers(pipeline, content, soup):
+    """The first lists inside recipe-like containers"""
+    ingredients = []
+    for container in soup.select('.recipe, .recipe-container, .recipe-content, [class*="recipe"]')[:3]:
+        for lst in container.find_all(['ul', 'ol'])[:2]:
+            ingredients.extend(_item_texts(lst.find_all('li')))
+            if len(ingredients) >= 3:
+                return ingredients
+    return []
+
+
+def semantic_markup(pipeline, content, soup):
+    """RecipeParser's semantic markup selectors"""
+    return pipeline.parser._extract_by_semantic_markup(soup)
+
+
+def food_density(pipeline, content, soup):
+    """RecipeParser's food-word density scan (removes script/nav/header/footer)"""
+    return pipeline.parser._extract_by_food_density(soup)
+
+
+def likely_ingredient_lists(pipeline, content, soup):
+    """The first list with 3+ items that look like ingredients"""
+    for lst in soup.find_all(['ul', 'ol']):
+        items = [text for text in _item_texts(lst.find_all('li', recursive=False), 200)
+                 if len(text) > 3 and pipeline.is_likely_ingredient(text)]
+        if len(items) >= 3:
+            return items
+    return []
+
+
+def food_word_lists(pipeline, content, soup):
+    """RecipeParser's lists-with-food-words scan"""
+    return pipeline.parser._extract_from_lists(soup)
+
+
+def ingredient_paragraphs(pipeline, content, soup):
+    """Delimited ingredient lines in paragraphs that mention 'ingredient'"""
+    main_content = soup.find(['article', 'main']) or soup.find('body')
+    if not main_content:
+        return []
+    ingredients = []
+    for elem in main_content.find_all(['p', 'div']):
+        text = elem.get_text(strip=True)
+        if 'ingredient' in text.lower() and len(text) < 2000:
+            for line in _PARAGRAPH_DELIMITERS.split(text):
+                line = line.strip()
+                if line and 3 < len(line) < 150 and pipeline.is_likely_ingredient(line):
+                    ingredients.append(line)
+            if len(ingredients) >= 3:
+                return ingredients
+    return []
+
+
+# Default order: structured data, markup, then text heuristics. The Streamlit
+# extractor's strategies keep their lead over RecipeParser's, as when the
+# parser only ran as a fallback (food_density also prunes the shared tree)
+DEFAULT_STRATEGIES = (
+    Strategy('json_ld', json_ld, False),
+    Strategy('microdata', microdata, True),
+    Strategy('plugin_selectors', plugin_selectors, True),
+    Strategy('header_lists', header_lists, True),
+    Strategy('recipe_containers', recipe_containers, True),
+    Strategy('likely_ingredient_lists', likely_ingredient_lists, True),
+    Strategy('ingredient_paragraphs', ingredient_paragraphs, True),
+    Strategy('semantic_markup', semantic_markup, True),
+    Strategy('food_density', food_density, True),
+    Strategy('food_word_lists', food_word_lists, True),
+)
+
+# Strategies that delegate to a RecipeParser
+PARSER_STRATEGIES = ('semantic_markup', 'food_density', 'food_word_lists')
+
+
+class ExtractionPipeline:
+    """Single-fetch, single-parse runner for an ordered strategy registry"""
+
+    MAX_INGREDIENTS = 50
+
+    def __init__(self, fetcher=None, parser=None, strategies=DEFAULT_STRATEGIES,
+                 food_indicators=None, collocations=None, pattern_scorer=None):
+        """
+        Args:
+            fetcher: RecipeFetcher, defaults to the shared process-wide one
+            parser: RecipeParser backing the PARSER_STRATEGIES; they are
+                skipped when it is None
+            strategies: Iterable of Strategy, in priority order
+            food_indicators: Lexicon for is_likely_ingredient(), defaults to
+                food_words_.csv with the 'alpha' normalizer
+            collocations: PhraseMatcher for is_likely_ingredient()
+            pattern_scorer: pos_patterns.PatternScorer, the last (POS-tagging)
+                check of is_likely_ingredient(); defaults to the shared one
+                when LANES_POS_PATTERNS=1 and NLTK is installed, else none
+        """
+        self.fetcher = fetcher or get_fetcher()
+        self.parser = parser
+        self.resolver = getattr(self.fetcher, 'resolver', None) or get_resolver()
+        self.food_indicators = food_indicators or load_lexicon('food_words_.csv', 'alpha')
+        self.collocations = collocations or load_phrase_matcher()
+        if pattern_scorer is None and pos_patterns_enabled() and nltk_available():
+            pattern_scorer = get_pattern_scorer()
+        self.pattern_scorer = pattern_scorer
+        self.strategies = [strategy for strategy in strategies
+                           if parser is not None or strategy.name not in PARSER_STRATEGIES]
+
+    def register(self, name, func, needs_dom=True, before=None):
+        """
+        Add a strategy to the registry
+
+        Args:
+            name: Strategy name (reported in timings)
+            func: Function (pipeline, content, soup) -> list of strings
+            needs_dom: Whether func needs the BeautifulSoup tree
+            before: Name of the strategy to insert before (default: last)
+        """
+        strategy = Strategy(name, func, needs_dom)
+        names = [existing.name for existing in self.strategies]
+        position = names.index(before) if before in names else len(names)
+        self.strategies.insert(position, strategy)
+
+    def selector_matches(self, soup):
+        """INGREDIENT_SELECTORS matches for a document (memoized per run by DocumentRun)"""
+        return INGREDIENT_SELECTORS.select(soup)
+
+    def is_likely_ingredient(self, text):
+        """
+        Check if text looks like an ingredient: food words, collocations, a
+        leading quantity or, with a pattern scorer, a known POS-tag pattern
+        (tagged only when the cheap checks fail)
+        """
+        text_lower = text.lower()
+        return (self.food_indicators.any(text_lower.split())
+                or self.collocations.any(text_lower, min_words=2)
+                or bool(_LEADING_QUANTITY.match(text))
+                or self._matches_pos_pattern(text))
+
+    def _matches_pos_pattern(self, text):
+        if self.pattern_scorer is None:
+            return False
+        try:
+            return self.pattern_scorer.is_ingredient(text)
+        except LookupError as e:
+            print(f"Warning: POS-pattern check disabled: {e}")
+            self.pattern_scorer = None
+            return False
+
+    def fetch(self, url, timeout=20):
+        """
+        Download a page once, retrying a 403 with plain headers
+
+        Raises:
+            UnsafeURLError: The URL is not a public http(s) address
+            requests.HTTPError: The page could not be downloaded
+        """
+        if not getattr(self.fetcher, 'replay', False):
+            self.resolver.check_url(url)
+
+        parsed_url = urlparse(url)
+        headers = dict(BROWSER_HEADERS, Referer=f"{parsed_url.scheme}://{parsed_url.netloc}")
+        page = self.fetcher.fetch_page(url, headers=headers, timeout=timeout)
+        if page.status_code == 403:
+            page = self.fetcher.fetch_page(url, headers=SIMPLE_HEADERS, timeout=timeout)
+        page.raise_for_status()
+        return page
+
+    def run(self, content, url=None, timings=None):
+        """
+        Run the strategies over an already downloaded page
+
+        Args:
+            content: Raw HTML (bytes or str)
+            url: Page URL, for the result only
+            timings: OrderedDict to add the timings to
+
+        Returns:
+            ExtractionResult
+        """
+        timings = timings if timings is not None else OrderedDict()
+        document = DocumentRun(self)
+        soup = None
+        for strategy in self.strategies:
+            if strategy.needs_dom and soup is None:
+                started = time.perf_counter()
+                soup = make_soup(content)
+                timings['parse'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            try:
+                ingredients = strategy.func(document, content, soup)
+            except Exception as e:
+                print(f"Warning: Extraction strategy {strategy.name} failed: {e}")
+                ingredients = []
+            timings[strategy.name] = time.perf_counter() - started
+
+            if ingredients:
+                return ExtractionResult(url, ingredients[:self.MAX_INGREDIENTS], strategy.name, timings)
+
+        return ExtractionResult(url, [], None, timings)
+
+    def extract(self, url):
+        """
+        Fetch a recipe URL once and run the strategies on it
+
+        Returns:
+            ExtractionResult (no ingredients if the page could not be fetched)
+        """
+        timings = OrderedDict()
+        started = time.perf_counter()
+        try:
+            page = self.fetch(url)
+        except UnsafeURLError as e:
+            print(f"Blocked URL: {e}")
+            return ExtractionResult(url, [], None, timings)
+        except Exception as e:
+            print(f"Error fetching recipe: {e}")
+            return ExtractionResult(url, [], None, timings)
+        finally:
+            timings['fetch'] = time.perf_counter() - started
+
+        return self.run(page.content, page.url, timings)
+
+
+class DocumentRun:
+    """
+    One run of an ExtractionPipeline over one document
+
+    Passed to the strategies as their pipeline argument: attributes are read
+    from the pipeline, and per-document memos (the INGREDIENT_SELECTORS
+    matches microdata and plugin_selectors share) live here, so concurrent
+    runs never see each other's documents.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self._matches = None
+
+    def __getattr__(self, name):
+        return getattr(self.pipeline, name)
+
+    def selector_matches(self, soup):
+        """INGREDIENT_SELECTORS matches for this run's document, computed once"""
+        if self._matches is None or self._matches[0] is not soup:
+            self._matches = (soup, self.pipeline.selector_matches(soup))
+        return self._matches[1]
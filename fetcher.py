@@ -0,0 +1,296 @@
+"""
+Recipe Fetcher Module
+Shared, pooled HTTP layer for downloading recipe pages
+
+Every parse used to open a fresh connection (DNS lookup, TCP handshake and
+TLS negotiation). The fetcher keeps per-host keep-alive connection pools that
+are shared by every request and every worker thread in the process.
+
+With an HTMLArchive attached, every fetched page is also archived; in replay
+mode pages are served from the archive and the network is never touched.
+"""
+import os
+import threading
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from html_archive import HTMLArchive
+from jsonld import JSONLDScanner
+from resolver import PinnedHTTPAdapter, get_resolver
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Recipe pages are mostly ads and comments past the first few hundred KB
+DEFAULT_MAX_BODY_BYTES = 2 * 1024 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class FetchedPage(namedtuple('FetchedPage', ['url', 'status_code', 'headers', 'content',
+                                             'truncated', 'stopped_early', 'redirects'])):
+    """
+    Result of a streaming fetch
+
+    url: final URL after redirects
+    redirects: URLs of the redirect chain before url, in order
+    truncated: the body was cut off at the maximum body size
+    stopped_early: download stopped once a complete Recipe JSON-LD was seen
+    """
+    __slots__ = ()
+
+    def raise_for_status(self):
+        """Raise requests.HTTPError for 4xx/5xx responses"""
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class RecipeFetcher:
+    """
+    Thread-safe HTTP fetcher with bounded per-host connection pools
+
+    One HTTPAdapter (and therefore one urllib3 PoolManager) is shared by the
+    whole process. Each thread gets its own requests.Session mounted on that
+    adapter, so cookies stay per-thread while sockets are reused across
+    requests and gunicorn threads.
+    """
+
+    def __init__(self, pool_connections=32, pool_maxsize=10, pool_block=False, timeout=10,
+                 max_body_bytes=DEFAULT_MAX_BODY_BYTES, scheduler=None, resolver=None,
+                 archive=None, replay=False):
+        """
+        Args:
+            pool_connections: Number of per-host pools kept alive at once
+            pool_maxsize: Maximum idle keep-alive connections kept per host
+            pool_block: Block when a host's pool is exhausted instead of
+                opening an extra (non-pooled) connection
+            timeout: Default request timeout in seconds
+            max_body_bytes: Default body size limit for fetch_page()
+            scheduler: Optional PolitenessScheduler applied to every request
+                (per-domain token buckets, backoff on 403/429)
+            resolver: Optional HostResolver; connections are then pinned to
+                its validated public addresses (SSRF guard, single lookup)
+            archive: Optional HTMLArchive every fetched page is stored in
+            replay: Serve fetch_page() from the archive instead of the network
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.scheduler = scheduler
+        self.resolver = resolver
+        self.archive = archive
+        self.replay = replay
+        if replay and archive is None:
+            raise ValueError("Replay mode needs an archive")
+        pool_kwargs = {
+            'pool_connections': pool_connections,
+            'pool_maxsize': pool_maxsize,
+            'pool_block': pool_block
+        }
+        if resolver:
+            self._adapter = PinnedHTTPAdapter(resolver, **pool_kwargs)
+        else:
+            self._adapter = HTTPAdapter(**pool_kwargs)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._request_counts = {}
+        self._stream_stats = {'bytes_read': 0, 'stopped_early': 0, 'truncated': 0,
+                              'archived': 0, 'replayed': 0}
+
+    def _get_session(self):
+        """Get the calling thread's session, creating it on first use"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url, headers=None, timeout=None, polite=True, **kwargs):
+        """
+        Fetch a URL through the shared connection pools
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers (merged over DEFAULT_HEADERS)
+            timeout: Request timeout, defaults to the fetcher timeout
+            polite: Wait for the scheduler's per-domain rate limit (if any)
+
+        Returns:
+            requests.Response
+        """
+        request_headers = dict(DEFAULT_HEADERS)
+        if headers:
+            request_headers.update(headers)
+
+        scheduler = self.scheduler if polite else None
+        if scheduler:
+            scheduler.acquire(url)
+
+        kwargs.setdefault('allow_redirects', True)
+        response = self._get_session().get(
+            url,
+            headers=request_headers,
+            timeout=timeout or self.timeout,
+            **kwargs
+        )
+        self._count_request(url)
+
+        if scheduler:
+            scheduler.record_response(url, response.status_code)
+        return response
+
+    def fetch_page(self, url, headers=None, timeout=None, stop_early=True, max_body_bytes=None,
+                   polite=True):
+        """
+        Stream a page in chunks, stopping as soon as the ingredients are available
+
+        The download ends when a complete schema.org Recipe JSON-LD object
+        has been received (if stop_early) or when the body reaches the size
+        limit. Whatever was read so far is returned either way.
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers
+            timeout: Request timeout, defaults to the fetcher timeout
+            stop_early: Stop once a complete Recipe JSON-LD block is seen
+            max_body_bytes: Body size limit, defaults to the fetcher limit
+            polite: Wait for the scheduler's per-domain rate limit (if any)
+
+        Returns:
+            FetchedPage
+        """
+        if self.replay:
+            return self._replay_page(url)
+
+        # Archived pages are always downloaded whole (up to the size limit)
+        # so replays see what a full fetch would have seen
+        if self.archive is not None:
+            stop_early = False
+
+        limit = max_body_bytes or self.max_body_bytes
+        response = self.get(url, headers=headers, timeout=timeout, polite=polite, stream=True)
+        body = bytearray()
+        truncated = False
+        stopped_early = False
+        scanner = JSONLDScanner() if stop_early else None
+
+        # Error pages are read under the same limit, without the JSON-LD scan
+        if not 200 <= response.status_code < 300:
+            scanner = None
+
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                body.extend(chunk)
+                # A body of exactly limit bytes is complete; only more is cut off
+                if len(body) > limit:
+                    del body[limit:]
+                    truncated = True
+                    break
+                if scanner and scanner.scan(body):
+                    stopped_early = True
+                    break
+        finally:
+            # A fully read body returns the connection to the pool; an
+            # abandoned one is closed so the pool never sees a dirty socket
+            response.close()
+
+        with self._lock:
+            self._stream_stats['bytes_read'] += len(body)
+            self._stream_stats['stopped_early'] += stopped_early
+            self._stream_stats['truncated'] += truncated
+
+        page = FetchedPage(response.url, response.status_code, response.headers, bytes(body),
+                           truncated, stopped_early, tuple(r.url for r in response.history))
+        if self.archive is not None and 200 <= page.status_code < 300 and page.content:
+            self.archive.put(url, page.content, status_code=page.status_code, final_url=page.url)
+            with self._lock:
+                self._stream_stats['archived'] += 1
+        return page
+
+    def _replay_page(self, url):
+        """Serve a page from the archive, a 404 page if it was never archived"""
+        archived = self.archive.get(url)
+        if archived is None:
+            return FetchedPage(url, 404, {}, b'', False, False, ())
+        with self._lock:
+            self._stream_stats['replayed'] += 1
+        redirects = (url,) if archived.final_url != url else ()
+        return FetchedPage(archived.final_url, archived.status_code, {}, archived.content,
+                           False, False, redirects)
+
+    def _count_request(self, url):
+        host = (urlparse(url).hostname or '').lower()
+        with self._lock:
+            self._request_counts[host] = self._request_counts.get(host, 0) + 1
+
+    def pool_stats(self):
+        """
+        Report connection pool usage
+
+        Returns:
+            Dictionary with pool configuration and per-host statistics:
+            connections opened, requests served and idle keep-alive
+            connections currently available for reuse
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        with pools.lock:
+            pool_items = [(key, pools[key]) for key in pools.keys()]
+
+        for key, pool in pool_items:
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': idle,
+                'reuse_ratio': round(1 - pool.num_connections / pool.num_requests, 3) if pool.num_requests else 0
+            }
+
+        with self._lock:
+            request_counts = dict(self._request_counts)
+            stream_stats = dict(self._stream_stats)
+
+        return {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'active_pools': len(hosts),
+            'total_requests': sum(request_counts.values()),
+            'requests_by_host': request_counts,
+            'streaming': stream_stats,
+            'pools': hosts
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        self._adapter.close()
+
+
+_shared_fetcher = None
+_shared_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Get the process-wide shared fetcher (SSRF-guarded by the shared resolver)
+
+    Set LANES_ARCHIVE_DIR to archive every fetched page there, and
+    LANES_ARCHIVE_REPLAY=1 to serve pages from that archive instead.
+    """
+    global _shared_fetcher
+    if _shared_fetcher is None:
+        with _shared_lock:
+            if _shared_fetcher is None:
+                archive_dir = os.environ.get('LANES_ARCHIVE_DIR')
+                _shared_fetcher = RecipeFetcher(
+                    resolver=get_resolver(),
+                    archive=HTMLArchive(archive_dir) if archive_dir else None,
+                    replay=bool(archive_dir) and os.environ.get('LANES_ARCHIVE_REPLAY') == '1'
+                )
+    return _shared_fetcher
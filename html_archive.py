@@ -0,0 +1,220 @@
+"""
+HTML Archive Module
+Content-addressed, compressed archive of fetched recipe pages with replay
+
+Every parser change used to mean re-downloading pages to evaluate it. The
+archive keeps each fetched page so extraction can be re-run offline:
+
+- pages.seg: append-only segment of compressed page bodies, one record per
+  distinct body (content-addressed by SHA-256, so identical pages are stored
+  once)
+- index.jsonl: append-only index; 'blob' lines map a content hash to its
+  offset/length/codec in the segment, 'url' lines map a URL to the content
+  hash and response metadata
+
+Bodies are compressed with zstandard when it is installed, zlib otherwise;
+the codec is recorded per blob so archives written either way stay readable.
+Several processes may write to one archive (gunicorn workers and the
+Streamlit app sharing LANES_ARCHIVE_DIR): each put() holds an exclusive
+flock on the segment while it appends, and first reads the index lines other
+writers appended, so offsets never go stale and bodies stay deduplicated.
+Without fcntl (Windows) there is no cross-process lock, so keep to one
+writer process there.
+
+URLs are archived exactly as fetched (less the fragment): many recipe sites
+tell pages apart by their query ("recipe.php?id=12"), so normalizing it away
+would replay one page for another.
+"""
+import os
+import json
+import zlib
+import hashlib
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urldefrag
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+
+ArchivedPage = namedtuple('ArchivedPage', ['url', 'final_url', 'status_code', 'content', 'fetched_at'])
+
+
+class HTMLArchive:
+    """Content-addressed archive of raw recipe HTML"""
+
+    SEGMENT_FILE = 'pages.seg'
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, directory, codec=None):
+        """
+        Args:
+            directory: Archive directory (created if missing)
+            codec: 'zstd' or 'zlib' for new blobs, defaults to zstd when available
+        """
+        self.directory = directory
+        self.codec = codec or ('zstd' if ZSTD_AVAILABLE else 'zlib')
+        if self.codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise ValueError("zstd codec requested but the zstandard package is not installed")
+
+        os.makedirs(directory, exist_ok=True)
+        self.segment_path = os.path.join(directory, self.SEGMENT_FILE)
+        self.index_path = os.path.join(directory, self.INDEX_FILE)
+
+        self._blobs = {}  # content hash -> (offset, length, codec)
+        self._urls = {}   # url key -> url entry
+        self._index_size = 0  # bytes of index.jsonl read so far
+        self._lock = threading.Lock()
+        self._load_index()
+
+        # Positional reads on a dedicated descriptor are safe across threads
+        self._segment = open(self.segment_path, 'a+b')
+        self._read_fd = os.open(self.segment_path, os.O_RDONLY)
+
+    def _load_index(self):
+        """Read the index lines appended since the last call (by any process)"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_size)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # A torn final line from an interrupted write, or one
+                    # still being written: read it again next time
+                    break
+                self._index_size += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('type') == 'blob':
+                    self._blobs[entry['hash']] = (entry['offset'], entry['length'], entry['codec'])
+                elif entry.get('type') == 'url':
+                    # Re-keyed from the URL, so indexes written with older keys still load
+                    self._urls[self.url_key(entry['url'])] = entry
+
+    @staticmethod
+    def url_key(url):
+        """SHA-256 of a URL as fetched, query included, fragment dropped"""
+        return hashlib.sha256(urldefrag(url)[0].encode('utf-8')).hexdigest()
+
+    def _compress(self, content):
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(content)
+        return zlib.compress(content, 6)
+
+    @staticmethod
+    def _decompress(data, codec):
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise ValueError("Archive blob is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def _append_index(self, entries):
+        with open(self.index_path, 'ab') as f:
+            for entry in entries:
+                f.write((json.dumps(entry) + '\n').encode('utf-8'))
+            # Our own lines are applied already; only other writers' need reading
+            self._index_size = f.tell()
+
+    @contextmanager
+    def _writer_lock(self):
+        """Exclusive flock on the segment, held across processes while appending"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._segment.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._segment.fileno(), fcntl.LOCK_UN)
+
+    def put(self, url, content, status_code=200, final_url=None):
+        """
+        Archive a fetched page
+
+        Returns:
+            SHA-256 hex digest of the page body
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        url_entry = {
+            'type': 'url',
+            'url_hash': self.url_key(url),
+            'url': url,
+            'final_url': final_url or url,
+            'status_code': status_code,
+            'hash': content_hash,
+            'fetched_at': datetime.utcnow().isoformat()
+        }
+
+        with self._lock, self._writer_lock():
+            # Other processes may have appended since: their offsets and blobs
+            self._load_index()
+            entries = []
+            if content_hash not in self._blobs:
+                blob = self._compress(content)
+                self._segment.seek(0, os.SEEK_END)
+                offset = self._segment.tell()
+                self._segment.write(blob)
+                self._segment.flush()
+                self._blobs[content_hash] = (offset, len(blob), self.codec)
+                entries.append({'type': 'blob', 'hash': content_hash, 'offset': offset,
+                                'length': len(blob), 'codec': self.codec})
+            entries.append(url_entry)
+            self._urls[url_entry['url_hash']] = url_entry
+            self._append_index(entries)
+
+        return content_hash
+
+    def read_blob(self, content_hash):
+        """Get a page body by content hash"""
+        offset, length, codec = self._blobs[content_hash]
+        return self._decompress(os.pread(self._read_fd, length, offset), codec)
+
+    def get(self, url):
+        """Get the archived page for a URL, or None"""
+        key = self.url_key(url)
+        entry = self._urls.get(key)
+        if entry is None:
+            # Maybe archived by another process since the index was read
+            with self._lock:
+                self._load_index()
+            entry = self._urls.get(key)
+        if entry is None or entry['hash'] not in self._blobs:
+            return None
+        return ArchivedPage(entry['url'], entry['final_url'], entry['status_code'],
+                            self.read_blob(entry['hash']), entry['fetched_at'])
+
+    def __contains__(self, url):
+        return self.url_key(url) in self._urls
+
+    def __len__(self):
+        return len(self._urls)
+
+    def urls(self):
+        """All archived URLs"""
+        return [entry['url'] for entry in self._urls.values()]
+
+    def stats(self):
+        return {
+            'urls': len(self._urls),
+            'blobs': len(self._blobs),
+            'segment_bytes': os.path.getsize(self.segment_path),
+            'codec': self.codec
+        }
+
+    def close(self):
+        self._segment.close()
+        os.close(self._read_fd)
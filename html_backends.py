@@ -0,0 +1,111 @@
+"""
+HTML Backends Module
+Pluggable HTML parser backends for the extraction strategies
+
+Building the parse tree is the dominant CPU cost of a parse. Every
+extraction strategy works on a BeautifulSoup tree, so the backend is chosen
+where that tree is built: lxml (libxml2, several times faster) when it is
+installed, Python's html.parser otherwise. Set LANES_HTML_BACKEND to force
+one. PCP schemas with selector_type 'xpath' are evaluated directly on an
+lxml.html tree, since BeautifulSoup has no XPath support.
+"""
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+BACKENDS = ('lxml', 'html.parser')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def default_backend():
+    """Get the configured backend: LANES_HTML_BACKEND, else lxml if installed"""
+    backend = os.environ.get('LANES_HTML_BACKEND')
+    if backend:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown HTML backend {backend!r} (available: {', '.join(BACKENDS)})")
+        if backend == 'lxml' and not LXML_AVAILABLE:
+            print("Warning: LANES_HTML_BACKEND=lxml but lxml is not installed, using html.parser")
+            return 'html.parser'
+        return backend
+    return 'lxml' if LXML_AVAILABLE else 'html.parser'
+
+
+DEFAULT_BACKEND = default_backend()
+
+
+def make_soup(content, backend=None):
+    """
+    Build the BeautifulSoup tree the extraction strategies run on
+
+    Args:
+        content: Raw HTML (bytes or str)
+        backend: 'lxml' or 'html.parser', defaults to DEFAULT_BACKEND
+
+    Returns:
+        BeautifulSoup
+    """
+    return BeautifulSoup(content, backend or DEFAULT_BACKEND)
+
+
+def parse_tree(content):
+    """
+    Parse HTML into an lxml.html document for XPath queries
+
+    Returns:
+        lxml.html.HtmlElement, or None for an empty document
+    """
+    if not LXML_AVAILABLE:
+        raise RuntimeError("XPath selectors need lxml (pip install lxml)")
+    try:
+        return lxml.html.document_fromstring(content)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def xpath_texts(content, expression):
+    """
+    Evaluate an XPath expression and return the text of each match
+
+    Element matches give their whitespace-normalized text content, string
+    matches (text() and @attribute steps) are returned stripped.
+
+    Args:
+        content: Raw HTML (bytes or str) or a tree from parse_tree()
+        expression: XPath 1.0 expression
+
+    Returns:
+        List of non-empty strings in document order
+    """
+    tree = content if LXML_AVAILABLE and isinstance(content, etree._Element) else parse_tree(content)
+    if tree is None:
+        return []
+
+    try:
+        results = tree.xpath(expression)
+    except etree.XPathError as e:
+        print(f"Warning: Invalid XPath {expression!r}: {e}")
+        return []
+    if not isinstance(results, list):
+        # Scalar XPath results (string(), count()) are a single value
+        results = [results]
+
+    texts = []
+    for result in results:
+        if isinstance(result, etree._Element):
+            text = result.text_content()
+        else:
+            text = str(result)
+        text = _WHITESPACE.sub(' ', text).strip()
+        if text:
+            texts.append(text)
+    return texts
@@ -0,0 +1,206 @@
+"""
+HTTP Cache Module
+Disk-backed conditional-GET cache for recipe pages
+
+When a LocalStorageCache entry expires the page usually hasn't changed. The
+cache keeps each page body with its ETag / Last-Modified validators and the
+ingredients extracted from it, keyed by the exact URL (less its fragment,
+which never reaches the server; "?id=1" and "?id=2" are different pages).
+Refreshes send If-None-Match / If-Modified-Since and, on a 304, reuse the
+stored extraction result without downloading or parsing the page again.
+Results are stored per variant (the partner schema they were extracted
+with), so a result is only reused for the extraction that produced it.
+"""
+import os
+import json
+import zlib
+import hashlib
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urldefrag
+
+
+# content: page body, result: stored extraction result (None if not stored),
+# not_modified: True when the server answered 304 and the cached body was used,
+# canonical_url: rel=canonical target stored with the result (304 only)
+CachedPage = namedtuple('CachedPage', ['content', 'result', 'not_modified', 'status_code',
+                                       'url', 'redirects', 'canonical_url'])
+
+
+class HTTPCache:
+    """
+    On-disk HTTP response cache with ETag / Last-Modified revalidation
+
+    Layout: <cache_dir>/<hash[:2]>/<hash>.json holds the validators and the
+    extraction results, <hash>.body holds the zlib-compressed page body.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {'revalidated': 0, 'fetched': 0, 'stored': 0, 'result_hits': 0}
+
+    @staticmethod
+    def cache_key(url):
+        """SHA256 of the URL as requested, query included, fragment dropped"""
+        return hashlib.sha256(urldefrag(url)[0].encode('utf-8')).hexdigest()
+
+    def _paths(self, url):
+        key = self.cache_key(url)
+        directory = os.path.join(self.cache_dir, key[:2])
+        return directory, os.path.join(directory, key + '.json'), os.path.join(directory, key + '.body')
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _write_atomic(path, data):
+        """Write a file via rename so concurrent readers never see partial data"""
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load_meta(self, url):
+        _, meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, url, meta):
+        directory, meta_path, _ = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def conditional_headers(self, url):
+        """Build If-None-Match / If-Modified-Since headers for a cached URL"""
+        meta = self._load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def get_body(self, url):
+        """Get the cached page body, or None"""
+        _, _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def get_result(self, url, variant=''):
+        """Get the extraction result stored for the cached body and variant, or None"""
+        meta = self._load_meta(url)
+        if meta:
+            return (meta.get('results') or {}).get(variant)
+        return None
+
+    def store(self, url, response):
+        """
+        Store a 200 response (requests.Response or FetchedPage) if it carries validators
+
+        Any previously stored extraction results are dropped since they
+        belong to the old body.
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        directory, _, body_path = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+        self._write_atomic(body_path, zlib.compress(response.content, 6))
+        self._save_meta(url, {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': datetime.utcnow().isoformat(),
+            'results': {}
+        })
+        self._count('stored')
+        return True
+
+    def store_result(self, url, result, variant='', canonical_url=None):
+        """
+        Attach an extraction result to the cached body
+
+        Args:
+            url: URL the body was cached for
+            result: JSON-serializable extraction result
+            variant: What the result depends on besides the body (e.g. the
+                partner schema's selector), '' for the generic extraction
+            canonical_url: The body's <link rel=canonical> target, returned
+                on later 304s so the alias map survives revalidation
+        """
+        meta = self._load_meta(url)
+        if meta is None:
+            return False
+        meta.setdefault('results', {})[variant] = result
+        if canonical_url:
+            meta['canonical_url'] = canonical_url
+        self._save_meta(url, meta)
+        return True
+
+    def invalidate(self, url):
+        """Remove a URL from the cache"""
+        _, meta_path, body_path = self._paths(url)
+        for path in (meta_path, body_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def fetch(self, fetcher, url, headers=None, variant='', **kwargs):
+        """
+        Fetch a URL, revalidating against the cache
+
+        Args:
+            fetcher: RecipeFetcher used for the network request (streamed
+                with fetch_page, so the stored body may stop after the
+                Recipe JSON-LD block)
+            url: URL to fetch
+            headers: Extra request headers
+            variant: Extraction variant whose stored result to return on a 304
+
+        Returns:
+            CachedPage
+        """
+        request_headers = dict(headers or {})
+        request_headers.update(self.conditional_headers(url))
+
+        response = fetcher.fetch_page(url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304:
+            body = self.get_body(url)
+            if body is not None:
+                self._count('revalidated')
+                meta = self._load_meta(url) or {}
+                result = (meta.get('results') or {}).get(variant)
+                if result is not None:
+                    self._count('result_hits')
+                return CachedPage(body, result, True, 304, response.url, response.redirects,
+                                  meta.get('canonical_url'))
+
+            # Validators without a body (e.g. cache files removed): fetch in full
+            self.invalidate(url)
+            response = fetcher.fetch_page(url, headers=headers, **kwargs)
+
+        response.raise_for_status()
+        self._count('fetched')
+        self.store(url, response)
+        return CachedPage(response.content, None, False, response.status_code,
+                          response.url, response.redirects, None)
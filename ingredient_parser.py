@@ -0,0 +1,410 @@
+"""
+Ingredient Parser Module
+Structured parse of ingredient lines: quantity, range, unit, item, preparation
+
+"1 1/2 cups quinoa, rinsed" -> quantity '1 1/2' (1.5), unit 'cups' (cup),
+item 'quinoa', preparation 'rinsed'. The line is matched against a single
+compiled pattern for the leading amount (integers, decimals, fractions,
+unicode fractions, mixed numbers, ranges, number words), an optional
+parenthetical package size, and a unit alias table; the rest is split into
+item and preparation at the first comma, or at trailing preparation words.
+No POS tagging is involved, so a batch of hundreds of lines parses in
+milliseconds.
+
+qu_w_set.csv (lines labelled with the POS spans of their quantity and
+measure) and tag_patterns.csv (raw ingredient lines) are the accuracy and
+throughput corpora for `python benchmarks.py ingredient_parser`.
+"""
+import os
+import re
+import csv
+from fractions import Fraction
+from collections import namedtuple
+
+
+ParsedIngredient = namedtuple('ParsedIngredient', [
+    'text',            # the line as given
+    'quantity',        # amount as written ('1 1/2', '2-3'), '' if none
+    'value',           # amount as a number (low end of a range), None if none
+    'max_value',       # high end of a range, None otherwise
+    'unit',            # unit as written ('Tbsp.', 'cups'), '' if none
+    'canonical_unit',  # key of UNITS ('tablespoon', 'cup'), '' if none
+    'size',            # package size from "1 (14 ounce) can", '' if none
+    'item',            # what to buy
+    'preparation',     # how to prepare it ('finely chopped', 'divided')
+])
+
+# Canonical unit -> the ways recipes write it (matched case-insensitively)
+UNITS = {
+    'cup': ('cups', 'cup', 'c.', 'c'),
+    'tablespoon': ('tablespoons', 'tablespoon', 'tbsps', 'tbsp', 'tbs', 'tbl', 'tb'),
+    'teaspoon': ('teaspoons', 'teaspoon', 'tsps', 'tsp', 'ts'),
+    'fluid ounce': ('fluid ounces', 'fluid ounce', 'fl. oz', 'fl oz', 'fl.oz'),
+    'ounce': ('ounces', 'ounce', 'oz'),
+    'pound': ('pounds', 'pound', 'lbs', 'lb', '#'),
+    'gram': ('grams', 'gram', 'gr', 'g'),
+    'kilogram': ('kilograms', 'kilogram', 'kgs', 'kg'),
+    'milligram': ('milligrams', 'milligram', 'mg'),
+    'milliliter': ('milliliters', 'milliliter', 'millilitres', 'millilitre', 'ml'),
+    'liter': ('liters', 'liter', 'litres', 'litre', 'l'),
+    'pint': ('pints', 'pint', 'pt'),
+    'quart': ('quarts', 'quart', 'qt'),
+    'gallon': ('gallons', 'gallon', 'gal'),
+    'inch': ('inches', 'inch'),
+    'pinch': ('pinches', 'pinch'),
+    'dash': ('dashes', 'dash'),
+    'drop': ('drops', 'drop'),
+    'clove': ('cloves', 'clove'),
+    'can': ('cans', 'can'),
+    'jar': ('jars', 'jar'),
+    'bottle': ('bottles', 'bottle'),
+    'package': ('packages', 'package', 'pkgs', 'pkg'),
+    'packet': ('packets', 'packet'),
+    'envelope': ('envelopes', 'envelope'),
+    'container': ('containers', 'container'),
+    'box': ('boxes', 'box'),
+    'bag': ('bags', 'bag'),
+    'carton': ('cartons', 'carton'),
+    'stick': ('sticks', 'stick'),
+    'slice': ('slices', 'slice'),
+    'piece': ('pieces', 'piece'),
+    'bunch': ('bunches', 'bunch'),
+    'head': ('heads', 'head'),
+    'stalk': ('stalks', 'stalk'),
+    'sprig': ('sprigs', 'sprig'),
+    'handful': ('handfuls', 'handful'),
+    'loaf': ('loaves', 'loaf'),
+    'sheet': ('sheets', 'sheet'),
+    'fillet': ('fillets', 'fillet'),
+    'scoop': ('scoops', 'scoop'),
+}
+
+UNIT_ALIASES = {alias: unit for unit, aliases in UNITS.items() for alias in aliases}
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'dozen': 12, 'half': 0.5, 'a half': 0.5, 'one half': 0.5,
+}
+
+UNICODE_FRACTIONS = {
+    '½': Fraction(1, 2), '⅓': Fraction(1, 3), '⅔': Fraction(2, 3), '¼': Fraction(1, 4), '¾': Fraction(3, 4),
+    '⅕': Fraction(1, 5), '⅖': Fraction(2, 5), '⅗': Fraction(3, 5), '⅘': Fraction(4, 5), '⅙': Fraction(1, 6),
+    '⅚': Fraction(5, 6), '⅛': Fraction(1, 8), '⅜': Fraction(3, 8), '⅝': Fraction(5, 8), '⅞': Fraction(7, 8),
+}
+
+# Words that describe preparation when they trail the item ("mint, chopped" / "mint chopped")
+PREPARATION_WORDS = frozenset({
+    'chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed', 'ground', 'cubed',
+    'halved', 'quartered', 'julienned', 'melted', 'softened', 'beaten', 'whisked', 'sifted',
+    'peeled', 'seeded', 'pitted', 'cored', 'trimmed', 'rinsed', 'drained', 'thawed', 'divided',
+    'toasted', 'cooked', 'zested', 'juiced', 'mashed', 'torn', 'crumbled', 'separated', 'warmed',
+    'chilled', 'optional', 'finely', 'roughly', 'coarsely', 'thinly', 'thickly', 'freshly',
+    'lightly', 'and', 'or', 'to', 'taste', 'for', 'garnish', 'serving', 'room', 'temperature',
+    'at', 'plus', 'more', 'as', 'needed',
+})
+
+_FRACTION_CHARS = ''.join(UNICODE_FRACTIONS)
+_NUMBER = (r'(?:\d+\s+\d+\s*/\s*\d+'               # 1 1/2
+           r'|\d+\s*[' + _FRACTION_CHARS + r']'    # 1½
+           r'|\d+\s*/\s*\d+'                       # 1/2
+           r'|\d*\.\d+|\d+(?:,\d{3})*'             # .5, 2.25, 1,000
+           r'|[' + _FRACTION_CHARS + r'])')        # ½
+_NUMBER_WORD = r'(?:' + '|'.join(sorted(map(re.escape, NUMBER_WORDS), key=len, reverse=True)) + r')'
+_UNIT = r'(?:' + '|'.join(sorted(map(re.escape, UNIT_ALIASES), key=len, reverse=True)) + r')'
+
+# Leading amount, optional size, optional unit: one anchored match per line
+_LEADING = re.compile(
+    r'^\s*(?:(?P<quantity>' + _NUMBER + r'(?:\s*(?:-|–|—|to|or)\s*(?P<max>' + _NUMBER + r'))?)'
+    r'|(?P<word>' + _NUMBER_WORD + r')(?=\s))'
+    r'\s*(?:\(\s*(?P<size>[^)]*?)\s*\))?'
+    r'\s*(?:(?P<unit>' + _UNIT + r')\.?(?=[\s,)(]|$))?'
+    r'\s*(?:\(\s*(?P<size_after>[^)]*?)\s*\))?'
+    r'\s*(?:of\s+)?',
+    re.IGNORECASE
+)
+# A unit with no amount ("pinch of salt", "cup sugar")
+_UNIT_ONLY = re.compile(r'^\s*(?P<unit>' + _UNIT + r')\.?\s+(?:of\s+)?(?=\S)', re.IGNORECASE)
+_AMOUNT_PART = re.compile(r'\d+\s*/\s*\d+|\d*\.\d+|\d+(?:,\d{3})*|[' + _FRACTION_CHARS + ']')
+_PARENTHETICAL = re.compile(r'\s*\(([^)]*)\)')
+
+# Measurement words normalize_spacing() splits from text glued after an amount
+SPACING_UNITS = ('cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp',
+                 'ounce', 'ounces', 'oz', 'pound', 'pounds', 'lb', 'lbs', 'gram', 'grams',
+                 'ml', 'liter', 'liters', 'pinch', 'dash', 'clove', 'cloves', 'slice', 'slices',
+                 'piece', 'pieces', 'can', 'cans', 'package', 'packages', 'bunch', 'head', 'stalk')
+# Endings that make a longer form of the unit, not a glued word ('pinches', 'sliced')
+_UNIT_INFLECTIONS = frozenset({'s', 'es', 'd', 'ed'})
+# Words that start with a unit but are not one ('1 canned tomato')
+_UNIT_PREFIXED_WORDS = frozenset({'canned', 'candied', 'candy', 'cannellini', 'canola', 'cantaloupe', 'cantaloupes'})
+# An amount, at most one space, and the word after it
+_AMOUNT_WORD = re.compile(r'([\d' + _FRACTION_CHARS + r']) ?([a-zA-Z]+)')
+_SPACING_UNIT_SET = frozenset(SPACING_UNITS)
+_UNIT_PREFIX = re.compile(r'(?:' + '|'.join(sorted(SPACING_UNITS, key=len, reverse=True)) + r')', re.IGNORECASE)
+_WORD = re.compile(r'[a-z]+')
+# A vowel in the first two letters, or a consonant pair that starts English words
+_WORD_START = re.compile(r'.?[aeiouy]|(?:b[lr]|c[hlr]|d[rw]|f[lr]|g[lnr]|k[lnr]|p[hlrs]|s[chklmnpqtw]|t[hrw]|'
+                         r'wh|wr)', re.IGNORECASE)
+_HAS_AMOUNT = re.compile(r'[\d' + _FRACTION_CHARS + r']')
+_WHITESPACE = re.compile(r'\s+')
+
+# Penn Treebank tags; some qu_w_set.csv rows hold a tag sequence where the line should be
+_POS_TAGS = frozenset('CD NN NNS NNP NNPS JJ JJR JJS VB VBD VBG VBN VBP VBZ IN DT CC TO RB PRP , .'.split())
+
+
+def number_fraction(text):
+    """
+    Exact value of an amount as written
+
+    Args:
+        text: '2', '1 1/2', '1½', '.5', '¾', '1,000' or a NUMBER_WORDS key
+
+    Returns:
+        Fraction, or None if text is not an amount
+    """
+    text = text.strip().lower()
+    if text in NUMBER_WORDS:
+        return Fraction(NUMBER_WORDS[text])
+    total = Fraction(0)
+    found = False
+    for part in _AMOUNT_PART.findall(text):
+        found = True
+        if part in UNICODE_FRACTIONS:
+            total += UNICODE_FRACTIONS[part]
+        elif '/' in part:
+            numerator, denominator = part.split('/')
+            if int(denominator) == 0:
+                return None
+            total += Fraction(int(numerator), int(denominator))
+        else:
+            total += Fraction(part.replace(',', ''))
+    return total if found else None
+
+
+def number_value(text):
+    """Numeric value of an amount as written, as a float (see number_fraction)"""
+    value = number_fraction(text)
+    return None if value is None else float(value)
+
+
+# Word lists whose words make normalize_spacing()'s vocabulary of ingredient words
+VOCABULARY_FILES = ('food_words_.csv', 'coll_words_.csv', 'lookup_words.csv')
+_vocabulary = None
+
+
+def _is_known_word(word):
+    """Check if a word occurs in the VOCABULARY_FILES lists or PREPARATION_WORDS (loaded on first use)"""
+    global _vocabulary
+    if _vocabulary is None:
+        from lexicon import load_csv_words
+        words = set(PREPARATION_WORDS)
+        for filename in VOCABULARY_FILES:
+            for phrase in load_csv_words(filename):
+                words.update(_WORD.findall(phrase))
+        _vocabulary = frozenset(words)
+    return word.lower() in _vocabulary
+
+
+def _split_unit(word):
+    """
+    Split a unit from the word glued after it: (unit, rest), or None
+
+    The longest unit can swallow the first letter of the next word
+    ('cupsugar' is 'cups' + 'ugar'), or stop short of its own ending
+    ('slicedbread' is 'slice' + 'dbread'). The candidate splits are the
+    matched unit, the unit less an inflection (when that is a unit too) and
+    the unit plus one. The first whose rest is a known ingredient word wins
+    ('cup sugar', 'cups flour'), else the first whose rest starts like a
+    word, else the shorter unit, as the legacy splitter did.
+    """
+    if word.lower() in _UNIT_PREFIXED_WORDS:
+        return None
+    unit = _UNIT_PREFIX.match(word)
+    if not unit:
+        return None
+    unit, rest = unit.group(), word[unit.end():]
+    if not rest or rest.lower() in _UNIT_INFLECTIONS:
+        return None
+
+    splits = []
+    for ending in _UNIT_INFLECTIONS:
+        base = unit[:-len(ending)]
+        if unit.lower().endswith(ending) and base.lower() in _SPACING_UNIT_SET:
+            splits.append((base, unit[len(base):] + rest))
+    splits.append((unit, rest))
+    for ending in _UNIT_INFLECTIONS:
+        if rest.lower().startswith(ending) and len(rest) > len(ending):
+            splits.append((unit + rest[:len(ending)], rest[len(ending):]))
+    if len(splits) == 1:
+        return splits[0]
+    for split in splits:
+        if _is_known_word(split[1]):
+            return split
+    # Unknown words: skip rests no English word starts like ('sdemerara')
+    for split in splits:
+        if _WORD_START.match(split[1]):
+            return split
+    return splits[0]
+
+
+def _space_amount_word(match):
+    amount, word = match.groups()
+    split = _split_unit(word)
+    if split:
+        return f"{amount} {split[0]} {split[1]}"
+    return f"{amount} {word}"
+
+
+def normalize_spacing(text):
+    """
+    Restore the spaces scraped ingredient text often loses
+
+    Separates an amount from the word after it and a measurement word from
+    the text glued to it ('¼cuppacked brown sugar' -> '¼ cup packed brown
+    sugar'), then collapses whitespace. One compiled pass; text without a
+    digit or fraction only has its whitespace collapsed.
+    """
+    if _HAS_AMOUNT.search(text):
+        text = _AMOUNT_WORD.sub(_space_amount_word, text)
+    return ' '.join(text.split())
+
+
+def _split_preparation(rest):
+    """Split the text after the unit into (item, preparation)"""
+    notes = _PARENTHETICAL.findall(rest)
+    rest = _PARENTHETICAL.sub(' ', rest)
+    if ',' in rest:
+        item, preparation = rest.split(',', 1)
+    else:
+        words = rest.split()
+        cut = len(words)
+        # Peel trailing preparation words, keeping at least one word of item
+        while cut > 1 and words[cut - 1].lower().strip('.;:') in PREPARATION_WORDS:
+            cut -= 1
+        item, preparation = ' '.join(words[:cut]), ' '.join(words[cut:])
+    preparation = ', '.join(part for part in [preparation.strip(' ,;')] + [note.strip() for note in notes] if part)
+    return _WHITESPACE.sub(' ', item).strip(' ,;-'), _WHITESPACE.sub(' ', preparation)
+
+
+def parse_ingredient(text):
+    """
+    Parse one ingredient line
+
+    Args:
+        text: Ingredient line, e.g. '2 (14.5 ounce) cans diced tomatoes, drained'
+
+    Returns:
+        ParsedIngredient
+    """
+    line = _WHITESPACE.sub(' ', text).strip()
+    quantity = unit = size = ''
+    value = max_value = None
+
+    match = _LEADING.match(line)
+    # "a"/"an" only count as an amount before a unit ("a pinch", not "an onion")
+    if match and (match.group('quantity') or match.group('unit')
+                  or match.group('word').lower() not in ('a', 'an')):
+        if match.group('quantity'):
+            quantity = _WHITESPACE.sub(' ', match.group('quantity'))
+            if match.group('max'):
+                # The low end is everything before the range separator
+                value = number_value(line[match.start('quantity'):match.start('max')])
+                max_value = number_value(match.group('max'))
+            else:
+                value = number_value(quantity)
+        else:
+            quantity = match.group('word')
+            value = number_value(quantity)
+        unit = match.group('unit') or ''
+        size = match.group('size') or match.group('size_after') or ''
+        rest = line[match.end():]
+    else:
+        match = _UNIT_ONLY.match(line)
+        unit = match.group('unit') if match else ''
+        rest = line[match.end():] if match else line
+
+    item, preparation = _split_preparation(rest)
+    canonical_unit = UNIT_ALIASES.get(unit.lower().rstrip('.'), '') if unit else ''
+    return ParsedIngredient(text, quantity, value, max_value, unit, canonical_unit,
+                            _WHITESPACE.sub(' ', size), item, preparation)
+
+
+class IngredientParseEngine:
+    """
+    Batch front end for parse_ingredient
+
+    Ingredient lines repeat a lot across recipes ("1 teaspoon salt"), so
+    results are memoized per exact line.
+    """
+
+    MEMO_SIZE = 50000
+
+    def __init__(self):
+        self._memo = {}
+
+    def parse(self, text):
+        """Parse one line (memoized)"""
+        parsed = self._memo.get(text)
+        if parsed is None:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            parsed = self._memo[text] = parse_ingredient(text)
+        return parsed
+
+    def parse_many(self, texts):
+        """
+        Parse a batch of lines
+
+        Args:
+            texts: Iterable of ingredient lines
+
+        Returns:
+            List of ParsedIngredient, in input order
+        """
+        parse = self.parse
+        return [parse(text) for text in texts]
+
+
+def labelled_lines(filename='qu_w_set.csv'):
+    """
+    Read the labelled ingredient lines of qu_w_set.csv
+
+    Labels are POS-tag spans from the old tagger-based parser: qu_1 holds the
+    tags of the quantity tokens, m_1 those of the measure tokens that follow.
+    They are noisy: 'tbsp', 'g' or 'cup' mis-tagged as adjectives leave an
+    empty measure span on a line that plainly has a unit, so empty measure
+    spans are treated as unlabelled rather than as "no unit".
+
+    Returns:
+        List of (line, quantity, unit) tuples; unit is None where the row
+        has no usable measure label
+    """
+    filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    if not os.path.exists(filepath):
+        print(f"Warning: {filename} not found")
+        return []
+
+    lines = []
+    with open(filepath, encoding='utf-8', errors='replace', newline='') as f:
+        for row in csv.DictReader(f):
+            tokens = row['s'].split()
+            if not tokens or all(token in _POS_TAGS for token in tokens):
+                continue
+            has_quantity = row['qu_1'] not in ('None', '')
+            quantity_length = len(row['qu_1'].split()) if has_quantity else 0
+            unit = None
+            if has_quantity and row['m_1'] != 'None':
+                unit = ' '.join(tokens[quantity_length:quantity_length + len(row['m_1'].split())]) or None
+            lines.append((row['s'], ' '.join(tokens[:quantity_length]), unit))
+    return lines
+
+
+_engine = None
+
+
+def get_engine():
+    """Get the shared process-wide IngredientParseEngine"""
+    global _engine
+    if _engine is None:
+        _engine = IngredientParseEngine()
+    return _engine
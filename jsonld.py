@@ -0,0 +1,185 @@
+"""
+JSON-LD Module
+Locates schema.org/Recipe JSON-LD blocks in raw page bytes
+
+Works on the undecoded HTML without building a DOM, so it can run on a
+partially downloaded page to decide whether the rest of the body is needed,
+and so extraction can skip the BeautifulSoup tree entirely for the (many)
+sites that publish their recipe as JSON-LD. Blocks are decoded with orjson
+when it is installed.
+"""
+import re
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+LD_JSON_OPEN = re.compile(
+    rb'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>',
+    re.IGNORECASE
+)
+SCRIPT_CLOSE = re.compile(rb'</script\s*>', re.IGNORECASE)
+
+# Longest tail kept unscanned so an opening tag split across chunks is still found
+_OPEN_TAG_OVERLAP = 512
+
+# Comment/CDATA wrappers some CMSs put around the JSON inside the script tag
+_BLOCK_WRAPPERS = re.compile(
+    rb'^\s*(?:<!--|(?://|/\*)?\s*<!\[CDATA\[(?:\s*\*/)?)'
+    rb'|(?://|/\*)?\s*(?:\]\]>|-->)(?:\s*\*/)?\s*$'
+)
+
+RecipeData = namedtuple('RecipeData', ['ingredients', 'name', 'image'])
+
+
+def is_recipe_node(node):
+    """Check if a JSON-LD node is a schema.org Recipe"""
+    node_type = node.get('@type', '')
+    return node_type == 'Recipe' or 'Recipe' in str(node_type)
+
+
+def iter_recipe_nodes(data):
+    """Walk lists and @graph containers, yielding Recipe nodes"""
+    if isinstance(data, list):
+        for item in data:
+            yield from iter_recipe_nodes(item)
+    elif isinstance(data, dict):
+        if is_recipe_node(data):
+            yield data
+        if '@graph' in data:
+            yield from iter_recipe_nodes(data['@graph'])
+
+
+def decode_block(block):
+    """Decode one JSON-LD script body, returns None when it isn't valid JSON"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(block)
+        except orjson.JSONDecodeError:
+            pass
+
+    # Lenient fallback: wrappers, raw control characters in strings, and
+    # pages that aren't UTF-8
+    block = _BLOCK_WRAPPERS.sub(b'', block)
+    try:
+        text = block.decode('utf-8')
+    except UnicodeDecodeError:
+        text = block.decode('cp1252', errors='replace')
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def iter_blocks(raw):
+    """Yield the body of every complete ld+json script block in raw HTML bytes"""
+    position = 0
+    while True:
+        opening = LD_JSON_OPEN.search(raw, position)
+        if not opening:
+            return
+        closing = SCRIPT_CLOSE.search(raw, opening.end())
+        if not closing:
+            return
+        yield raw[opening.end():closing.start()]
+        position = closing.end()
+
+
+def find_recipe(block):
+    """Get the first Recipe node with recipeIngredient from one JSON-LD block"""
+    data = decode_block(block)
+    for node in iter_recipe_nodes(data):
+        if node.get('recipeIngredient'):
+            return node
+    return None
+
+
+def _image_url(image):
+    """Get the first URL from a schema.org image (URL, ImageObject or a list of them)"""
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get('url') or image.get('contentUrl')
+    return image if isinstance(image, str) else None
+
+
+def recipe_data(node):
+    """Get the ingredients, name and image of a Recipe node"""
+    ingredients = node.get('recipeIngredient') or []
+    if isinstance(ingredients, str):
+        ingredients = [ingredients]
+    name = node.get('name')
+    return RecipeData(
+        [ingredient for ingredient in ingredients if isinstance(ingredient, str)],
+        name if isinstance(name, str) else None,
+        _image_url(node.get('image'))
+    )
+
+
+def extract_recipe(raw):
+    """
+    Extract the first Recipe with ingredients straight from raw HTML
+
+    Args:
+        raw: Page HTML (bytes or str)
+
+    Returns:
+        RecipeData, or None when no JSON-LD Recipe with ingredients exists
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    for block in iter_blocks(raw):
+        node = find_recipe(block)
+        if node is not None:
+            return recipe_data(node)
+    return None
+
+
+class JSONLDScanner:
+    """
+    Incremental scanner for complete Recipe JSON-LD objects
+
+    Feed it a growing byte buffer; it only re-scans from the first block that
+    was not yet complete, so scanning a streamed page stays linear.
+    """
+
+    def __init__(self):
+        self.position = 0
+        self.recipe = None
+
+    def scan(self, buffer):
+        """
+        Scan newly available bytes of the buffer
+
+        Args:
+            buffer: Everything downloaded so far (bytes or bytearray)
+
+        Returns:
+            True once a complete Recipe object with ingredients has been seen
+        """
+        while self.recipe is None:
+            opening = LD_JSON_OPEN.search(buffer, self.position)
+            if not opening:
+                self.position = max(self.position, len(buffer) - _OPEN_TAG_OVERLAP)
+                return False
+
+            closing = SCRIPT_CLOSE.search(buffer, opening.end())
+            if not closing:
+                # Block still downloading, resume from its opening tag
+                self.position = opening.start()
+                return False
+
+            self.recipe = find_recipe(bytes(buffer[opening.end():closing.start()]))
+            self.position = closing.end()
+
+        return True
+
+
+def has_complete_recipe(raw):
+    """Check if raw HTML contains a complete Recipe JSON-LD object"""
+    return JSONLDScanner().scan(raw)
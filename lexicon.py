@@ -0,0 +1,210 @@
+"""
+Lexicon Module
+Compiled word lists for food-word membership tests
+
+The word lists used to be plain lists, so every membership test was a linear
+scan, and each token went through a regex before the lookup. A Lexicon holds
+the words in a frozenset and normalizes tokens with str.translate tables,
+memoizing the verdict per raw token. classify() and count() check a whole
+token list in one call.
+
+Two normalizers are provided:
+- 'clean': RecipeParser.clean_text semantics for a single word (lowercase,
+  strip, delete <>[]()@#$%^&*;:?" characters)
+- 'alpha': keep only the letters a-z (the Streamlit extractor's rule)
+
+Word lists, lexicons and collocation automata can be precompiled into one
+versioned binary artifact (python build_lexicons.py, or flask
+build-lexicons). When it exists and the checksums of its source CSVs still
+match, the loaders below take everything from it with a single unpickle
+instead of re-reading and re-normalizing the CSVs.
+"""
+import io
+import os
+import re
+import csv
+import pickle
+import hashlib
+from functools import lru_cache
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump whenever Lexicon/PhraseMatcher internals or the artifact layout change
+ARTIFACT_VERSION = 1
+ARTIFACT_PATH = os.environ.get('LANES_LEXICON_ARTIFACT') or os.path.join(BASE_DIR, 'lexicons.bin')
+
+# Characters RecipeParser.clean_text removes
+CLEAN_DELETE_CHARS = '<>[]()@#$%^&*;:?"'
+_CLEAN_TABLE = str.maketrans('', '', CLEAN_DELETE_CHARS)
+
+# Every ASCII character except a-z, for the 'alpha' normalizer
+_ALPHA_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not 'a' <= chr(c) <= 'z'))
+_NON_ALPHA = re.compile(r'[^a-z]')
+
+
+def clean_token(text):
+    """Lowercase, strip and delete the clean_text special characters"""
+    return text.lower().strip().translate(_CLEAN_TABLE)
+
+
+def alpha_token(text):
+    """Lowercase and keep only the letters a-z"""
+    text = text.lower()
+    if text.isascii():
+        return text.translate(_ALPHA_TABLE)
+    return _NON_ALPHA.sub('', text)
+
+
+NORMALIZERS = {'clean': clean_token, 'alpha': alpha_token}
+
+
+class Lexicon:
+    """
+    Immutable word set with a built-in token normalizer
+
+    `word in lexicon` is an exact (already normalized) membership test;
+    match(), classify() and count() normalize raw tokens first.
+    """
+
+    # Distinct raw tokens remembered per lexicon before the memo is reset
+    MEMO_SIZE = 200000
+
+    def __init__(self, words, normalizer='clean'):
+        """
+        Args:
+            words: Iterable of words, stored as given
+            normalizer: 'clean' or 'alpha', applied to looked-up tokens
+        """
+        self.words = frozenset(words)
+        self.normalizer = normalizer
+        self.normalize = NORMALIZERS[normalizer]
+        self._memo = {}
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __or__(self, other):
+        return Lexicon(self.words | frozenset(other), self.normalizer)
+
+    def match(self, token):
+        """Check if a raw token, once normalized, is in the lexicon"""
+        hit = self._memo.get(token)
+        if hit is None:
+            if len(self._memo) >= self.MEMO_SIZE:
+                self._memo.clear()
+            hit = self._memo[token] = self.normalize(token) in self.words
+        return hit
+
+    def classify(self, tokens):
+        """Match every token, returns a list of booleans"""
+        match = self.match
+        return [match(token) for token in tokens]
+
+    def count(self, tokens):
+        """Count the tokens that match"""
+        match = self.match
+        return sum(1 for token in tokens if match(token))
+
+    def any(self, tokens):
+        """Check if at least one token matches"""
+        match = self.match
+        return any(match(token) for token in tokens)
+
+
+def source_checksum(filename):
+    """sha256 of a word-list CSV next to this module, None if it is missing"""
+    try:
+        with open(os.path.join(BASE_DIR, filename), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_artifact(path=ARTIFACT_PATH):
+    """
+    Load the precompiled lexicon artifact
+
+    Only load artifacts you built yourself: the file is a pickle.
+
+    Returns:
+        The artifact dict, or None when it is missing, was built by another
+        ARTIFACT_VERSION, or any source CSV changed since it was built
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: Could not load lexicon artifact {path}: {e}")
+        return None
+
+    if not isinstance(artifact, dict) or artifact.get('version') != ARTIFACT_VERSION:
+        print(f"Warning: Lexicon artifact {path} is from another version, rebuild it (python build_lexicons.py)")
+        return None
+    for filename, checksum in artifact['sources'].items():
+        if source_checksum(filename) != checksum:
+            print(f"Warning: {filename} changed since {path} was built, rebuild it (python build_lexicons.py)")
+            return None
+    return artifact
+
+
+def read_csv_words(filename):
+    """
+    Read every cell of a word-list CSV, stripped and lowercased
+
+    Files are read as UTF-8, falling back to cp1252 for the Latin-1 era
+    lists (lookup_words.csv).
+
+    Returns:
+        Tuple of words (empty with a warning when the file is missing)
+    """
+    filepath = os.path.join(BASE_DIR, filename)
+    if not os.path.exists(filepath):
+        print(f"Warning: {filename} not found. Parser will use basic extraction only.")
+        return ()
+
+    words = []
+    try:
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        try:
+            text = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            text = raw.decode('cp1252', errors='replace')
+        for row in csv.reader(io.StringIO(text, newline='')):
+            words.extend(row)
+    except Exception as e:
+        print(f"Warning: Could not load {filename}: {e}")
+
+    return tuple(w.strip().lower() for w in words if w.strip())
+
+
+@lru_cache(maxsize=None)
+def load_csv_words(filename):
+    """
+    Get the words of a word-list CSV (see read_csv_words)
+
+    Cached per file, so all parsers in a process share one copy.
+    """
+    artifact = load_artifact()
+    if artifact and filename in artifact['csv_words']:
+        return artifact['csv_words'][filename]
+    return read_csv_words(filename)
+
+
+@lru_cache(maxsize=None)
+def load_lexicon(filename, normalizer='clean'):
+    """Get the shared Lexicon for a word-list CSV"""
+    artifact = load_artifact()
+    if artifact and (filename, normalizer) in artifact['lexicons']:
+        return artifact['lexicons'][(filename, normalizer)]
+    return Lexicon(load_csv_words(filename), normalizer)
@@ -134,6 +134,17 @@ class LocalStorageCache(db.Model):
         return False
 
 
+class CanonicalURL(db.Model):
+    """Alias URL -> canonical URL, learned from redirect chains and <link rel=canonical>"""
+    id = db.Column(db.Integer, primary_key=True)
+    alias_hash = db.Column(db.String(64), unique=True, nullable=False)  # WidgetService.url_hash of the alias
+    alias_url = db.Column(db.String(500), nullable=False)
+    canonical_url = db.Column(db.String(500), nullable=False)
+    source = db.Column(db.String(20), default='redirect')  # redirect, rel-canonical
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class AmazonFreshProduct(db.Model):
     """Amazon Fresh product data"""
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,127 @@
+"""
+NLP Module
+Lazy access to NLTK for the code paths that tokenize and POS-tag
+
+Importing nltk costs a few hundred milliseconds, and its data files may have
+to be downloaded. None of the extraction strategies need it, so nothing
+imports nltk at module load any more: the first call that tokenizes or tags
+imports it and checks (once per process) that the data it needs is present,
+downloading missing resources unless LANES_NLTK_DOWNLOAD=0.
+"""
+import os
+import importlib.util
+import threading
+
+
+# Resource name -> nltk.data paths (newer NLTK releases renamed the data packages)
+RESOURCES = {
+    'punkt': ('tokenizers/punkt_tab', 'tokenizers/punkt'),
+    'averaged_perceptron_tagger': ('taggers/averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger'),
+}
+
+# Download packages to try, in order, for each resource
+PACKAGES = {
+    'punkt': ('punkt_tab', 'punkt'),
+    'averaged_perceptron_tagger': ('averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger'),
+}
+
+_nltk = None
+_ready = {}
+_lock = threading.Lock()
+
+
+def nltk_available():
+    """Check if nltk is installed, without importing it"""
+    return _nltk is not None or importlib.util.find_spec('nltk') is not None
+
+
+def get_nltk():
+    """Import nltk on first use"""
+    global _nltk
+    if _nltk is None:
+        import nltk
+        _nltk = nltk
+    return _nltk
+
+
+def downloads_enabled():
+    """Check if missing NLTK data may be downloaded (LANES_NLTK_DOWNLOAD, default on)"""
+    return os.environ.get('LANES_NLTK_DOWNLOAD', '1').lower() not in ('0', 'false', 'no')
+
+
+def _find(nltk, resource):
+    for path in RESOURCES[resource]:
+        try:
+            nltk.data.find(path)
+            return True
+        except LookupError:
+            continue
+    return False
+
+
+def ensure_resource(resource):
+    """
+    Make sure an NLTK data resource is available, downloading it if allowed
+
+    Checked once per process; a failed download is not retried.
+
+    Args:
+        resource: A key of RESOURCES
+
+    Returns:
+        True if the resource can be used
+    """
+    if resource in _ready:
+        return _ready[resource]
+    with _lock:
+        if resource not in _ready:
+            nltk = get_nltk()
+            found = _find(nltk, resource)
+            if not found and downloads_enabled():
+                for package in PACKAGES[resource]:
+                    try:
+                        nltk.download(package, quiet=True)
+                    except Exception:
+                        continue
+                found = _find(nltk, resource)
+            if not found:
+                print(f"Warning: NLTK resource {resource!r} is not available")
+            _ready[resource] = found
+    return _ready[resource]
+
+
+def word_tokenize(text):
+    """Tokenize text with NLTK's word tokenizer (whitespace split without punkt)"""
+    if not ensure_resource('punkt'):
+        return text.split()
+    return get_nltk().word_tokenize(text)
+
+
+def pos_tag(tokens):
+    """
+    POS-tag a list of tokens
+
+    Returns:
+        List of (token, tag) pairs
+
+    Raises:
+        LookupError: The tagger model is not available
+    """
+    if not ensure_resource('averaged_perceptron_tagger'):
+        raise LookupError("NLTK averaged_perceptron_tagger is not available (flask download-nltk-data)")
+    return get_nltk().pos_tag(tokens)
+
+
+def pos_tag_sents(sentences):
+    """
+    POS-tag a batch of token lists with one tagger instance
+
+    Returns:
+        List of [(token, tag), ...] lists, one per sentence
+
+    Raises:
+        LookupError: The tagger model is not available
+    """
+    if not ensure_resource('averaged_perceptron_tagger'):
+        raise LookupError("NLTK averaged_perceptron_tagger is not available (flask download-nltk-data)")
+    return get_nltk().pos_tag_sents(sentences)
@@ -0,0 +1,259 @@
+"""
+Politeness Module
+Per-domain rate limiting and robots.txt handling for recipe fetches
+
+Cache warming from urls.csv or partner sitemaps used to hit individual hosts
+as fast as the network allowed, which gets us 403s. The scheduler gives every
+domain a token bucket (tightened by robots.txt Crawl-delay and by 403/429
+responses), caches robots.txt per origin and interleaves URLs across domains
+so aggregate throughput stays high while each host sees a gentle rate.
+
+Used by the bulk crawler (async) and, optionally, by RecipeFetcher for the
+on-demand parse paths (blocking).
+"""
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+
+DEFAULT_USER_AGENT = 'LANESBot'
+
+
+def domain_of(url):
+    """Get the lowercase hostname of a URL"""
+    return (urlparse(url).hostname or '').lower()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    reserve() always takes a token and returns how long the caller must wait
+    for it, letting the balance go negative. Waiters are therefore served in
+    arrival order and the same bucket works for threads and coroutines.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token, returns the seconds to wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class RobotsCache:
+    """
+    Cache of parsed robots.txt files keyed by origin
+
+    Follows the usual conventions: a missing robots.txt (4xx) allows
+    everything, a server error (5xx) or unreachable host disallows fetching
+    until the entry expires.
+    """
+
+    def __init__(self, fetcher, user_agent=DEFAULT_USER_AGENT, ttl=24 * 3600, max_entries=10000):
+        self.fetcher = fetcher
+        self.user_agent = user_agent
+        self.ttl = ttl
+        # Retry unreachable robots.txt sooner than healthy ones
+        self.error_ttl = min(ttl, 600)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._origin_locks = {}
+
+    def _fetch(self, origin):
+        """Fetch and parse robots.txt, returns (parser, ttl)"""
+        parser = RobotFileParser()
+        try:
+            response = self.fetcher.get(f"{origin}/robots.txt", timeout=5, polite=False)
+            if response.status_code >= 500:
+                parser.disallow_all = True
+                return parser, self.error_ttl
+            elif response.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(response.text.splitlines())
+        except Exception:
+            parser.disallow_all = True
+            return parser, self.error_ttl
+        return parser, self.ttl
+
+    def get(self, url):
+        """Get the RobotFileParser for a URL's origin, fetching it if needed"""
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}".lower()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(origin)
+                return entry[0]
+            origin_lock = self._origin_locks.setdefault(origin, threading.Lock())
+
+        # One fetch per origin; other threads asking for it wait here
+        with origin_lock:
+            with self._lock:
+                entry = self._entries.get(origin)
+                if entry and entry[1] > now:
+                    return entry[0]
+
+            parser, ttl = self._fetch(origin)
+            with self._lock:
+                self._entries[origin] = (parser, time.monotonic() + ttl)
+                self._entries.move_to_end(origin)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._origin_locks.pop(evicted, None)
+            return parser
+
+    def can_fetch(self, url):
+        return self.get(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """Get the Crawl-delay (or Request-rate interval) for a URL, or None"""
+        parser = self.get(url)
+        delay = parser.crawl_delay(self.user_agent)
+        if delay:
+            return float(delay)
+        request_rate = parser.request_rate(self.user_agent)
+        if request_rate and request_rate.requests:
+            return request_rate.seconds / request_rate.requests
+        return None
+
+
+class PolitenessScheduler:
+    """
+    Per-domain politeness for crawls and on-demand fetches
+
+    - Token bucket per domain (rate requests/second, burst capacity)
+    - robots.txt allow/deny and Crawl-delay via RobotsCache
+    - Multiplicative backoff on 403/429, additive recovery on success
+    - Round-robin ordering of URL batches across domains
+    """
+
+    MIN_RATE = 0.05  # Never slower than one request per 20 seconds
+
+    def __init__(self, fetcher, rate=1.0, burst=3, user_agent=DEFAULT_USER_AGENT,
+                 respect_robots=True, robots_ttl=24 * 3600):
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.robots = RobotsCache(fetcher, user_agent=user_agent, ttl=robots_ttl)
+        self._buckets = {}
+        self._base_rates = {}
+        self._lock = threading.Lock()
+        self.stats = {'waited_seconds': 0.0, 'blocked_by_robots': 0, 'backoffs': 0}
+
+    def bucket(self, url):
+        """Get the token bucket for a URL's domain"""
+        domain = domain_of(url)
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[domain] = bucket
+                self._base_rates[domain] = self.rate
+            return bucket
+
+    def allowed(self, url):
+        """
+        Check robots.txt for a URL and apply the host's Crawl-delay
+
+        Blocking: may fetch robots.txt on first use of an origin.
+        """
+        if not self.respect_robots:
+            return True
+
+        if not self.robots.can_fetch(url):
+            with self._lock:
+                self.stats['blocked_by_robots'] += 1
+            return False
+
+        delay = self.robots.crawl_delay(url)
+        if delay:
+            bucket = self.bucket(url)
+            domain = domain_of(url)
+            with self._lock:
+                base_rate = min(self.rate, 1.0 / delay)
+                if base_rate < self._base_rates[domain]:
+                    self._base_rates[domain] = base_rate
+                    bucket.set_rate(min(bucket.rate, base_rate))
+        return True
+
+    def _record_wait(self, wait):
+        if wait:
+            with self._lock:
+                self.stats['waited_seconds'] += wait
+
+    def acquire(self, url):
+        """Block until a request to the URL's domain is allowed"""
+        wait = self.bucket(url).reserve()
+        self._record_wait(wait)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        """Wait (without blocking the event loop) until a request is allowed"""
+        wait = self.bucket(url).reserve()
+        self._record_wait(wait)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record_response(self, url, status_code):
+        """
+        Adapt the domain's rate to the response
+
+        403/429 halve the rate; successes recover 10% of the base rate per
+        response until the base rate is reached again.
+        """
+        bucket = self.bucket(url)
+        domain = domain_of(url)
+        with self._lock:
+            base_rate = self._base_rates[domain]
+            if status_code in (403, 429):
+                self.stats['backoffs'] += 1
+                new_rate = max(self.MIN_RATE, bucket.rate / 2)
+            elif status_code < 400 and bucket.rate < base_rate:
+                new_rate = min(base_rate, bucket.rate + base_rate * 0.1)
+            else:
+                return
+        bucket.set_rate(new_rate)
+
+    @staticmethod
+    def round_robin(urls):
+        """
+        Interleave URLs across domains
+
+        Takes one URL from each domain in turn (domains in first-seen order),
+        so a long run of URLs from one site can't starve the others.
+        """
+        queues = OrderedDict()
+        for url in urls:
+            queues.setdefault(domain_of(url), deque()).append(url)
+
+        while queues:
+            for domain in list(queues):
+                queue = queues[domain]
+                yield queue.popleft()
+                if not queue:
+                    del queues[domain]
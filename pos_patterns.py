@@ -0,0 +1,152 @@
+"""
+POS Patterns Module
+Classifies ingredient lines by their part-of-speech tag sequence
+
+coded_patterns.csv lists the tag sequences of known ingredient lines
+("CD CC CD JJ NN" for "2 or 3 large onions"), as produced by the legacy
+parser: line lowercased, punctuation stripped, NLTK's perceptron tagger run
+over its words. A TagPatternAutomaton compiles them into a trie over tag
+symbols (a DFA whose accepting states end a pattern), so a tagged line is
+classified in one left to right scan of its tags.
+
+Tagging is the expensive part. PatternScorer gets tag sequences from a
+pos_tagger.TaggingService, which normalizes each line the way the legacy
+parser did and memoizes the sequence per normalized line, so the tagger
+runs at most once per distinct line. The scorer is an optional
+stage of ExtractionPipeline.is_likely_ingredient(); set LANES_POS_PATTERNS=1
+to enable it by default (it needs NLTK and its tagger data).
+"""
+import os
+import threading
+
+from lexicon import read_csv_words
+from pos_tagger import get_tagging_service
+
+
+PATTERN_FILE = 'coded_patterns.csv'
+
+
+def load_tag_patterns(filename=PATTERN_FILE):
+    """
+    Read tag sequences from a pattern CSV (one space-separated sequence per line)
+
+    Returns:
+        List of tag tuples, e.g. ('CD', 'CC', 'CD', 'JJ', 'NN')
+    """
+    return [tuple(pattern.upper().split()) for pattern in read_csv_words(filename)]
+
+
+class TagPatternAutomaton:
+    """
+    Trie over POS tags; a state accepts when a pattern ends there
+
+    Patterns are anchored at both ends, so no failure links are needed: a
+    scan stops at the first tag with no transition.
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: Iterable of tag sequences (tuples or space-separated strings)
+        """
+        self._goto = [{}]
+        self._accept = [False]
+        count = 0
+        for pattern in patterns:
+            tags = pattern.split() if isinstance(pattern, str) else pattern
+            if not tags:
+                continue
+            state = 0
+            for tag in tags:
+                next_state = self._goto[state].get(tag)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][tag] = next_state
+                    self._goto.append({})
+                    self._accept.append(False)
+                state = next_state
+            if not self._accept[state]:
+                self._accept[state] = True
+                count += 1
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def longest_match(self, tags):
+        """
+        Length of the longest pattern that is a prefix of tags
+
+        Args:
+            tags: Sequence of POS tags
+
+        Returns:
+            Number of tags matched, 0 if no pattern matches
+        """
+        goto, accept = self._goto, self._accept
+        state = longest = 0
+        for position, tag in enumerate(tags, 1):
+            state = goto[state].get(tag)
+            if state is None:
+                break
+            if accept[state]:
+                longest = position
+        return longest
+
+    def match(self, tags):
+        """Check if tags is exactly one of the patterns"""
+        tags = list(tags)
+        return bool(tags) and self.longest_match(tags) == len(tags)
+
+    def score(self, tags):
+        """Fraction of tags covered by the longest matching pattern prefix (1.0 = exact match)"""
+        tags = list(tags)
+        return self.longest_match(tags) / len(tags) if tags else 0.0
+
+
+class PatternScorer:
+    """
+    Scores lines against a TagPatternAutomaton, tagging them through a TaggingService
+    """
+
+    def __init__(self, automaton=None, service=None, threshold=1.0):
+        """
+        Args:
+            automaton: TagPatternAutomaton, defaults to coded_patterns.csv
+            service: pos_tagger.TaggingService, defaults to the shared one
+            threshold: Minimum score for is_ingredient() (1.0 = exact pattern)
+        """
+        self.automaton = automaton or TagPatternAutomaton(load_tag_patterns())
+        self.service = service or get_tagging_service()
+        self.threshold = threshold
+
+    def score(self, text):
+        """Pattern score of a line (see TagPatternAutomaton.score)"""
+        return self.automaton.score(self.service.tag(text).split())
+
+    def score_many(self, texts):
+        """Pattern scores of a batch of lines, tagged in one service call"""
+        return [self.automaton.score(tags.split()) for tags in self.service.tag_many(texts)]
+
+    def is_ingredient(self, text):
+        """Check if a line's tag sequence scores at least the threshold"""
+        return self.score(text) >= self.threshold
+
+
+def pos_patterns_enabled():
+    """Check if the POS-pattern stage is on by default (LANES_POS_PATTERNS, default off)"""
+    return os.environ.get('LANES_POS_PATTERNS', '0').lower() in ('1', 'true', 'yes')
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_pattern_scorer():
+    """Get the shared process-wide PatternScorer"""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = PatternScorer()
+    return _scorer
@@ -0,0 +1,165 @@
+"""
+POS Tagger Module
+Batch part-of-speech tagging with memoized tag sequences
+
+The same ingredient lines ("1 teaspoon salt", "2 eggs") turn up in
+thousands of recipes, and NLTK's perceptron tagger is the slowest step of
+classifying them. TaggingService normalizes a batch of lines, dedupes them,
+tags only the lines it has not seen in one nltk.pos_tag_sents() call and
+memoizes the results in a bounded LRU, optionally backed by an append-only
+TagStore file shared across processes and restarts.
+
+Tag sequences are space-separated strings ("CD NN NNS"), the shape of
+coded_patterns.csv and of the l_p column of qu_w_set.csv.
+"""
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+
+import nlp
+
+
+# Characters the legacy parser stripped before tagging (Parser v.3.0 clean_line)
+_STRIP_CHARS = re.compile(r'[<>\[\]()!@#$%^&*;,:?"]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_line(text):
+    """Lowercase, strip the legacy punctuation set and collapse whitespace"""
+    return _WHITESPACE.sub(' ', _STRIP_CHARS.sub('', text.lower())).strip()
+
+
+class TagStore:
+    """
+    Append-only JSON-lines file of normalized line -> tag sequence
+
+    Loaded into memory once; writes append, so concurrent workers only ever
+    add entries (a torn final line is skipped on load).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tags = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._tags[entry['line']] = entry['tags']
+
+    def __len__(self):
+        return len(self._tags)
+
+    def get(self, line):
+        return self._tags.get(line)
+
+    def put_many(self, items):
+        """Store (line, tags) pairs that are not stored yet"""
+        with self._lock:
+            new = [(line, tags) for line, tags in items if line not in self._tags]
+            if not new:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for line, tags in new:
+                    f.write(json.dumps({'line': line, 'tags': tags}) + '\n')
+                    self._tags[line] = tags
+
+
+class TaggingService:
+    """Deduplicating batch tagger with an LRU of tag sequences and an optional TagStore"""
+
+    CACHE_SIZE = 20000
+
+    def __init__(self, tagger=None, cache_size=CACHE_SIZE, store=None):
+        """
+        Args:
+            tagger: Function (list of token lists) -> list of [(token, tag), ...],
+                defaults to nlp.pos_tag_sents
+            cache_size: Tag sequences kept in memory
+            store: TagStore (or its path) for sequences that outlive the process
+        """
+        self.tagger = tagger or nlp.pos_tag_sents
+        self.cache_size = cache_size
+        self.store = TagStore(store) if isinstance(store, str) else store
+        self.stats = {'lines': 0, 'hits': 0, 'store_hits': 0, 'tagged': 0, 'batches': 0}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, line, tags):
+        self._cache[line] = tags
+        self._cache.move_to_end(line)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def tag_many(self, lines):
+        """
+        Tag sequences for a batch of lines
+
+        Args:
+            lines: Iterable of ingredient lines (normalized here)
+
+        Returns:
+            List of tag sequence strings, in input order ('' for empty lines)
+
+        Raises:
+            LookupError: Untagged lines remain and the tagger model is missing
+        """
+        keys = [normalize_line(line) for line in lines]
+        found = {'': ''}
+        missing = []
+        with self._lock:
+            self.stats['lines'] += len(keys)
+            for key in dict.fromkeys(keys):
+                if key in found:
+                    continue
+                tags = self._cache.get(key)
+                if tags is not None:
+                    self._cache.move_to_end(key)
+                    self.stats['hits'] += 1
+                elif self.store is not None and self.store.get(key) is not None:
+                    tags = self.store.get(key)
+                    self._remember(key, tags)
+                    self.stats['store_hits'] += 1
+                else:
+                    missing.append(key)
+                    continue
+                found[key] = tags
+
+        if missing:
+            tagged = [' '.join(tag for _, tag in sentence)
+                      for sentence in self.tagger([key.split() for key in missing])]
+            with self._lock:
+                self.stats['tagged'] += len(missing)
+                self.stats['batches'] += 1
+                for key, tags in zip(missing, tagged):
+                    self._remember(key, tags)
+                    found[key] = tags
+            if self.store is not None:
+                self.store.put_many(zip(missing, tagged))
+
+        return [found[key] for key in keys]
+
+    def tag(self, line):
+        """Tag sequence of one line"""
+        return self.tag_many([line])[0]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_tagging_service():
+    """Get the shared TaggingService (persisted to LANES_TAG_STORE when set)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TaggingService(store=os.environ.get('LANES_TAG_STORE') or None)
+    return _service
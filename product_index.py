@@ -0,0 +1,147 @@
+"""
+Product Index Module
+Inverted token index for matching ingredients to catalog products
+
+AmazonFreshService.match_ingredient_to_product used to test every catalog
+keyword as a substring of the ingredient, then run SequenceMatcher against
+every keyword: O(catalog) per ingredient. A ProductIndex is built once per
+catalog version and keeps, for each keyword's first token, the keywords
+starting with it, so the exact stage costs one postings lookup per
+ingredient token whatever the catalog size.
+
+Tokens are lowercased words, singularized, so "1 egg" finds "eggs" and
+"tomatoes" finds "tomato". When several keywords match, the one with the
+most words wins ("sour cream" over "cream"), then catalog order. Failing a
+whole-word match, a one-word keyword that starts or ends an ingredient word
+still matches ("mayonnaise" -> "mayo", "flatbreads" -> "bread"), as the old
+substring scan did, at one lookup per prefix and suffix; keywords inside a
+word ("salt" in "unsalted") no longer match.
+
+The fuzzy stage keeps SequenceMatcher's scores but only scores keywords
+whose length and character counts can still beat the best score so far
+(difflib's real_quick_ratio / quick_ratio upper bounds).
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+
+from collocations import tokenize
+from quantities import singularize
+
+
+def match_tokens(text):
+    """Lowercase, singular word tokens of a keyword or ingredient"""
+    return [singularize(token) for token in tokenize(text)]
+
+
+class ProductIndex:
+    """Token postings and length buckets over a keyword -> product catalog"""
+
+    MIN_AFFIX = 3
+
+    def __init__(self, catalog, version=None):
+        """
+        Args:
+            catalog: Dict of keyword -> product dict, in priority order
+            version: Catalog version the index was built for
+        """
+        self.version = version
+        self.entries = list(catalog.items())
+        self._postings = {}
+        for rank, (keyword, _) in enumerate(self.entries):
+            tokens = tuple(match_tokens(keyword))
+            if tokens:
+                self._postings.setdefault(tokens[0], []).append((rank, tokens))
+        # Longest keyword first, then catalog order
+        for postings in self._postings.values():
+            postings.sort(key=lambda posting: (-len(posting[1]), posting[0]))
+        # One-word keywords (as written, 3+ letters) for prefix/suffix matches
+        self._affixes = {}
+        for rank, (keyword, _) in enumerate(self.entries):
+            words = tokenize(keyword)
+            if len(words) == 1 and len(words[0]) >= self.MIN_AFFIX:
+                self._affixes.setdefault(words[0], rank)
+        self._lengths = sorted((len(keyword), rank) for rank, (keyword, _) in enumerate(self.entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def exact(self, ingredient_text):
+        """
+        Best keyword match: whole words first, then one-word keywords as a prefix or suffix
+
+        Returns:
+            (keyword, product), or None if no keyword occurs in the ingredient
+        """
+        words = tokenize(ingredient_text)
+        tokens = [singularize(word) for word in words]
+        best = None
+        for position, token in enumerate(tokens):
+            for rank, keyword_tokens in self._postings.get(token, ()):
+                if best is not None and (-len(keyword_tokens), rank) >= best:
+                    # Postings are sorted, so nothing later in this list beats best
+                    break
+                if tuple(tokens[position:position + len(keyword_tokens)]) == keyword_tokens:
+                    best = (-len(keyword_tokens), rank)
+                    break
+        if best:
+            return self.entries[best[1]]
+
+        affixes = self._affixes
+        ranks = [affixes[word[:size]] for word in words for size in range(self.MIN_AFFIX, len(word))
+                 if word[:size] in affixes]
+        ranks += [affixes[word[-size:]] for word in words for size in range(self.MIN_AFFIX, len(word))
+                  if word[-size:] in affixes]
+        return self.entries[min(ranks)] if ranks else None
+
+    def fuzzy(self, ingredient_text, threshold=0.4):
+        """
+        Most similar keyword by SequenceMatcher ratio, first in catalog order on ties
+
+        Returns:
+            (score, keyword, product), or None if no ratio exceeds threshold
+        """
+        text = ingredient_text.lower()
+        length = len(text)
+        if not length:
+            return None
+        # ratio <= 2 * min(len) / total > threshold bounds the keyword lengths worth scoring
+        low = int(threshold * length / (2 - threshold))
+        high = int((2 - threshold) * length / threshold) + 1
+        ranks = sorted(rank for _, rank in
+                       self._lengths[bisect_right(self._lengths, (low, len(self.entries))):
+                                     bisect_left(self._lengths, (high + 1, -1))])
+
+        matcher = SequenceMatcher(None, text)
+        best_score, best_rank = threshold, None
+        for rank in ranks:
+            matcher.set_seq2(self.entries[rank][0])
+            if matcher.real_quick_ratio() > best_score and matcher.quick_ratio() > best_score:
+                score = matcher.ratio()
+                if score > best_score:
+                    best_score, best_rank = score, rank
+        if best_rank is None:
+            return None
+        keyword, product = self.entries[best_rank]
+        return (best_score, keyword, product)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_product_index(catalog, version):
+    """
+    Get the ProductIndex for a catalog version, building it on first use
+
+    Args:
+        catalog: Dict of keyword -> product dict
+        version: Hashable catalog version; bump it when the catalog changes
+    """
+    index = _indexes.get(version)
+    if index is None:
+        with _lock:
+            index = _indexes.get(version)
+            if index is None:
+                index = _indexes[version] = ProductIndex(catalog, version)
+    return index
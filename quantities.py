@@ -0,0 +1,258 @@
+"""
+Quantities Module
+Exact ingredient amounts, unit conversion and cart aggregation
+
+Amounts are Fractions, so "1/3 cup" three times is exactly one cup. Units
+are the canonical names of ingredient_parser.UNITS; volumes convert through
+milliliters and weights through grams (US customary sizes are exact
+multiples of the teaspoon), and a table of densities in grams per cup
+converts volume to weight for common staples.
+
+aggregate() merges the lines of a cart by canonical item ("2 cups flour" and
+"1/2 cup flour, sifted" from two recipes become 2 1/2 cups of flour), or by
+any key of the item, such as the product it matches ("2 cups all-purpose
+flour" and "1 lb flour" both buy "All-Purpose Flour, 5 lb"), so the product
+is priced once; packages_needed() turns the total into a package count for
+a product size such as "5 lb".
+"""
+import re
+import math
+from fractions import Fraction
+from collections import OrderedDict, namedtuple
+
+from ingredient_parser import get_engine, number_fraction, parse_ingredient
+
+
+# amount / max_amount: Fractions (max_amount is None unless the line gives a
+# range); unit: canonical unit name, '' for a plain count ("3 eggs")
+Quantity = namedtuple('Quantity', ['amount', 'max_amount', 'unit'])
+
+# Cart lines merged by key (canonical item by default): indexes into the input, the texts
+# merged, the total (upper end of ranges) in unit, or amount None when no
+# line had an amount or one had a unit that does not convert to the others
+CartLine = namedtuple('CartLine', ['key', 'item', 'indexes', 'texts', 'amount', 'unit'])
+
+TEASPOON_ML = Fraction('4.92892159375')
+CUP_ML = 48 * TEASPOON_ML
+
+# Canonical unit -> (dimension, size in the dimension's base unit: ml or g)
+UNIT_SIZES = {
+    'pinch': ('volume', TEASPOON_ML / 16),
+    'dash': ('volume', TEASPOON_ML / 8),
+    'teaspoon': ('volume', TEASPOON_ML),
+    'tablespoon': ('volume', 3 * TEASPOON_ML),
+    'fluid ounce': ('volume', 6 * TEASPOON_ML),
+    'cup': ('volume', CUP_ML),
+    'pint': ('volume', 2 * CUP_ML),
+    'quart': ('volume', 4 * CUP_ML),
+    'gallon': ('volume', 16 * CUP_ML),
+    'milliliter': ('volume', Fraction(1)),
+    'liter': ('volume', Fraction(1000)),
+    'milligram': ('weight', Fraction(1, 1000)),
+    'gram': ('weight', Fraction(1)),
+    'kilogram': ('weight', Fraction(1000)),
+    'ounce': ('weight', Fraction('28.349523125')),
+    'pound': ('weight', Fraction('453.59237')),
+}
+
+# Grams per US cup, for volume <-> weight conversion (matched on the item's last words)
+DENSITIES = {
+    'flour': 125, 'bread flour': 130, 'whole wheat flour': 120, 'sugar': 200, 'brown sugar': 220,
+    'powdered sugar': 120, 'butter': 227, 'water': 237, 'milk': 245, 'cream': 238, 'sour cream': 230,
+    'yogurt': 245, 'olive oil': 216, 'oil': 218, 'honey': 340, 'maple syrup': 315, 'salt': 292,
+    'rice': 185, 'oats': 90, 'cocoa powder': 85, 'cheese': 113, 'parmesan': 100,
+}
+
+# Words that do not change what to buy ("2 large eggs" and "3 eggs" are one item)
+SIZE_WORDS = frozenset({'small', 'medium', 'large', 'extra', 'jumbo', 'fresh', 'freshly'})
+
+_NON_WORD = re.compile(r'[^a-z\s]')
+_RANGE_SEPARATOR = re.compile(r'\s*(?:-|–|—|\bto\b|\bor\b)\s*')
+
+
+def parse_amount(text):
+    """
+    Parse an amount or range as written
+
+    Args:
+        text: '2', '1 1/2', '1½', '2-3', '1 to 1 1/2', 'a half'
+
+    Returns:
+        (amount, max_amount) Fractions, max_amount None unless a range;
+        (None, None) if text is not an amount
+    """
+    parts = _RANGE_SEPARATOR.split(text.strip(), maxsplit=1)
+    amount = number_fraction(parts[0]) if parts[0] else None
+    max_amount = number_fraction(parts[1]) if len(parts) > 1 else None
+    if amount is None:
+        return (max_amount, None)
+    return (amount, max_amount)
+
+
+def ingredient_quantity(parsed):
+    """
+    Quantity of a parsed ingredient line
+
+    A package size multiplies the count: "2 (14.5 ounce) cans" is 29 ounces.
+
+    Args:
+        parsed: ingredient_parser.ParsedIngredient
+
+    Returns:
+        Quantity, or None when the line gives no amount
+    """
+    amount, max_amount = parse_amount(parsed.quantity) if parsed.quantity else (None, None)
+    if amount is None:
+        return None
+    if parsed.size:
+        size = parse_quantity(parsed.size)
+        if size is not None and size.unit:
+            return Quantity(amount * size.amount,
+                            max_amount * size.amount if max_amount is not None else None, size.unit)
+    return Quantity(amount, max_amount, parsed.canonical_unit)
+
+
+def parse_quantity(text):
+    """Quantity of a line or package size ('2 cups flour', '5 lb', '12 count'), None if it has no amount"""
+    return ingredient_quantity(parse_ingredient(text))
+
+
+def density(item):
+    """Grams per cup for an item, from the longest DENSITIES key its name ends with (None if unknown)"""
+    words = _NON_WORD.sub(' ', item.lower()).split()
+    for start in range(len(words)):
+        key = ' '.join(words[start:])
+        if key in DENSITIES:
+            return Fraction(DENSITIES[key])
+        singular = singularize(key)
+        if singular in DENSITIES:
+            return Fraction(DENSITIES[singular])
+    return None
+
+
+def conversion_factor(from_unit, to_unit, item=''):
+    """
+    Factor converting amounts in from_unit to to_unit
+
+    Counts and units outside UNIT_SIZES (cans, cloves) only convert to
+    themselves; volume and weight convert through the item's density.
+
+    Returns:
+        Fraction, or None if the units do not convert
+    """
+    if from_unit == to_unit:
+        return Fraction(1)
+    if from_unit not in UNIT_SIZES or to_unit not in UNIT_SIZES:
+        return None
+    from_dimension, from_size = UNIT_SIZES[from_unit]
+    to_dimension, to_size = UNIT_SIZES[to_unit]
+    if from_dimension == to_dimension:
+        return from_size / to_size
+    grams_per_cup = density(item)
+    if grams_per_cup is None:
+        return None
+    grams_per_ml = grams_per_cup / CUP_ML
+    if from_dimension == 'volume':
+        return from_size * grams_per_ml / to_size
+    return from_size / grams_per_ml / to_size
+
+
+def convert(amount, from_unit, to_unit, item=''):
+    """Convert an amount between units (see conversion_factor); None if they do not convert"""
+    factor = conversion_factor(from_unit, to_unit, item)
+    return None if factor is None else amount * factor
+
+
+def singularize(word):
+    """Crude English singular of the last word of a name ('tomatoes' -> 'tomato')"""
+    head, _, last = word.rpartition(' ')
+    if last.endswith('ies') and len(last) > 4:
+        last = last[:-3] + 'y'
+    elif last.endswith(('oes', 'shes', 'ches', 'sses', 'xes')):
+        last = last[:-2]
+    elif last.endswith('s') and not last.endswith(('ss', 'us', 'is')) and len(last) > 3:
+        last = last[:-1]
+    return f"{head} {last}" if head else last
+
+
+def canonical_item(item):
+    """Key that merges spellings of one item: lowercase letters, no size words, singular"""
+    words = _NON_WORD.sub(' ', item.lower()).split()
+    return singularize(' '.join(word for word in words if word not in SIZE_WORDS) or ' '.join(words))
+
+
+def aggregate(texts, key=None):
+    """
+    Merge ingredient lines by canonical item, summing their amounts exactly
+
+    Each group keeps the unit of its first line; later lines convert into it
+    with one factor lookup per line, using the line's own item for volume <->
+    weight (ranges count at their upper end, so the cart buys enough).
+
+    Args:
+        texts: Ingredient lines, in cart order
+        key: Function item -> group key, e.g. the product an item matches;
+            defaults to canonical_item
+
+    Returns:
+        List of CartLine, in order of each group's first line
+    """
+    groups = OrderedDict()
+    for index, (text, parsed) in enumerate(zip(texts, get_engine().parse_many(texts))):
+        item = parsed.item or text
+        group_key = key(item) if key else canonical_item(item) or text.lower()
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = {'item': item, 'indexes': [], 'texts': [], 'amount': None,
+                                         'unit': None, 'convertible': True}
+        group['indexes'].append(index)
+        group['texts'].append(text)
+
+        quantity = ingredient_quantity(parsed)
+        if quantity is None or not group['convertible']:
+            # "salt, to taste" adds nothing to the total
+            continue
+        amount = quantity.max_amount if quantity.max_amount is not None else quantity.amount
+        if group['unit'] is None:
+            group['unit'], group['amount'] = quantity.unit, Fraction(0)
+        factor = conversion_factor(quantity.unit, group['unit'], item)
+        if factor is None:
+            group['convertible'], group['amount'] = False, None
+        else:
+            group['amount'] += amount * factor
+
+    return [CartLine(group_key, group['item'], group['indexes'], group['texts'], group['amount'],
+                     group['unit'] or '')
+            for group_key, group in groups.items()]
+
+
+def packages_needed(line, package):
+    """
+    Packages of a product size that cover a cart line
+
+    Args:
+        line: CartLine
+        package: Package size as written ('5 lb', '12 count', '1 Gallon')
+
+    Returns:
+        Package count, at least 1 (1 when the amounts do not compare)
+    """
+    size = parse_quantity(package)
+    if line.amount is None or size is None or not size.amount:
+        return 1
+    # '12 count' has no unit alias, so it parses as a plain count of 12
+    factor = conversion_factor(line.unit, size.unit, line.item)
+    if factor is None:
+        return 1
+    return max(1, math.ceil(line.amount * factor / size.amount))
+
+
+def format_amount(amount):
+    """Mixed-number text for a Fraction: '2 1/2', '1/3', '3'"""
+    if amount is None:
+        return ''
+    whole, remainder = divmod(amount, 1)
+    remainder = Fraction(remainder).limit_denominator(16)
+    if not remainder:
+        return str(int(whole))
+    return f"{int(whole)} {remainder}" if whole else str(remainder)
@@ -4,12 +4,28 @@ Modernized version of Parser v.2.9 for Python 3
 Extracts ingredients from recipe URLs using NLP techniques
 """
 import re
-import csv
 import os
-import requests
-from bs4 import BeautifulSoup
-import nltk
+import html
+from bs4.element import NavigableString, CData
 from collections import namedtuple
+from urllib.parse import urljoin, urlparse
+
+from fetcher import get_fetcher
+from html_backends import make_soup, xpath_texts
+from jsonld import JSONLDScanner, extract_recipe
+from lexicon import clean_token, load_lexicon
+from collocations import load_phrase_matcher
+from ingredient_parser import get_engine, normalize_spacing
+from resolver import get_resolver, UnsafeURLError
+from selector_engine import SelectorSet
+
+
+# Outcome of parsing a URL: the ingredients plus the URL aliases seen on the way
+ParsedPage = namedtuple('ParsedPage', ['ingredients', 'final_url', 'redirects', 'canonical_url'])
+
+# <link ...> tags and their attributes, for reading rel=canonical without a DOM
+LINK_TAG = re.compile(rb'<link\b[^>]*>', re.IGNORECASE)
+TAG_ATTRIBUTE = re.compile(rb'([a-zA-Z][\w:-]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
 
 
 class RecipeParser:
@@ -19,48 +35,52 @@ class RecipeParser:
     MAX_INGREDIENTS = 50  # Maximum number of ingredients to extract
     MIN_FOOD_DENSITY = 0.25  # Minimum ratio of food words to total words
     
-    def __init__(self):
-        """Initialize the parser with word lists and patterns"""
-        self.base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.food_words = self._load_csv('food_words_.csv')
-        self.coll_words = self._load_csv('coll_words_.csv')
-        
-        # Ensure NLTK data is available
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt', quiet=True)
-            nltk.download('averaged_perceptron_tagger', quiet=True)
+    # Common ingredient markup patterns, in priority order
+    SEMANTIC_SELECTORS = SelectorSet([
+        # Schema.org microdata
+        '[itemprop="recipeIngredient"]',
+        '[itemprop="ingredients"]',
+        # Common class names
+        '.ingredient',
+        '.ingredients li',
+        '.recipe-ingredients li',
+        '.ingredient-list li',
+        # Common ID patterns
+        '#ingredients li',
+        '#ingredient-list li',
+    ])
     
-    def _load_csv(self, filename):
-        """Load words from CSV file"""
-        words = []
-        filepath = os.path.join(self.base_dir, filename)
-        
-        if not os.path.exists(filepath):
-            print(f"Warning: {filename} not found. Parser will use basic extraction only.")
-            return words
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if row:
-                        words.extend(row)
-        except Exception as e:
-            print(f"Warning: Could not load {filename}: {e}")
-        
-        return [w.strip().lower() for w in words if w.strip()]
+    def __init__(self, fetcher=None, http_cache=None):
+        """
+        Initialize the parser with word lists and patterns
+
+        Args:
+            fetcher: RecipeFetcher used to download pages. Defaults to the
+                shared process-wide fetcher so connections are pooled.
+            http_cache: Optional HTTPCache used to revalidate pages with
+                conditional GETs and reuse stored extraction results
+        """
+        self.fetcher = fetcher or get_fetcher()
+        self.http_cache = http_cache
+        # Share the fetcher's resolver so validation and connect use one lookup
+        self.resolver = getattr(self.fetcher, 'resolver', None) or get_resolver()
+        self.base_dir = os.path.dirname(os.path.abspath(__file__))
+        # Compiled, process-wide word sets (see lexicon)
+        self.food_words = load_lexicon('food_words_.csv')
+        self.coll_words = load_lexicon('coll_words_.csv')
+        # Multi-word phrases (coll_words_.csv, lookup_words.csv) as one automaton
+        self.collocations = load_phrase_matcher()
+        # Structured quantity/unit/item parsing (see ingredient_parser)
+        self.ingredient_engine = get_engine()
+        # NLTK is loaded on demand by the POS-tagging paths (see nlp)
     
     def clean_text(self, text):
         """Clean and normalize text"""
         if isinstance(text, list):
             text = ' '.join(text)
         
-        # Remove special characters but keep basic punctuation
-        text = text.lower().strip()
-        text = re.sub(r'[<>\[\]()@#$%^&*;:?"]+', '', text)
-        return text
+        # Restore lost spaces ('2cups' -> '2 cups'), then remove special characters
+        return clean_token(normalize_spacing(text))
     
     def get_ingredients(self, url):
         """
@@ -72,87 +92,181 @@ class RecipeParser:
         Returns:
             List of ingredient strings
         """
-        try:
-            # Validate URL to prevent SSRF attacks
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            
-            # Only allow HTTP and HTTPS schemes
-            if parsed.scheme not in ('http', 'https'):
-                print(f"Invalid URL scheme: {parsed.scheme}")
-                return []
+        return self.parse(url).ingredients
+    
+    def parse(self, url, schema=None):
+        """
+        Extract ingredients from a recipe URL and report where it led
+        
+        Args:
+            url: Recipe URL to parse
+            schema: Optional PCPSchema whose ingredient selector is tried
+                before the generic strategies
             
-            # Block access to localhost and private IP ranges
-            hostname = parsed.hostname
-            if hostname:
-                hostname_lower = hostname.lower()
-                # Block localhost
-                if hostname_lower in ('localhost', '127.0.0.1', '::1'):
-                    print("Access to localhost is not allowed")
-                    return []
-                # Block private IP ranges (basic check)
-                if hostname_lower.startswith(('10.', '172.16.', '172.17.', '172.18.', 
-                                               '172.19.', '172.20.', '172.21.', '172.22.',
-                                               '172.23.', '172.24.', '172.25.', '172.26.',
-                                               '172.27.', '172.28.', '172.29.', '172.30.',
-                                               '172.31.', '192.168.')):
-                    print("Access to private IP addresses is not allowed")
-                    return []
+        Returns:
+            ParsedPage with the ingredients, the final URL after redirects,
+            the redirect chain and the page's <link rel=canonical> target
+        """
+        failed = ParsedPage([], url, (), None)
+        try:
+            # Validate URL to prevent SSRF attacks: only http(s), and the host
+            # must resolve exclusively to public addresses (checked per IP,
+            # cached, and the fetcher connects to those same addresses)
+            # (skipped when replaying archived pages: nothing is fetched)
+            try:
+                if not getattr(self.fetcher, 'replay', False):
+                    self.resolver.check_url(url)
+            except UnsafeURLError as e:
+                print(f"Blocked URL: {e}")
+                return failed
             
-            # Fetch the webpage
+            # Fetch the webpage through the shared connection pools
             # Note: This is intentionally fetching user-provided URLs (the core feature)
-            # We validate above to block localhost and private IPs to mitigate SSRF
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-            response.raise_for_status()
-            response.raise_for_status()
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try multiple strategies to find ingredients
-            ingredients = []
-            
-            # Strategy 1: Look for common ingredient list patterns
-            ingredients = self._extract_by_semantic_markup(soup)
-            
-            # Strategy 2: If no ingredients found, use food word density
-            if not ingredients:
-                ingredients = self._extract_by_food_density(soup)
+            if self.http_cache:
+                variant = self.extraction_variant(schema)
+                page = self.http_cache.fetch(self.fetcher, url, variant=variant, timeout=10)
+                # 304 Not Modified: the stored extraction result (and the
+                # rel=canonical target stored with it) is still valid
+                if page.result is not None:
+                    return ParsedPage(page.result, page.url, page.redirects, page.canonical_url)
+                
+                ingredients = self.extract_ingredients(page.content, schema)
+                canonical_url = self.find_canonical_url(page.content, page.url)
+                self.http_cache.store_result(url, ingredients, variant, canonical_url)
+                return ParsedPage(ingredients, page.url, page.redirects, canonical_url)
             
-            # Strategy 3: Look for lists with food words
-            if not ingredients:
-                ingredients = self._extract_from_lists(soup)
+            # Stream the page; the download stops once the recipe data has arrived
+            page = self.fetcher.fetch_page(url, timeout=10)
+            page.raise_for_status()
             
-            return ingredients
+            ingredients = self.extract_ingredients(page.content, schema)
+            return ParsedPage(ingredients, page.url, page.redirects,
+                              self.find_canonical_url(page.content, page.url))
             
         except Exception as e:
             print(f"Error parsing recipe: {e}")
+            return failed
+    
+    @staticmethod
+    def extraction_variant(schema):
+        """HTTPCache result variant for an extraction: the schema's selector, '' without one"""
+        if schema is None:
+            return ''
+        return f"{schema.selector_type or 'css'}:{schema.ingredient_selector or ''}"
+
+    def extract_ingredients(self, content, schema=None):
+        """
+        Run the extraction strategies over an already downloaded page
+        
+        The partner schema and the JSON-LD fast path work on the raw bytes;
+        the BeautifulSoup tree is only built when they find nothing (or the
+        schema is a CSS selector).
+        
+        Args:
+            content: Raw HTML (bytes or str)
+            schema: Optional PCPSchema tried before the generic strategies
+            
+        Returns:
+            List of ingredient strings
+        """
+        soup = None
+        
+        # Strategy 0: The partner's own schema for this page
+        if schema is not None:
+            if schema.selector_type not in ('xpath', 'json-ld'):
+                soup = make_soup(content)
+            ingredients = self._extract_by_schema(soup, content, schema)
+            if ingredients:
+                return ingredients
+        
+        # Fast path: schema.org Recipe JSON-LD, straight from the raw bytes
+        ingredients = self._extract_by_json_ld(content)
+        if ingredients:
+            return ingredients
+        
+        return self._extract_from_soup(soup if soup is not None else make_soup(content))
+    
+    def find_canonical_url(self, content, base_url):
+        """
+        Get the absolute <link rel="canonical"> URL of a page, or None
+        
+        AMP and print variants point here at the page they duplicate.
+        Read from the raw HTML so it works without a DOM.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        for tag in LINK_TAG.finditer(content):
+            attributes = {}
+            for match in TAG_ATTRIBUTE.finditer(tag.group(0)):
+                value = match.group(2) or match.group(3) or match.group(4) or b''
+                attributes[match.group(1).lower()] = value
+            if b'canonical' in attributes.get(b'rel', b'').lower().split() and attributes.get(b'href'):
+                href = html.unescape(attributes[b'href'].decode('utf-8', errors='replace')).strip()
+                canonical = urljoin(base_url, href)
+                if urlparse(canonical).scheme not in ('http', 'https'):
+                    return None
+                return canonical
+        return None
+    
+    def _extract_by_json_ld(self, content):
+        """Extract recipeIngredient from schema.org Recipe JSON-LD without building a DOM"""
+        recipe = extract_recipe(content)
+        if recipe is None:
             return []
+        ingredients = [self.clean_text(html.unescape(text)) for text in recipe.ingredients
+                       if len(text.strip()) > 2]
+        return ingredients[:self.MAX_INGREDIENTS]
+    
+    def _extract_from_soup(self, soup):
+        """Run the DOM-based extraction strategies over a parsed page"""
+        # Try multiple strategies to find ingredients
+        ingredients = []
+        
+        # Strategy 1: Look for common ingredient list patterns
+        ingredients = self._extract_by_semantic_markup(soup)
+        
+        # Strategy 2: If no ingredients found, use food word density
+        if not ingredients:
+            ingredients = self._extract_by_food_density(soup)
+        
+        # Strategy 3: Look for lists with food words
+        if not ingredients:
+            ingredients = self._extract_from_lists(soup)
+        
+        return ingredients
+    
+    def _extract_by_schema(self, soup, content, schema):
+        """Extract ingredients with a PCP schema's css, xpath or json-ld selector"""
+        selector = schema.ingredient_selector
+        
+        if schema.selector_type == 'xpath':
+            # XPath runs on an lxml tree built from the raw page
+            texts = xpath_texts(content, selector) if selector and content else []
+        elif schema.selector_type == 'json-ld':
+            raw = content.encode('utf-8') if isinstance(content, str) else (content or b'')
+            scanner = JSONLDScanner()
+            scanner.scan(raw)
+            texts = scanner.recipe.get('recipeIngredient', []) if scanner.recipe else []
+            if isinstance(texts, str):
+                texts = [texts]
+        elif selector:
+            try:
+                texts = [elem.get_text(strip=True) for elem in soup.select(selector)]
+            except Exception as e:
+                print(f"Warning: Invalid CSS selector {selector!r}: {e}")
+                texts = []
+        else:
+            texts = []
+        
+        ingredients = [self.clean_text(text) for text in texts if isinstance(text, str) and len(text.strip()) > 2]
+        return ingredients[:self.MAX_INGREDIENTS]
     
     def _extract_by_semantic_markup(self, soup):
         """Extract ingredients using semantic HTML markup"""
         ingredients = []
         
-        # Common ingredient markup patterns
-        selectors = [
-            # Schema.org microdata
-            '[itemprop="recipeIngredient"]',
-            '[itemprop="ingredients"]',
-            # Common class names
-            '.ingredient',
-            '.ingredients li',
-            '.recipe-ingredients li',
-            '.ingredient-list li',
-            # Common ID patterns
-            '#ingredients li',
-            '#ingredient-list li',
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
+        # All selectors are matched in one walk; the first with results wins
+        for elements in self.SEMANTIC_SELECTORS.select(soup):
             for elem in elements:
                 text = elem.get_text(strip=True)
                 if text and len(text) > 2:
@@ -164,50 +278,87 @@ class RecipeParser:
         return ingredients
     
     def _extract_by_food_density(self, soup):
-        """Extract ingredients by finding areas with high food word density"""
+        """
+        Extract ingredients by finding areas with high food word density
+        
+        Word and food-word counts are accumulated bottom-up in one pass, so
+        each text node is tokenized once however deeply it is nested; the
+        containers are then checked in document order as before.
+        """
         ingredients = []
-        tolerance = 10
         
         # Remove script and style elements
         for script in soup(['script', 'style', 'nav', 'header', 'footer']):
             script.decompose()
         
-        # Look through body sections
-        if soup.body:
-            for parent in soup.body.find_all(['div', 'section', 'ul', 'ol']):
-                text = parent.get_text(' ', strip=True)
-                
-                if not text:
-                    continue
-                
-                words = text.split()
-                if len(words) < 3:
-                    continue
-                
-                # Count food words
-                food_word_count = sum(1 for word in words if self.clean_text(word) in self.food_words)
-                
-                # Check density threshold
-                density = food_word_count / len(words) if words else 0
+        # Look through body sections (lxml always synthesizes <body>, html.parser
+        # only when the page has one; fall back to the whole tree so both agree)
+        root = soup.body or soup
+        containers = root.find_all(['div', 'section', 'ul', 'ol'])
+        if not containers:
+            return ingredients
+        
+        # get_text() only joins a container's "interesting" string types
+        # (text and CDATA, not comments); the same for all container tags
+        counts = self._count_words_bottom_up(root, containers[0].interesting_string_types)
+        
+        for parent in containers:
+            word_count, food_word_count = counts[id(parent)]
+            if word_count < 3:
+                continue
+            
+            # Check density threshold
+            density = food_word_count / word_count
+            
+            if density > self.MIN_FOOD_DENSITY:  # 25% of words are food-related
+                # This is likely an ingredients section
+                # Try to split into individual ingredients
+                lines = parent.get_text(' ', strip=True).split('\n')
+                for line in lines:
+                    line = line.strip()
+                    if line and len(line) > 2 and not line.endswith(':'):
+                        # Check if line has food words
+                        if self.food_words.any(line.split()):
+                            ingredients.append(self.clean_text(line))
                 
-                if density > self.MIN_FOOD_DENSITY:  # 25% of words are food-related
-                    # This is likely an ingredients section
-                    # Try to split into individual ingredients
-                    lines = text.split('\n')
-                    for line in lines:
-                        line = line.strip()
-                        if line and len(line) > 2 and not line.endswith(':'):
-                            # Check if line has food words
-                            line_words = line.split()
-                            line_food_count = sum(1 for w in line_words if self.clean_text(w) in self.food_words)
-                            if line_food_count > 0:
-                                ingredients.append(self.clean_text(line))
-                    
-                    if ingredients:
-                        break
+                if ingredients:
+                    break
         
         return ingredients[:self.MAX_INGREDIENTS]  # Limit to reasonable number
     
+    def _count_words_bottom_up(self, root, string_types):
+        """
+        Count words and food words under every tag in one post-order pass
+        
+        Args:
+            root: Tag whose descendants are counted
+            string_types: NavigableString types that count as text
+            
+        Returns:
+            Dictionary of id(tag) -> (word count, food word count)
+        """
+        if string_types is None:
+            string_types = (NavigableString, CData)
+        elif isinstance(string_types, type):
+            string_types = (string_types,)
+        
+        counts = {}
+        # Reversed document order visits every tag after all its descendants
+        for element in reversed(root.find_all(True)):
+            word_count = food_word_count = 0
+            for child in element.contents:
+                if isinstance(child, NavigableString):
+                    if type(child) in string_types:
+                        words = child.split()
+                        word_count += len(words)
+                        food_word_count += self.food_words.count(words)
+                else:
+                    child_words, child_food_words = counts[id(child)]
+                    word_count += child_words
+                    food_word_count += child_food_words
+            counts[id(element)] = (word_count, food_word_count)
+        return counts
+    
     def _extract_from_lists(self, soup):
         """Extract ingredients from list elements containing food words"""
         ingredients = []
@@ -222,9 +373,9 @@ class RecipeParser:
                 if not text or len(text) < 3:
                     continue
                 
-                # Check if contains food words
+                # Check if contains food words or multi-word food phrases
                 words = text.lower().split()
-                has_food_word = any(self.clean_text(word) in self.food_words for word in words)
+                has_food_word = self.food_words.any(words) or self.collocations.any(text, min_words=2)
                 
                 if has_food_word:
                     list_ingredients.append(self.clean_text(text))
@@ -244,36 +395,24 @@ class RecipeParser:
             ingredient_text: Raw ingredient string
             
         Returns:
-            Dictionary with quantity, unit, item
+            Dictionary with quantity, unit, item and preparation
         """
-        # This is a simplified version - the full parser has complex regex patterns
-        parts = {
-            'quantity': '',
-            'unit': '',
-            'item': ingredient_text
+        parsed = self.ingredient_engine.parse(ingredient_text)
+        return {
+            'quantity': parsed.quantity,
+            'unit': parsed.unit,
+            'item': parsed.item,
+            'preparation': parsed.preparation
         }
+    
+    def parse_ingredient_batch(self, ingredient_texts):
+        """
+        Parse many ingredient strings in one call
         
-        # Common units
-        units = ['cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp',
-                 'ounce', 'ounces', 'oz', 'pound', 'pounds', 'lb', 'lbs', 'gram', 'grams', 'g',
-                 'kilogram', 'kilograms', 'kg', 'liter', 'liters', 'l', 'milliliter', 'milliliters', 'ml',
-                 'can', 'cans', 'jar', 'jars', 'package', 'packages', 'clove', 'cloves']
-        
-        # Try to extract quantity and unit
-        words = ingredient_text.split()
-        
-        # Look for numbers at the start
-        if words and re.match(r'^\d+', words[0]):
-            parts['quantity'] = words[0]
-            
-            # Check if next word is a unit
-            if len(words) > 1 and words[1].lower() in units:
-                parts['unit'] = words[1]
-                parts['item'] = ' '.join(words[2:])
-            else:
-                parts['item'] = ' '.join(words[1:])
-        
-        return parts
+        Returns:
+            List of ingredient_parser.ParsedIngredient, in input order
+        """
+        return self.ingredient_engine.parse_many(ingredient_texts)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+"""
+Resolver Module
+Cached, IP-validating DNS resolution for outbound recipe fetches (SSRF guard)
+
+The old guard matched hostname prefixes, so a DNS name pointing at a private
+address passed the check, and requests then resolved the name a second time
+on its own (leaving a DNS-rebinding window). HostResolver resolves each host
+once, checks every returned address with ipaddress, caches the answer and
+hands the validated addresses to the connection layer, which connects to
+them directly instead of resolving again.
+"""
+import socket
+import time
+import ipaddress
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+
+
+ALLOWED_SCHEMES = ('http', 'https')
+
+
+class UnsafeURLError(ValueError):
+    """Raised when a URL's scheme or resolved address is not allowed"""
+
+
+def is_public_address(address):
+    """
+    Check that an IP address is publicly routable
+
+    Rejects private, loopback, link-local, multicast, reserved, unspecified
+    and shared (CGNAT) ranges for IPv4 and IPv6, including IPv4-mapped and
+    NAT64/6to4 embeddings of non-public IPv4 addresses.
+    """
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+
+    if ip.version == 6:
+        embedded = ip.ipv4_mapped or ip.sixtofour
+        if embedded is None and ip in ipaddress.ip_network('64:ff9b::/96'):
+            embedded = ipaddress.IPv4Address(int(ip) & 0xFFFFFFFF)
+        if embedded is not None and not is_public_address(str(embedded)):
+            return False
+
+    return ip.is_global and not (
+        ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_multicast
+        or ip.is_reserved or ip.is_unspecified
+    )
+
+
+class HostResolver:
+    """
+    Thread-safe DNS cache that only ever returns public addresses
+
+    getaddrinfo() does not expose record TTLs, so answers are cached for a
+    fixed ttl (and failures for negative_ttl). Hosts resolving to any
+    non-public address are rejected as a whole, which also defeats DNS
+    answers that mix a public and a private record.
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30, max_entries=4096, getaddrinfo=socket.getaddrinfo):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._getaddrinfo = getaddrinfo
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'rejected': 0}
+
+    def _lookup(self, host):
+        """Resolve and validate, returns (addresses, error, ttl)"""
+        try:
+            # IP literals skip DNS entirely
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            try:
+                infos = self._getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+            except (socket.gaierror, UnicodeError) as e:
+                return None, UnsafeURLError(f"Could not resolve host {host}: {e}"), self.negative_ttl
+            addresses = list(OrderedDict.fromkeys(info[4][0] for info in infos))
+
+        if not addresses:
+            return None, UnsafeURLError(f"No addresses found for host {host}"), self.negative_ttl
+        for address in addresses:
+            if not is_public_address(address):
+                error = UnsafeURLError(f"Access to non-public address {address} ({host}) is not allowed")
+                return None, error, self.ttl
+        return addresses, None, self.ttl
+
+    def resolve(self, host):
+        """
+        Get the validated addresses for a host
+
+        Raises:
+            UnsafeURLError: the host doesn't resolve or resolves to a
+                non-public address
+        """
+        host = host.lower().rstrip('.').strip('[]')
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(host)
+            if entry and entry[2] > now:
+                self.stats['hits'] += 1
+                addresses, error = entry[0], entry[1]
+                if error:
+                    raise UnsafeURLError(str(error))
+                return addresses
+            self.stats['misses'] += 1
+
+        addresses, error, ttl = self._lookup(host)
+
+        with self._lock:
+            self._cache[host] = (addresses, error, now + ttl)
+            self._cache.move_to_end(host)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            if error:
+                self.stats['rejected'] += 1
+
+        if error:
+            raise error
+        return addresses
+
+    def check_url(self, url):
+        """
+        Validate a URL's scheme and host before fetching it
+
+        Returns:
+            The validated addresses for the URL's host
+
+        Raises:
+            UnsafeURLError
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ALLOWED_SCHEMES:
+            raise UnsafeURLError(f"Invalid URL scheme: {parsed.scheme}")
+        if not parsed.hostname:
+            raise UnsafeURLError("URL has no host")
+        return self.resolve(parsed.hostname)
+
+
+class _PinnedConnectionMixin:
+    """Connects to the resolver's validated addresses instead of resolving again"""
+
+    resolver = None
+
+    def _new_conn(self):
+        hostname = self._dns_host
+        last_error = None
+        try:
+            for address in self.resolver.resolve(hostname):
+                # TLS SNI and certificate checks still use the hostname (self.host),
+                # only the TCP connect goes to the pinned address
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    last_error = e
+        finally:
+            self._dns_host = hostname
+        raise last_error
+
+
+class PinnedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections are pinned to HostResolver-validated addresses"""
+
+    def __init__(self, resolver, **kwargs):
+        self.resolver = resolver
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {'resolver': self.resolver}
+        http_connection = type('PinnedHTTPConnection', (_PinnedConnectionMixin, HTTPConnection), attrs)
+        https_connection = type('PinnedHTTPSConnection', (_PinnedConnectionMixin, HTTPSConnection), attrs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('PinnedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+            'https': type('PinnedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+        }
+
+
+_shared_resolver = None
+_shared_lock = threading.Lock()
+
+
+def get_resolver():
+    """Get the process-wide shared resolver"""
+    global _shared_resolver
+    if _shared_resolver is None:
+        with _shared_lock:
+            if _shared_resolver is None:
+                _shared_resolver = HostResolver()
+    return _shared_resolver
@@ -0,0 +1,175 @@
+"""
+Selector Engine Module
+Evaluates a whole list of CSS selectors in one walk over the DOM
+
+The extraction cascades try dozens of selectors per page, and each
+soup.select() call traverses the entire tree again. SelectorSet compiles the
+selectors once (with soupsieve, the engine behind soup.select) and indexes
+them by the key of their rightmost compound selector: id, class, attribute
+name or tag. One pass over the tree then only tests each element against the
+few selectors that could possibly match it.
+
+Results are identical to calling soup.select() per selector: one list per
+selector, in selector order, each in document order.
+"""
+import re
+from collections import defaultdict
+
+import soupsieve
+
+
+_IDENT = r'-?[_a-zA-Z\u00a0-\uffff][_a-zA-Z0-9\u00a0-\uffff-]*'
+_ID = re.compile(r'#(' + _IDENT + ')')
+_CLASS = re.compile(r'\.(' + _IDENT + ')')
+_ATTRIBUTE = re.compile(r'\[\s*(?:[\w*-]*\|)?(' + _IDENT + ')')
+_TAG = re.compile(r'^(?:[\w*-]*\|)?(' + _IDENT + ')')
+
+
+def _split_top_level(selector, separators):
+    """Split on separator characters outside [] and () groups"""
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in selector:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        elif depth == 0 and char in separators:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _strip_groups(compound):
+    """Drop the contents of () groups (:not(), :has()...), which say nothing positive"""
+    result = []
+    depth = 0
+    for char in compound:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0:
+            result.append(char)
+    return ''.join(result)
+
+
+def index_key(selector):
+    """
+    Get the index key of a single (comma-free) selector
+
+    Returns:
+        ('id', value), ('class', value), ('attr', name), ('tag', name) or
+        ('*', None) when the rightmost compound has no usable key
+    """
+    compounds = [c for c in _split_top_level(selector.strip(), ' \t\n>+~') if c.strip()]
+    compound = _strip_groups(compounds[-1].strip()) if compounds else ''
+    if '\\' in compound:
+        # CSS escapes: not worth decoding, test the selector on every element
+        return '*', None
+
+    match = _ID.search(compound)
+    if match:
+        return 'id', match.group(1).lower()
+    match = _CLASS.search(compound)
+    if match:
+        return 'class', match.group(1).lower()
+    match = _ATTRIBUTE.search(compound)
+    if match:
+        return 'attr', match.group(1).lower()
+    match = _TAG.match(compound)
+    if match:
+        return 'tag', match.group(1).lower()
+    return '*', None
+
+
+class SelectorSet:
+    """
+    A compiled list of CSS selectors matched in a single DOM walk
+
+    Invalid selectors are reported once at compile time and never match.
+    """
+
+    def __init__(self, selectors, namespaces=None):
+        self.selectors = list(selectors)
+        self._compiled = []
+        self._by_id = defaultdict(list)
+        self._by_class = defaultdict(list)
+        self._by_attr = defaultdict(list)
+        self._by_tag = defaultdict(list)
+        self._universal = []
+
+        for position, selector in enumerate(self.selectors):
+            try:
+                compiled = soupsieve.compile(selector, namespaces=namespaces)
+            except Exception as e:
+                print(f"Warning: Invalid CSS selector {selector!r}: {e}")
+                self._compiled.append(None)
+                continue
+            self._compiled.append(compiled)
+
+            # A selector list is indexed under every alternative's key
+            for part in _split_top_level(selector, ','):
+                kind, value = index_key(part)
+                bucket = {
+                    'id': self._by_id, 'class': self._by_class,
+                    'attr': self._by_attr, 'tag': self._by_tag
+                }.get(kind)
+                if bucket is None:
+                    self._universal.append(position)
+                else:
+                    bucket[value].append(position)
+
+        self._universal = sorted(set(self._universal))
+
+    def _candidates(self, element):
+        """Positions of the selectors that could match an element"""
+        candidates = set(self._universal)
+        candidates.update(self._by_tag.get(element.name.lower(), ()))
+        if self._by_attr:
+            for name in element.attrs:
+                candidates.update(self._by_attr.get(name.lower(), ()))
+        if self._by_class:
+            classes = element.get('class') or ()
+            if isinstance(classes, str):
+                classes = classes.split()
+            for name in classes:
+                candidates.update(self._by_class.get(name.lower(), ()))
+        if self._by_id:
+            element_id = element.get('id')
+            if isinstance(element_id, str):
+                candidates.update(self._by_id.get(element_id.lower(), ()))
+        return candidates
+
+    def select(self, root):
+        """
+        Match every selector against root's descendants in one pass
+
+        Args:
+            root: BeautifulSoup or Tag
+
+        Returns:
+            List with one list of matching elements per selector (same
+            order as the selectors), each in document order
+        """
+        results = [[] for _ in self.selectors]
+        compiled = self._compiled
+        for element in root.find_all(True):
+            for position in self._candidates(element):
+                if compiled[position].match(element):
+                    results[position].append(element)
+        return results
+
+    def select_grouped(self, root):
+        """Like select(), but yields (selector, elements) pairs in priority order"""
+        return zip(self.selectors, self.select(root))
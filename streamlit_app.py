@@ -4,91 +4,97 @@ Streamlit Application for converting recipe URLs into ingredient shopping carts
 """
 
 # ============================================================================
-# Install Dependencies at Runtime (for Streamlit Cloud)
+# Check Dependencies (Streamlit Cloud installs requirements.txt)
 # ============================================================================
+import importlib.util
 import subprocess
 import sys
+import os
 
-def install_packages():
-    """Install required packages at runtime"""
-    packages = [
-        'beautifulsoup4',
-        'requests',
-        'lxml',
-        'nltk'
-    ]
-    for package in packages:
-        try:
-            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package, '-q'])
-        except:
-            pass
+# pip package name -> module it provides
+REQUIRED_PACKAGES = {
+    'beautifulsoup4': 'bs4',
+    'requests': 'requests',
+    'lxml': 'lxml'
+}
+
+def check_packages():
+    """
+    Check that the required packages are importable, without running pip
 
-# Install packages before importing
-install_packages()
+    Set LANES_PIP_INSTALL=1 to pip install the missing ones at startup
+    (the old behaviour, for hosts that ignore requirements.txt).
+
+    Returns:
+        List of pip package names that are still missing
+    """
+    def find_missing():
+        return [package for package, module in REQUIRED_PACKAGES.items()
+                if importlib.util.find_spec(module) is None]
+
+    missing = find_missing()
+    if missing and os.environ.get('LANES_PIP_INSTALL') == '1':
+        for package in missing:
+            try:
+                subprocess.check_call([sys.executable, '-m', 'pip', 'install', package, '-q'])
+            except:
+                pass
+        importlib.invalidate_caches()
+        missing = find_missing()
+    if missing:
+        print(f"Warning: missing packages {', '.join(missing)} (pip install -r requirements.txt)")
+    return missing
+
+MISSING_PACKAGES = check_packages()
 
 # ============================================================================
 # Now import the packages
 # ============================================================================
 import streamlit as st
 import hashlib
-import json
-import os
 from datetime import datetime, timedelta
 import calendar
+from urllib.parse import urldefrag
+
+# NLTK is not needed to extract ingredients; nlp loads it on first use
+
+from extraction_pipeline import ExtractionPipeline
+from lexicon import Lexicon, load_csv_words
+from collocations import load_phrase_matcher
+from ingredient_parser import normalize_spacing
+
+@st.cache_resource
+def get_parser():
+    """Build the recipe parser once per process (not on every rerun)"""
+    # Try to import recipe parser, fall back to built-in if it fails
+    try:
+        from recipe_parser import RecipeParser
+        return RecipeParser()
+    except Exception as e:
+        return None
 
-# Try to import and setup NLTK
-try:
-    import nltk
-    nltk.download('punkt', quiet=True)
-    nltk.download('averaged_perceptron_tagger', quiet=True)
-except:
-    pass
-
-# Try to import recipe parser, fall back to built-in if it fails
-try:
-    from recipe_parser import RecipeParser
-    parser = RecipeParser()
-    PARSER_AVAILABLE = True
-except Exception as e:
-    PARSER_AVAILABLE = False
-    parser = None
+parser = get_parser()
+PARSER_AVAILABLE = parser is not None
 
 # ============================================================================
 # Load Food Words and Collection Words from CSV files
 # ============================================================================
 
+@st.cache_resource
 def load_food_words():
     """Load food words from CSV files for better ingredient detection"""
-    food_words = set()
+    # Same cached word lists RecipeParser uses (see lexicon)
+    food_words = {word for word in load_csv_words('food_words_.csv') if len(word) > 1}
     coll_words = set()
 
-    # Load food_words_.csv
-    try:
-        food_file = os.path.join(os.path.dirname(__file__), 'food_words_.csv')
-        if os.path.exists(food_file):
-            with open(food_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    word = line.strip().lower()
-                    if word and len(word) > 1:
-                        food_words.add(word)
-    except:
-        pass
-
-    # Load coll_words_.csv (collection/compound words)
-    try:
-        coll_file = os.path.join(os.path.dirname(__file__), 'coll_words_.csv')
-        if os.path.exists(coll_file):
-            with open(coll_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    word = line.strip().lower()
-                    if word and len(word) > 1:
-                        coll_words.add(word)
-                        # Also add individual words
-                        for w in word.split():
-                            if len(w) > 2:
-                                food_words.add(w)
-    except:
-        pass
+    # coll_words_.csv (collection/compound words)
+    for word in load_csv_words('coll_words_.csv'):
+        if len(word) > 1:
+            coll_words.add(word)
+            # Also add individual words
+            for w in word.split():
+                if len(w) > 2:
+                    food_words.add(w)
 
     # Add common measurement words
     measurements = {
@@ -110,320 +116,98 @@ def load_food_words():
 
     return food_words, coll_words, measurements, prep_words
 
-# Load food data at module level
-FOOD_WORDS, COLL_WORDS, MEASUREMENTS, PREP_WORDS = load_food_words()
+@st.cache_resource
+def load_lexicons():
+    """Compile the food-word lexicon and collocation matcher once per process"""
+    food_words, coll_words, measurements, prep_words = load_food_words()
+    # Combined lexicon for quick lookup; tokens are reduced to their letters a-z
+    all_food_indicators = Lexicon(food_words | measurements | prep_words, normalizer='alpha')
+    # Multi-word phrases from coll_words_.csv and lookup_words.csv, any length
+    return all_food_indicators, load_phrase_matcher()
 
-# Combined set for quick lookup
-ALL_FOOD_INDICATORS = FOOD_WORDS | MEASUREMENTS | PREP_WORDS
+# Load food data at module level (cached across reruns)
+FOOD_WORDS, COLL_WORDS, MEASUREMENTS, PREP_WORDS = load_food_words()
+ALL_FOOD_INDICATORS, COLLOCATIONS = load_lexicons()
 
 # ============================================================================
-# Built-in Fallback Parser (when recipe_parser.py fails)
+# Extraction Pipeline (fetch once, parse once, every strategy)
 # ============================================================================
 
-def builtin_get_ingredients(url):
+@st.cache_resource
+def get_pipeline():
+    """Build the extraction pipeline once per process"""
+    return ExtractionPipeline(parser=parser, food_indicators=ALL_FOOD_INDICATORS,
+                              collocations=COLLOCATIONS)
+
+def get_ingredients_safe(url):
     """
-    Comprehensive ingredient extractor using modern schema.org standards.
+    Get ingredients using every available strategy
 
-    Extraction priority:
-    1. JSON-LD structured data (schema.org/Recipe) - most reliable
-    2. Microdata (itemprop="recipeIngredient")
-    3. Common recipe plugin selectors (WPRM, Tasty, etc.)
-    4. Generic CSS selectors
+    The page is fetched and parsed once; JSON-LD, microdata and plugin
+    markup come first, then the list heuristics and RecipeParser's
+    strategies (see extraction_pipeline.DEFAULT_STRATEGIES).
     """
     try:
-        import requests
-        from bs4 import BeautifulSoup
-        import json
-        import re
-        from urllib.parse import urlparse
-
-        # Parse URL to get domain for referer
-        parsed_url = urlparse(url)
-        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-
-        # Comprehensive headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-            'Referer': domain,
-        }
-
-        # Use session for better cookie handling
-        session = requests.Session()
-        response = session.get(url, headers=headers, timeout=20, allow_redirects=True)
-
-        # If still blocked, try without some headers
-        if response.status_code == 403:
-            simple_headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
-            }
-            response = session.get(url, headers=simple_headers, timeout=20)
-
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        ingredients = []
-
-        # ================================================================
-        # Strategy 1: JSON-LD Structured Data (schema.org Recipe)
-        # This is the modern standard used by most recipe sites
-        # ================================================================
-        for script in soup.find_all('script', type='application/ld+json'):
-            try:
-                data = json.loads(script.string)
-
-                # Handle both single object and array of objects
-                if isinstance(data, list):
-                    items = data
-                else:
-                    items = [data]
-
-                for item in items:
-                    # Check if it's a Recipe directly
-                    if item.get('@type') == 'Recipe' or 'Recipe' in str(item.get('@type', '')):
-                        recipe_ingredients = item.get('recipeIngredient', [])
-                        if recipe_ingredients:
-                            ingredients = recipe_ingredients if isinstance(recipe_ingredients, list) else [recipe_ingredients]
-                            break
-
-                    # Check @graph structure (common in WordPress)
-                    if '@graph' in item:
-                        for graph_item in item['@graph']:
-                            if graph_item.get('@type') == 'Recipe' or 'Recipe' in str(graph_item.get('@type', '')):
-                                recipe_ingredients = graph_item.get('recipeIngredient', [])
-                                if recipe_ingredients:
-                                    ingredients = recipe_ingredients if isinstance(recipe_ingredients, list) else [recipe_ingredients]
-                                    break
-
-                if ingredients:
-                    break
-            except (json.JSONDecodeError, TypeError, AttributeError):
-                continue
-
-        if ingredients:
-            # Clean up JSON-LD ingredients
-            cleaned = []
-            for ing in ingredients:
-                if isinstance(ing, str):
-                    text = ing.strip()
-                    if text and len(text) > 1:
-                        cleaned.append(text)
-            if cleaned:
-                return cleaned[:50]
-
-        # ================================================================
-        # Strategy 2: Microdata attributes (itemprop)
-        # ================================================================
-        microdata_selectors = [
-            '[itemprop="recipeIngredient"]',
-            '[itemprop="ingredients"]',
-        ]
+        return get_pipeline().extract(url).ingredients
+    except Exception:
+        return []
 
-        for selector in microdata_selectors:
-            elements = soup.select(selector)
-            for elem in elements:
-                text = elem.get_text(strip=True)
-                # Clean up the text
-                text = re.sub(r'\s+', ' ', text)
-                if text and 2 < len(text) < 300:
-                    ingredients.append(text)
-            if ingredients:
-                return ingredients[:50]
-
-        # ================================================================
-        # Strategy 3: Popular Recipe Plugin Selectors
-        # ================================================================
-        plugin_selectors = [
-            # WPRM (WP Recipe Maker) - very popular
-            '.wprm-recipe-ingredient',
-            '.wprm-recipe-ingredients li',
-            '.wprm-recipe-ingredient-group li',
-
-            # Tasty Recipes
-            '.tasty-recipes-ingredients li',
-            '.tasty-recipes-ingredients-body li',
-            '.tasty-recipe-ingredients li',
-
-            # Recipe Card Blocks
-            '.recipe-card-ingredients li',
-            '.recipe-card__ingredient',
-
-            # Mediavine Create
-            '.mv-create-ingredients li',
-            '.mv-create-ingredient',
-
-            # Zip Recipes
-            '.zlrecipe-ingredient',
-            '.zip-recipe-ingredients li',
-
-            # EasyRecipe
-            '.ERSIngredients li',
-            '.ingredient',
-
-            # Yoast/Schema
-            '.schema-recipe-ingredients li',
-
-            # Jetpack Recipe
-            '.jetpack-recipe-ingredients li',
-
-            # Generic recipe classes
-            '.recipe-ingredients li',
-            '.ingredients-list li',
-            '.ingredient-list li',
-            '.recipe__ingredients li',
-            '.recipe-content__ingredients li',
-
-            # List-based ingredients
-            '.ingredients li',
-            '.ingredient-item',
-            '.ingredientsList li',
-
-            # Structured content
-            '[data-ingredient]',
-            '[class*="ingredient"] li',
-        ]
+# ============================================================================
+# Extraction Cache (shared by every session of this process)
+# ============================================================================
 
-        for selector in plugin_selectors:
-            try:
-                elements = soup.select(selector)
-                for elem in elements:
-                    text = elem.get_text(strip=True)
-                    text = re.sub(r'\s+', ' ', text)
-                    if text and 2 < len(text) < 300 and not text.lower().startswith(('instructions', 'directions', 'steps')):
-                        ingredients.append(text)
-                if len(ingredients) >= 3:  # Found enough ingredients
-                    return ingredients[:50]
-            except:
-                continue
-
-        # ================================================================
-        # Strategy 4: Find ingredients section by header
-        # ================================================================
-        ingredient_headers = soup.find_all(['h2', 'h3', 'h4', 'strong', 'b'],
-            string=re.compile(r'ingredient', re.I))
-
-        for header in ingredient_headers:
-            # Look for the next ul/ol list
-            next_list = header.find_next(['ul', 'ol'])
-            if next_list:
-                for li in next_list.find_all('li'):
-                    text = li.get_text(strip=True)
-                    text = re.sub(r'\s+', ' ', text)
-                    if text and 2 < len(text) < 300:
-                        ingredients.append(text)
-                if ingredients:
-                    return ingredients[:50]
-
-        # ================================================================
-        # Strategy 5: Last resort - find any list in recipe container
-        # ================================================================
-        recipe_containers = soup.select('.recipe, .recipe-container, .recipe-content, [class*="recipe"]')
-        for container in recipe_containers[:3]:  # Limit search
-            lists = container.find_all(['ul', 'ol'])
-            for lst in lists[:2]:  # First couple lists are usually ingredients
-                for li in lst.find_all('li'):
-                    text = li.get_text(strip=True)
-                    text = re.sub(r'\s+', ' ', text)
-                    if text and 2 < len(text) < 300:
-                        ingredients.append(text)
-                if len(ingredients) >= 3:
-                    return ingredients[:50]
-
-        # ================================================================
-        # Strategy 6: Find any list on page with food-like items
-        # Uses loaded food words from CSV files
-        # ================================================================
-        def is_likely_ingredient(text):
-            """Check if text looks like an ingredient using loaded food words"""
-            text_lower = text.lower()
-            words = text_lower.split()
-
-            # Check for food words from CSV
-            for word in words:
-                word_clean = re.sub(r'[^a-z]', '', word)
-                if word_clean in ALL_FOOD_INDICATORS:
-                    return True
-
-            # Check for correlated word pairs
-            for i in range(len(words) - 1):
-                pair = f"{words[i]} {words[i+1]}"
-                if pair in COLL_WORDS:
-                    return True
-
-            # Check for number at start (like "2 cups flour")
-            if re.match(r'^[\d½¼¾⅓⅔⅛]+', text):
-                return True
-
-            return False
-
-        all_lists = soup.find_all(['ul', 'ol'])
-        for lst in all_lists:
-            list_items = []
-            for li in lst.find_all('li', recursive=False):
-                text = li.get_text(strip=True)
-                text = re.sub(r'\s+', ' ', text)
-                if text and 3 < len(text) < 200:
-                    if is_likely_ingredient(text):
-                        list_items.append(text)
-
-            if len(list_items) >= 3:
-                ingredients = list_items
-                return ingredients[:50]
-
-        # ================================================================
-        # Strategy 7: Look for paragraph text with ingredient patterns
-        # ================================================================
-        # Find the main content area
-        main_content = soup.find(['article', 'main', '.post-content', '.entry-content', '.content'])
-        if not main_content:
-            main_content = soup.find('body')
-
-        if main_content:
-            # Look for text blocks that might list ingredients
-            for elem in main_content.find_all(['p', 'div']):
-                text = elem.get_text(strip=True)
-                # Check if this paragraph contains a list of ingredients
-                if 'ingredient' in text.lower() and len(text) < 2000:
-                    # Try to split by common delimiters
-                    lines = re.split(r'[,\n•·–-]', text)
-                    for line in lines:
-                        line = line.strip()
-                        if line and 3 < len(line) < 150:
-                            if is_likely_ingredient(line):
-                                ingredients.append(line)
-
-                    if len(ingredients) >= 3:
-                        return ingredients[:50]
-
-        return ingredients[:50]
+EXTRACTION_CACHE_TTL = timedelta(hours=24)
+# Pages without ingredients are retried sooner (site was down, markup fixed...)
+NEGATIVE_CACHE_TTL = timedelta(minutes=10)
+EXTRACTION_CACHE_SIZE = 1000
+
+class _NoIngredients(Exception):
+    """Raised to keep empty results out of the long-lived cache"""
+
+@st.cache_resource
+def extraction_cache_stats():
+    """Process-wide hit/miss counters for the extraction cache"""
+    return {'lookups': 0, 'misses': 0, 'negative_hits': 0}
+
+@st.cache_data(ttl=NEGATIVE_CACHE_TTL, max_entries=EXTRACTION_CACHE_SIZE, show_spinner=False)
+def _extract_recent(cache_key, _url):
+    """Short-lived cache of every extraction, empty results included"""
+    # Only cache_key is hashed (st.cache_data skips _-prefixed arguments)
+    extraction_cache_stats()['misses'] += 1
+    return get_ingredients_safe(_url)
+
+@st.cache_data(ttl=EXTRACTION_CACHE_TTL, max_entries=EXTRACTION_CACHE_SIZE, show_spinner=False)
+def _extract_found(cache_key, _url):
+    """Long-lived cache of extractions that found ingredients"""
+    ingredients = _extract_recent(cache_key, _url)
+    if not ingredients:
+        raise _NoIngredients(_url)
+    return ingredients
+
+def cached_get_ingredients(url):
+    """
+    Get ingredients through the extraction cache
 
-    except Exception as e:
+    Keyed by the URL less its fragment (the query stays: "?id=1" and
+    "?id=2" are different recipes), so popular recipes are fetched and
+    parsed once per EXTRACTION_CACHE_TTL for all users; pages without
+    ingredients are cached for NEGATIVE_CACHE_TTL only.
+    """
+    stats = extraction_cache_stats()
+    stats['lookups'] += 1
+    misses = stats['misses']
+    try:
+        return _extract_found(urldefrag(url)[0], url)
+    except _NoIngredients:
+        if stats['misses'] == misses:
+            stats['negative_hits'] += 1
         return []
 
-def get_ingredients_safe(url):
-    """Get ingredients using available parser"""
-    # Always try the comprehensive builtin parser first for best results
-    ingredients = builtin_get_ingredients(url)
-    if ingredients:
-        return ingredients
-
-    # Fallback to original parser if builtin fails
-    if PARSER_AVAILABLE and parser:
-        try:
-            return parser.get_ingredients(url)
-        except:
-            pass
-
-    return []
+def clear_extraction_cache():
+    """Drop every cached extraction and reset the counters"""
+    _extract_found.clear()
+    _extract_recent.clear()
+    extraction_cache_stats().update(lookups=0, misses=0, negative_hits=0)
 
 # ============================================================================
 # Page Configuration
@@ -868,30 +652,7 @@ def clean_ingredient_text(text):
     Clean up ingredient text by adding proper spacing.
     Fixes issues like '¼cuppacked' -> '¼ cup packed'
     """
-    import re
-
-    # Add space after fractions if followed by letter
-    text = re.sub(r'([½¼¾⅓⅔⅛⅜⅝⅞])([a-zA-Z])', r'\1 \2', text)
-
-    # Add space after numbers if followed by letter (but not already spaced)
-    text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
-
-    # Add space before common measurement words if missing
-    measurements = ['cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp',
-                   'ounce', 'ounces', 'oz', 'pound', 'pounds', 'lb', 'lbs', 'gram', 'grams',
-                   'ml', 'liter', 'liters', 'pinch', 'dash', 'clove', 'cloves', 'slice', 'slices',
-                   'piece', 'pieces', 'can', 'cans', 'package', 'packages', 'bunch', 'head', 'stalk']
-
-    for m in measurements:
-        # Add space before measurement if preceded by number/fraction without space
-        text = re.sub(rf'(\d)({m})\b', rf'\1 {m}', text, flags=re.IGNORECASE)
-        # Add space after measurement if followed by letter without space
-        text = re.sub(rf'\b({m})([a-zA-Z])', rf'\1 \2', text, flags=re.IGNORECASE)
-
-    # Clean up multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-
-    return text.strip()
+    return normalize_spacing(text)
 
 def get_mock_amazon_price(ingredient):
     """Get mock Amazon Fresh price for ingredient"""
@@ -1180,7 +941,7 @@ def add_pin_page():
         if url:
             with st.spinner("Extracting ingredients..."):
                 try:
-                    ingredients = get_ingredients_safe(url)
+                    ingredients = cached_get_ingredients(url)
 
                     if ingredients:
                         # Extract title from URL
@@ -1399,6 +1160,21 @@ def account_page():
             </div>
             """, unsafe_allow_html=True)
 
+        # Diagnostics
+        with st.expander("Extraction cache"):
+            stats = extraction_cache_stats()
+            hits = stats['lookups'] - stats['misses']
+            hit_rate = hits / stats['lookups'] * 100 if stats['lookups'] else 0
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hits", hits, help=f"{stats['negative_hits']} of them cached 'no ingredients' results")
+            col2.metric("Misses", stats['misses'])
+            col3.metric("Hit rate", f"{hit_rate:.0f}%")
+            st.caption(f"TTL {EXTRACTION_CACHE_TTL}, {NEGATIVE_CACHE_TTL} for pages without ingredients; "
+                       f"up to {EXTRACTION_CACHE_SIZE} URLs")
+            if st.button("Clear extraction cache", use_container_width=True):
+                clear_extraction_cache()
+                st.rerun()
+
         st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
 
         if st.button("Sign Out", use_container_width=True):
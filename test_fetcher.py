@@ -0,0 +1,522 @@
+"""
+Test script for the pooled recipe fetcher
+Runs against a local keep-alive HTTP server, no internet access needed
+"""
+import os
+import json
+import tempfile
+import threading
+import http.server
+import socketserver
+from types import SimpleNamespace
+
+from fetcher import RecipeFetcher
+from crawler import BulkCrawler, replay, main as crawler_main
+from html_archive import HTMLArchive
+from http_cache import HTTPCache
+from recipe_parser import RecipeParser
+from politeness import PolitenessScheduler, TokenBucket
+from resolver import HostResolver, UnsafeURLError, is_public_address
+
+sample_page = b"""
+<html>
+<body>
+    <ul class="ingredients">
+        <li itemprop="recipeIngredient">2 cups flour</li>
+        <li itemprop="recipeIngredient">1 cup milk</li>
+    </ul>
+</body>
+</html>
+"""
+
+# JSON-LD recipe in the <head> followed by ~1MB of comments and ads
+large_page = (b"""<html><head>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@graph": [
+    {"@type": "WebPage", "name": "Pancakes"},
+    {"@type": "Recipe", "name": "Pancakes", "recipeIngredient": ["1 cup flour", "2 eggs"]}
+]}
+</script>
+</head><body>""" + b"<p>Great recipe, thanks for sharing!</p>" * 25000 + b"</body></html>")
+
+robots_txt = b"""User-agent: *
+Disallow: /private
+Crawl-delay: 2
+"""
+
+amp_page = b'<html><head><link rel="amphtml" href="/amp/pancakes"><link rel="canonical" href="/pancakes">' \
+           b'</head><body>' + sample_page + b'</body></html>'
+
+pages = {'/large': large_page, '/robots.txt': robots_txt, '/amp/pancakes': amp_page,
+         '/recipe?id=2': large_page}
+redirects = {'/old-pancakes': '/amp/pancakes'}
+errors = {'/gone': 410}
+
+
+class RecipeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves sample_page with keep-alive enabled and ETag revalidation"""
+    protocol_version = 'HTTP/1.1'
+    etag = '"recipe-v1"'
+    full_responses = 0
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.path in redirects:
+            self.send_response(301)
+            self.send_header('Location', redirects[self.path])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        RecipeHandler.full_responses += 1
+        body = large_page if self.path in errors else pages.get(self.path, sample_page)
+        self.send_response(errors.get(self.path, 200))
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading early
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """Start a threaded local HTTP server, returns (server, base_url)"""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), RecipeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_fetcher_reuses_connections():
+    server, base_url = start_server()
+    fetcher = RecipeFetcher(pool_maxsize=4)
+
+    try:
+        for _ in range(5):
+            response = fetcher.get(f"{base_url}/recipe")
+            assert response.status_code == 200
+            assert b'recipeIngredient' in response.content
+
+        threads = [
+            threading.Thread(target=lambda: [fetcher.get(f"{base_url}/recipe") for _ in range(3)])
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = fetcher.pool_stats()
+        print("Pool stats:", stats)
+        assert stats['total_requests'] == 17
+        assert stats['active_pools'] == 1
+
+        pool = list(stats['pools'].values())[0]
+        assert pool['requests'] == 17
+        # Keep-alive: far fewer connections than requests, bounded by threads
+        assert pool['connections_opened'] <= 5
+        assert pool['idle_connections'] <= 4
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+
+    print("✅ Fetcher reuses pooled connections")
+    return True
+
+
+def test_bulk_crawler_writes_results():
+    server, base_url = start_server()
+    urls = [f"{base_url}/recipe-{i}" for i in range(20)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, 'results.jsonl')
+        try:
+            # Unpinned fetcher: the shared resolver would (rightly) refuse 127.0.0.1
+            crawler = BulkCrawler(fetcher=RecipeFetcher(), concurrency=8, per_domain=2)
+            stats = crawler.run(urls, output_path)
+            # A second run resumes and skips everything already written
+            resumed = BulkCrawler(fetcher=RecipeFetcher(), concurrency=8, per_domain=2).run(urls, output_path)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        with open(output_path) as f:
+            results = [json.loads(line) for line in f]
+
+    print("Crawl stats:", stats)
+    assert stats['parsed'] == 20
+    assert resumed['urls'] == 0
+    assert len(results) == 20
+    assert all(len(r['ingredients']) == 2 for r in results)
+    print("✅ Bulk crawler parses and writes every URL")
+    return True
+
+
+def test_http_cache_revalidates():
+    server, base_url = start_server()
+    url = f"{base_url}/cached-recipe"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = RecipeFetcher()
+        cache = HTTPCache(tmp)
+        parser = RecipeParser(fetcher=fetcher)
+        full_before = RecipeHandler.full_responses
+        try:
+            first = cache.fetch(fetcher, url)
+            assert not first.not_modified and first.result is None
+            cache.store_result(url, parser.extract_ingredients(first.content))
+
+            second = cache.fetch(fetcher, url)
+            # A result extracted with a partner schema is not the generic one
+            schema_result = cache.fetch(fetcher, url, variant='css:.ingredient').result
+
+            # Same path, other query: a different page with its own entry
+            cache.store_result(f"{url}?id=1", ['1 cup sugar'])
+            other = cache.fetch(fetcher, f"{url}?id=2")
+        finally:
+            fetcher.close()
+            server.shutdown()
+            server.server_close()
+
+        stats = cache.stats
+
+    print("HTTP cache stats:", stats)
+    assert second.not_modified
+    assert second.content == sample_page
+    assert second.result == ['2 cups flour', '1 cup milk']
+    assert schema_result is None
+    assert not other.not_modified and other.result is None
+    # Only the first and the ?id=2 requests downloaded the page body
+    assert RecipeHandler.full_responses - full_before == 2
+    assert stats['revalidated'] == 2
+    assert stats['result_hits'] == 1
+    print("✅ HTTP cache revalidates with ETag and reuses the stored result")
+    return True
+
+
+def test_streaming_fetch_stops_early():
+    server, base_url = start_server()
+    fetcher = RecipeFetcher()
+
+    try:
+        page = fetcher.fetch_page(f"{base_url}/large")
+        limited = fetcher.fetch_page(f"{base_url}/large", stop_early=False, max_body_bytes=100000)
+        full = fetcher.fetch_page(f"{base_url}/recipe")
+        exact = fetcher.fetch_page(f"{base_url}/recipe", max_body_bytes=len(sample_page))
+        error = fetcher.fetch_page(f"{base_url}/gone", max_body_bytes=100000)
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+
+    print(f"Streamed {len(page.content)} of {len(large_page)} bytes")
+    assert page.stopped_early and not page.truncated
+    assert len(page.content) < len(large_page) // 10
+    assert b'recipeIngredient' in page.content
+
+    assert limited.truncated and len(limited.content) == 100000
+
+    # Pages without JSON-LD are read in full
+    assert full.content == sample_page
+    assert not full.stopped_early and not full.truncated
+    # A body of exactly the limit is complete
+    assert exact.content == sample_page and not exact.truncated
+    # Error pages are bounded too
+    assert error.status_code == 410
+    assert error.truncated and len(error.content) == 100000
+    print("✅ Streaming fetch stops once the recipe JSON-LD is complete")
+    return True
+
+
+def test_archive_replay():
+    server, base_url = start_server()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = HTMLArchive(os.path.join(tmp, 'archive'))
+        fetcher = RecipeFetcher(archive=archive)
+        try:
+            fetched = fetcher.fetch_page(f"{base_url}/large")
+            fetcher.fetch_page(f"{base_url}/recipe")
+            # Same body under another URL is stored once
+            fetcher.fetch_page(f"{base_url}/recipe-copy")
+            # Same path, other query: another page
+            fetcher.fetch_page(f"{base_url}/recipe?id=2")
+        finally:
+            fetcher.close()
+            server.shutdown()
+            server.server_close()
+
+        # Archived pages are never cut short by the JSON-LD early stop
+        assert not fetched.stopped_early and fetched.content == large_page
+        assert archive.stats()['urls'] == 4 and archive.stats()['blobs'] == 2
+        assert archive.get(f"{base_url}/recipe").content == sample_page
+        assert archive.get(f"{base_url}/recipe?id=2").content == large_page
+        assert archive.stats()['segment_bytes'] < len(large_page) // 10
+        archive.close()
+
+        # Replay from a reopened archive: the server is gone
+        reopened = HTMLArchive(os.path.join(tmp, 'archive'))
+        parser = RecipeParser(fetcher=RecipeFetcher(archive=reopened, replay=True))
+        assert parser.get_ingredients(f"{base_url}/recipe") == ['2 cups flour', '1 cup milk']
+        assert parser.get_ingredients(f"{base_url}/recipe?id=2") == ['1 cup flour', '2 eggs']
+        assert parser.get_ingredients(f"{base_url}/never-fetched") == []
+        reopened.close()
+
+        output = os.path.join(tmp, 'replay.jsonl')
+        stats = replay(os.path.join(tmp, 'archive'), output, processes=2)
+        with open(output) as f:
+            results = {r['url']: r for r in map(json.loads, f)}
+
+        # --limit applies to the archived URL list when no --urls file is given
+        limited = crawler_main(['--replay', '--archive', os.path.join(tmp, 'archive'),
+                                '--output', os.path.join(tmp, 'limited.jsonl'), '--limit', '2',
+                                '--processes', '1'])
+
+    print("Replay stats:", stats)
+    assert stats['urls'] == 4 and stats['missing'] == 0
+    assert limited['urls'] == 2
+    assert results[f"{base_url}/recipe-copy"]['ingredients'] == ['2 cups flour', '1 cup milk']
+    print("✅ Archive dedupes and compresses pages, replay parses them offline")
+    return True
+
+
+def _archive_pages(directory, worker, count, start):
+    archive = HTMLArchive(directory)
+    start.wait()
+    for i in range(count):
+        archive.put(f"https://recipes.test/{worker}/{i}", f"<p>{worker} {i}</p>".encode() * (i % 50 + 1))
+    archive.close()
+
+
+def test_archive_concurrent_writers():
+    import multiprocessing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'archive')
+        # Two processes append to one archive at once (web workers sharing LANES_ARCHIVE_DIR)
+        start = multiprocessing.Event()
+        workers = [multiprocessing.Process(target=_archive_pages, args=(directory, worker, 1000, start))
+                   for worker in ('a', 'b')]
+        for worker in workers:
+            worker.start()
+        start.set()
+        for worker in workers:
+            worker.join()
+
+        archive = HTMLArchive(directory)
+        try:
+            assert len(archive) == 2000
+            for worker in ('a', 'b'):
+                for i in range(1000):
+                    page = archive.get(f"https://recipes.test/{worker}/{i}")
+                    assert page.content == f"<p>{worker} {i}</p>".encode() * (i % 50 + 1)
+        finally:
+            archive.close()
+
+    print("✅ Concurrent archive writers never record stale offsets")
+    return True
+
+
+def test_politeness_scheduler():
+    # Token bucket: burst of 2, then callers queue at the refill rate
+    bucket = TokenBucket(rate=10, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[0] == waits[1] == 0
+    assert 0.05 < waits[2] < waits[3] <= 0.2
+
+    # Round robin interleaves domains in first-seen order
+    urls = ['https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://b.com/1', 'https://c.com/1']
+    assert list(PolitenessScheduler.round_robin(urls)) == [
+        'https://a.com/1', 'https://b.com/1', 'https://c.com/1', 'https://a.com/2', 'https://a.com/3'
+    ]
+
+    server, base_url = start_server()
+    fetcher = RecipeFetcher()
+    scheduler = PolitenessScheduler(fetcher, rate=5, burst=1)
+    try:
+        assert scheduler.allowed(f"{base_url}/recipe")
+        assert not scheduler.allowed(f"{base_url}/private/recipe")
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+
+    # Crawl-delay: 2 lowers the domain rate to 0.5 requests/second
+    assert scheduler.bucket(base_url).rate == 0.5
+
+    # 403s back off, successes recover towards the base rate
+    scheduler.record_response(base_url, 403)
+    assert scheduler.bucket(base_url).rate == 0.25
+    scheduler.record_response(base_url, 200)
+    assert scheduler.bucket(base_url).rate == 0.3
+    print("✅ Politeness scheduler honours robots.txt and rate limits")
+    return True
+
+
+class LoopbackResolver(HostResolver):
+    """Resolves recipes.test to the local test server (and skips IP validation)"""
+
+    def _lookup(self, host):
+        return ['127.0.0.1'], None, self.ttl
+
+
+def test_resolver_blocks_private_addresses():
+    for address in ['127.0.0.1', '10.1.2.3', '172.20.0.1', '192.168.1.1', '169.254.169.254',
+                    '100.64.0.1', '0.0.0.0', '::1', 'fe80::1', 'fc00::1', '::ffff:10.0.0.1']:
+        assert not is_public_address(address), address
+    for address in ['93.184.216.34', '2606:4700::6810:85e5']:
+        assert is_public_address(address), address
+
+    # A public-looking name that resolves to a private address is rejected
+    lookups = []
+
+    def fake_getaddrinfo(host, port, proto=0):
+        lookups.append(host)
+        address = '10.0.0.5' if host == 'internal.example.com' else '93.184.216.34'
+        return [(2, 1, 6, '', (address, 0))]
+
+    resolver = HostResolver(getaddrinfo=fake_getaddrinfo)
+    for _ in range(3):
+        assert resolver.check_url('https://www.allrecipes.com/recipe/1') == ['93.184.216.34']
+        try:
+            resolver.check_url('https://internal.example.com/admin')
+            assert False, "private address should be blocked"
+        except UnsafeURLError:
+            pass
+    try:
+        resolver.check_url('file:///etc/passwd')
+        assert False, "file scheme should be blocked"
+    except UnsafeURLError:
+        pass
+
+    # Each host was looked up once, the rest were cache hits
+    assert lookups == ['www.allrecipes.com', 'internal.example.com']
+    assert resolver.stats['hits'] == 4
+
+    # A pinned fetcher refuses loopback even though the URL is an IP literal
+    server, base_url = start_server()
+    guarded = RecipeFetcher(resolver=HostResolver())
+    pinned = RecipeFetcher(resolver=LoopbackResolver())
+    try:
+        try:
+            guarded.get(f"{base_url}/recipe")
+            assert False, "loopback should be blocked"
+        except UnsafeURLError:
+            pass
+
+        # recipes.test is not in DNS: the connection goes to the pinned address
+        port = server.server_address[1]
+        response = pinned.get(f"http://recipes.test:{port}/recipe")
+        assert response.status_code == 200
+    finally:
+        guarded.close()
+        pinned.close()
+        server.shutdown()
+        server.server_close()
+
+    print("✅ Resolver validates resolved IPs and pins connections")
+    return True
+
+
+def test_canonical_url_map():
+    from flask import Flask
+    from models import db, LocalStorageCache, CanonicalURL
+    from widget_service import CanonicalURLService, LocalStorageService
+
+    server, base_url = start_server()
+    base_url = f"http://recipes.test:{server.server_address[1]}"
+    fetcher = RecipeFetcher(resolver=LoopbackResolver())
+    parser = RecipeParser(fetcher=fetcher)
+    with tempfile.TemporaryDirectory() as tmp:
+        cached_parser = RecipeParser(fetcher=fetcher, http_cache=HTTPCache(tmp))
+        try:
+            page = parser.parse(f"{base_url}/old-pancakes")
+            # The rel=canonical target survives a 304 revalidation
+            fetched = cached_parser.parse(f"{base_url}/amp/pancakes")
+            revalidated = cached_parser.parse(f"{base_url}/amp/pancakes")
+        finally:
+            fetcher.close()
+            server.shutdown()
+            server.server_close()
+
+    assert page.ingredients == ['2 cups flour', '1 cup milk']
+    assert page.redirects == (f"{base_url}/old-pancakes",)
+    assert page.final_url == f"{base_url}/amp/pancakes"
+    assert page.canonical_url == f"{base_url}/pancakes"
+    assert fetched.canonical_url == revalidated.canonical_url == f"{base_url}/pancakes"
+    assert revalidated.ingredients == page.ingredients
+    assert cached_parser.http_cache.stats['result_hits'] == 1
+
+    test_app = Flask(__name__)
+    test_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(test_app)
+    with test_app.app_context():
+        db.create_all()
+        canonical_urls = CanonicalURLService(db, CanonicalURL)
+        local_storage = LocalStorageService(db, LocalStorageCache, canonical_urls=canonical_urls)
+
+        canonical = canonical_urls.record(f"{base_url}/old-pancakes?utm_source=pin", page.final_url,
+                                          page.redirects, page.canonical_url)
+        assert canonical == f"{base_url}/pancakes"
+        local_storage.cache_recipe_data(f"{base_url}/old-pancakes", {'ingredients': page.ingredients})
+
+        # Every alias shares the canonical entry
+        for alias in ['/old-pancakes', '/amp/pancakes', '/pancakes/']:
+            cached = local_storage.get_cached_data(base_url + alias)
+            assert cached and cached['recipe_data']['ingredients'] == page.ingredients, alias
+        assert LocalStorageCache.query.count() == 1
+
+        # Chains recorded later are followed, and survive a fresh (unmemoized) service
+        canonical_urls.record(f"{base_url}/pancakes", f"https://recipes.test/pancakes",
+                              (f"{base_url}/pancakes",))
+        fresh = CanonicalURLService(db, CanonicalURL)
+        assert fresh.resolve(f"{base_url}/amp/pancakes") == "https://recipes.test/pancakes"
+
+        # rel=canonical pointing at another site is ignored
+        other = canonical_urls.record("https://blog.test/a", canonical_url="https://spam.test/b")
+        assert other == "https://blog.test/a"
+
+        # Another worker inserted the alias between our lookup and our insert:
+        # recording is best effort, the session is rolled back and stays usable
+        import app as web_app
+
+        class StaleReads:
+            """CanonicalURL whose lookups miss rows another worker just wrote"""
+            query = SimpleNamespace(filter_by=lambda **kwargs: SimpleNamespace(first=lambda: None))
+
+            def __new__(cls, **kwargs):
+                return CanonicalURL(**kwargs)
+
+        racing = CanonicalURLService(db, StaleReads)
+        original, web_app.canonical_urls = web_app.canonical_urls, racing
+        try:
+            web_app.record_aliases(f"{base_url}/old-pancakes", page)
+        finally:
+            web_app.canonical_urls = original
+        assert CanonicalURL.query.count() >= 2
+        assert racing.resolve(f"{base_url}/old-pancakes") == f"{base_url}/old-pancakes"
+
+    print("✅ Redirect chains and rel=canonical collapse aliases onto one cache entry")
+    return True
+
+
+if __name__ == '__main__':
+    success = (test_fetcher_reuses_connections() and test_bulk_crawler_writes_results()
+               and test_http_cache_revalidates() and test_streaming_fetch_stops_early()
+               and test_archive_replay() and test_archive_concurrent_writers()
+               and test_politeness_scheduler() and test_resolver_blocks_private_addresses()
+               and test_canonical_url_map())
+    exit(0 if success else 1)
@@ -59,6 +59,490 @@ def test_parser():
     print("\n✅ Parser test completed successfully!")
     return len(ingredients) > 0
 
+# Fixtures exercising each strategy: markup, food density and plain lists
+density_fragment = """
+<div><p>flour sugar butter eggs milk salt</p></div>
+<ul><li>2 cups flour</li><li>1 cup sugar</li><li>3 eggs</li></ul>
+"""
+
+plain_lists_html = """
+<html><body>
+    <ul><li>Home</li><li>About</li></ul>
+    <ol><li>2 cups flour</li><li>1 cup sugar</li><li>3 large eggs</li><li>salt</li></ol>
+</body></html>
+"""
+
+
+def test_backends_agree():
+    from collections import namedtuple
+    from html_backends import make_soup, LXML_AVAILABLE
+
+    parser = RecipeParser()
+    if not LXML_AVAILABLE:
+        print("lxml not installed, skipping backend comparison")
+        return True
+
+    for name, html in [('markup', sample_recipe_html), ('density', density_fragment),
+                       ('lists', plain_lists_html)]:
+        expected = parser._extract_from_soup(make_soup(html, 'html.parser'))
+        actual = parser._extract_from_soup(make_soup(html, 'lxml'))
+        assert expected, name
+        assert actual == expected, (name, expected, actual)
+
+    # PCP schemas: xpath runs on lxml directly, css and json-ld on the same page
+    Schema = namedtuple('Schema', ['selector_type', 'ingredient_selector'])
+    xpath = Schema('xpath', '//ul[@class="ingredients"]/li[@itemprop="recipeIngredient"]')
+    css = Schema('css', 'ul.ingredients > li')
+    expected = parser.extract_ingredients(sample_recipe_html)
+    assert parser.extract_ingredients(sample_recipe_html, schema=xpath) == expected
+    assert parser.extract_ingredients(sample_recipe_html, schema=css) == expected
+    # A selector that matches nothing falls back to the generic strategies
+    missing = Schema('xpath', '//div[@id="nope"]//li')
+    assert parser.extract_ingredients(sample_recipe_html, schema=missing) == expected
+
+    print("✅ lxml and html.parser backends give identical results")
+    return True
+
+
+json_ld_page = b"""<html><head>
+<link rel="canonical" href="/recipes/soup">
+<script type="application/ld+json">/*<![CDATA[*/
+{"@context": "https://schema.org", "@graph": [
+    {"@type": "WebSite", "name": "Soup Blog"},
+    [{"@type": ["Recipe"], "name": "Tomato Soup",
+      "image": {"@type": "ImageObject", "url": "https://example.com/soup.jpg"},
+      "recipeIngredient": ["2 cups tomatoes", "1 onion, diced", 7, "1 tsp salt"]}]
+]}
+/*]]>*/</script>
+</head><body><ul class="ingredients"><li>Markup only</li></ul></body></html>"""
+
+
+def test_json_ld_fast_path():
+    import recipe_parser
+    from jsonld import extract_recipe
+
+    recipe = extract_recipe(json_ld_page)
+    assert recipe.name == 'Tomato Soup'
+    assert recipe.image == 'https://example.com/soup.jpg'
+    assert recipe.ingredients == ['2 cups tomatoes', '1 onion, diced', '1 tsp salt']
+
+    # The DOM is never built when the JSON-LD has the ingredients
+    parser = RecipeParser()
+    make_soup = recipe_parser.make_soup
+    recipe_parser.make_soup = None
+    try:
+        ingredients = parser.extract_ingredients(json_ld_page)
+        canonical = parser.find_canonical_url(json_ld_page, 'https://example.com/amp/soup')
+    finally:
+        recipe_parser.make_soup = make_soup
+    assert ingredients == ['2 cups tomatoes', '1 onion, diced', '1 tsp salt']
+    assert canonical == 'https://example.com/recipes/soup'
+
+    # Pages without JSON-LD still go through the DOM strategies
+    assert parser.extract_ingredients(sample_recipe_html)[0] == '2 cups all-purpose flour'
+    print("✅ JSON-LD fast path extracts recipes without building a DOM")
+    return True
+
+
+def test_selector_set_matches_select():
+    from html_backends import make_soup
+    from selector_engine import SelectorSet
+
+    selectors = RecipeParser.SEMANTIC_SELECTORS.selectors + [
+        'ul.ingredients > li', 'li:not([itemprop])', '[class*="ingredient"] li',
+        'h1, h2', 'div > h2 + ul li', '*', 'li:nth-child(2)', '.no-match li', 'li[itemprop$="Ingredient"]'
+    ]
+    selector_set = SelectorSet(selectors)
+    for html in [sample_recipe_html, density_fragment, plain_lists_html, json_ld_page]:
+        soup = make_soup(html)
+        assert selector_set.select(soup) == [soup.select(selector) for selector in selectors]
+
+    print("✅ Single-pass selector set matches soup.select for every selector")
+    return True
+
+
+def legacy_food_density(parser, soup):
+    """The original top-down _extract_by_food_density, kept as the reference"""
+    ingredients = []
+    for script in soup(['script', 'style', 'nav', 'header', 'footer']):
+        script.decompose()
+    for parent in (soup.body or soup).find_all(['div', 'section', 'ul', 'ol']):
+        text = parent.get_text(' ', strip=True)
+        words = text.split()
+        if len(words) < 3:
+            continue
+        food_word_count = sum(1 for word in words if parser.clean_text(word) in parser.food_words)
+        if food_word_count / len(words) > parser.MIN_FOOD_DENSITY:
+            for line in text.split('\n'):
+                line = line.strip()
+                if line and len(line) > 2 and not line.endswith(':'):
+                    if any(parser.clean_text(w) in parser.food_words for w in line.split()):
+                        ingredients.append(parser.clean_text(line))
+            if ingredients:
+                break
+    return ingredients[:parser.MAX_INGREDIENTS]
+
+
+def test_food_density_matches_reference():
+    from html_backends import make_soup
+
+    parser = RecipeParser()
+    nested = ('<html><body>' + '<div><p>Our family story, told at length.</p>' * 30 +
+              '<section><!-- flour sugar butter --><ul><li>2 cups flour</li>\n<li>1 cup\nsugar</li>'
+              '<li>3 eggs</li></ul></section>' + '</div>' * 30 + '</body></html>')
+    pages = [sample_recipe_html, density_fragment, plain_lists_html, nested,
+             '<div>flour sugar</div>', '<html><body><div><![CDATA[flour sugar salt]]></div></body></html>']
+    for html in pages:
+        for backend in ('html.parser', 'lxml'):
+            expected = legacy_food_density(parser, make_soup(html, backend))
+            assert parser._extract_by_food_density(make_soup(html, backend)) == expected, (html[:40], backend)
+    print("✅ Bottom-up food density scorer matches the original results")
+    return True
+
+
+def test_lexicon_normalizers():
+    import re
+    from lexicon import Lexicon, clean_token, alpha_token
+
+    tokens = ['Flour', ' (Sugar)', 'eggs;', '"Salt"', 'Crème', 'jalapeño', '1/2', 'olive-oil', '', '  ']
+    for token in tokens:
+        assert clean_token(token) == re.sub(r'[<>\[\]()@#$%^&*;:?"]', '', token.lower().strip()), token
+        assert alpha_token(token) == re.sub(r'[^a-z]', '', token.lower()), token
+
+    clean = Lexicon(['flour', 'sugar', 'eggs'])
+    assert clean.classify(['(Flour)', 'cup', 'EGGS;']) == [True, False, True]
+    assert clean.count(['sugar', 'Sugar', 'salt']) == 2
+    assert clean.any(['a', 'b']) is False
+    alpha = Lexicon(['oliveoil', 'cup'], normalizer='alpha')
+    assert alpha.match('olive-oil') and alpha.match('cups') is False
+    print("✅ Lexicon normalizers match the original regex cleaning")
+    return True
+
+
+def test_phrase_matcher():
+    from collocations import PhraseMatcher, load_phrase_matcher, tokenize
+
+    matcher = load_phrase_matcher()
+    phrases = set(matcher.phrases)
+    longest = max(len(phrase.split()) for phrase in phrases)
+    texts = ['2 cups Andouille-sausage, sliced, and anise pod fennel seeds',
+             'A pinch of black pepper and a medium bowl of baby spinach',
+             'ushers his hers', sample_recipe_html]
+    for text in texts:
+        tokens = tokenize(text)
+        expected = sorted((i, j) for i in range(len(tokens)) for j in range(i + 1, min(i + longest, len(tokens)) + 1)
+                          if ' '.join(tokens[i:j]) in phrases)
+        assert sorted((m.start, m.end) for m in matcher.finditer(text)) == expected, text[:40]
+
+    overlapping = PhraseMatcher(['he', 'she', 'she rs', 'his', 'hers', 'a b', 'b c d', 'c'])
+    assert [m.phrase for m in overlapping.finditer('ushe rs she a b c d')] == ['she', 'a b', 'c', 'b c d']
+    assert overlapping.count('a b c d', min_words=2) == 2 and not overlapping.any('she', min_words=2)
+    print("✅ Aho-Corasick phrase matcher finds every collocation n-gram")
+    return True
+
+
+def test_lexicon_artifact():
+    import os
+    import pickle
+    import tempfile
+    import build_lexicons
+    from lexicon import load_artifact
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'lexicons.bin')
+        build_lexicons.build(path)
+        artifact = load_artifact(path)
+        fresh = build_lexicons.compile_artifact()
+        assert artifact['csv_words'] == fresh['csv_words']
+        for key, lexicon in fresh['lexicons'].items():
+            assert artifact['lexicons'][key].words == lexicon.words
+        for key, matcher in fresh['phrase_matchers'].items():
+            text = 'Add a pinch of black pepper and 2 cups andouille sausage'
+            assert artifact['phrase_matchers'][key].find_all(text) == matcher.find_all(text)
+
+        # A source CSV that changed after the build makes the artifact stale
+        stale_path = os.path.join(directory, 'stale.bin')
+        fresh['sources']['food_words_.csv'] = '0' * 64
+        with open(stale_path, 'wb') as f:
+            pickle.dump(fresh, f)
+        assert load_artifact(stale_path) is None
+    print("✅ Lexicon artifact round-trips and is rejected when stale")
+    return True
+
+
+def test_nltk_is_lazy():
+    import os
+    import sys
+    import subprocess
+
+    code = ("import sys, recipe_parser; recipe_parser.RecipeParser().extract_ingredients(b'<ul><li>2 cups flour</li></ul>'); "
+            "print('nltk' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip().splitlines()[-1] == 'False', result.stdout + result.stderr
+    print("✅ Parsing never imports NLTK")
+    return True
+
+
+def test_extraction_pipeline():
+    from fetcher import FetchedPage
+    from extraction_pipeline import ExtractionPipeline
+
+    class CountingFetcher:
+        replay = True  # nothing is fetched over the network
+
+        def __init__(self, pages):
+            self.pages = pages
+            self.calls = []
+
+        def fetch_page(self, url, headers=None, timeout=None):
+            self.calls.append(url)
+            return FetchedPage(url, 200, {}, self.pages[url], False, False, ())
+
+    fetcher = CountingFetcher({'/json-ld': json_ld_page, '/markup': sample_recipe_html.encode(),
+                               '/lists': plain_lists_html.encode(), '/empty': b'<html><body><p>Hi</p></body></html>'})
+    pipeline = ExtractionPipeline(fetcher=fetcher, parser=RecipeParser(fetcher=fetcher))
+
+    result = pipeline.extract('/json-ld')
+    assert result.strategy == 'json_ld' and 'parse' not in result.timings
+    assert result.ingredients == ['2 cups tomatoes', '1 onion, diced', '1 tsp salt']
+    assert pipeline.extract('/markup').strategy == 'microdata'
+    assert pipeline.extract('/lists').ingredients
+
+    # Nothing found: one fetch, one DOM build, every strategy timed
+    result = pipeline.extract('/empty')
+    assert result.ingredients == [] and result.strategy is None
+    names = [strategy.name for strategy in pipeline.strategies]
+    assert list(result.timings) == ['fetch', names[0], 'parse'] + names[1:]
+    assert fetcher.calls == ['/json-ld', '/markup', '/lists', '/empty']
+
+    # One shared pipeline, concurrent documents: no run sees another's matches
+    import threading
+    expected = {url: pipeline.run(fetcher.pages[url]).ingredients for url in ('/markup', '/lists')}
+    mismatches = []
+
+    def run_many(url):
+        for _ in range(20):
+            if pipeline.run(fetcher.pages[url]).ingredients != expected[url]:
+                mismatches.append(url)
+
+    threads = [threading.Thread(target=run_many, args=(url,)) for url in ('/markup', '/lists') * 2]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not mismatches and '_matches' not in vars(pipeline)
+    print("✅ Extraction pipeline fetches once and runs every strategy on one document")
+    return True
+
+
+def test_ingredient_parser():
+    from ingredient_parser import get_engine, labelled_lines
+
+    engine = get_engine()
+    flour, tomatoes, quinoa, salt, eggs = engine.parse_many([
+        '2 cups flour', '2 (14.5 ounce) cans diced tomatoes, drained', '1 1/2 cups quinoa, rinsed',
+        'pinch of salt', '2-3 large eggs'])
+    assert (flour.quantity, flour.unit, flour.item) == ('2', 'cups', 'flour')
+    assert (tomatoes.size, tomatoes.canonical_unit, tomatoes.item, tomatoes.preparation) == (
+        '14.5 ounce', 'can', 'diced tomatoes', 'drained')
+    assert (quinoa.value, quinoa.canonical_unit, quinoa.preparation) == (1.5, 'cup', 'rinsed')
+    assert (salt.quantity, salt.unit, salt.item) == ('', 'pinch', 'salt')
+    assert (eggs.value, eggs.max_value, eggs.unit, eggs.item) == (2, 3, '', 'large eggs')
+
+    details = RecipeParser().parse_ingredient_details('1 onion, diced')
+    assert details == {'quantity': '1', 'unit': '', 'item': 'onion', 'preparation': 'diced'}
+
+    labelled = labelled_lines()
+    if labelled:
+        agreed = sum(engine.parse(line).quantity == quantity for line, quantity, _ in labelled)
+        assert agreed >= 0.9 * len(labelled), f"quantity agreement {agreed}/{len(labelled)}"
+    print("✅ Ingredient parser splits quantity, unit, item and preparation")
+    return True
+
+
+def test_pos_patterns():
+    from extraction_pipeline import ExtractionPipeline
+    from pos_patterns import PatternScorer, TagPatternAutomaton, load_tag_patterns
+    from pos_tagger import TaggingService
+
+    automaton = TagPatternAutomaton(load_tag_patterns())
+    assert automaton.match(['CD', 'CC', 'CD', 'JJ', 'NN'])
+    assert not automaton.match(['CD', 'CC', 'CD', 'JJ', 'NN', 'NN'])
+    assert automaton.longest_match(['CD', 'CC', 'CD', 'JJ', 'NN', 'NN']) == 5
+
+    # Stub tagger: the real one needs NLTK data
+    tags = {'blorpy': 'JJ', 'click': 'VB', 'here': 'RB'}
+    calls = []
+
+    def tagger(sentences):
+        calls.extend(sentences)
+        return [[(token, tags.get(token, 'NN')) for token in tokens] for tokens in sentences]
+
+    scorer = PatternScorer(automaton, TaggingService(tagger))
+    assert scorer.is_ingredient('Blorpy zzyzx!') and scorer.is_ingredient('blorpy  zzyzx')
+    assert not scorer.is_ingredient('click here')
+    assert calls == [['blorpy', 'zzyzx'], ['click', 'here']]
+
+    # Last stage of is_likely_ingredient, dropped if the tagger data is missing
+    pipeline = ExtractionPipeline(pattern_scorer=scorer)
+    assert pipeline.is_likely_ingredient('blorpy zzyzx') and not pipeline.is_likely_ingredient('click here')
+
+    def missing_tagger(sentences):
+        raise LookupError('no tagger')
+
+    pipeline = ExtractionPipeline(pattern_scorer=PatternScorer(automaton, TaggingService(missing_tagger)))
+    assert not pipeline.is_likely_ingredient('blorpy zzyzx') and pipeline.pattern_scorer is None
+    print("✅ POS-pattern automaton classifies tagged lines, tagging each line once")
+    return True
+
+
+def test_tagging_service():
+    import os
+    import tempfile
+    from pos_tagger import TaggingService, TagStore
+
+    batches = []
+
+    def tagger(sentences):
+        batches.append(sentences)
+        return [[(token, 'CD' if token.isdigit() else 'NN') for token in tokens] for tokens in sentences]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tags.jsonl')
+        service = TaggingService(tagger, cache_size=2, store=path)
+        lines = ['2 eggs', '1 Teaspoon salt', '2  eggs', '', '2 eggs,', 'flour']
+        assert service.tag_many(lines) == ['CD NN', 'CD NN NN', 'CD NN', '', 'CD NN', 'NN']
+        # Deduped after normalization and tagged in one batch
+        assert batches == [[['2', 'eggs'], ['1', 'teaspoon', 'salt'], ['flour']]]
+
+        # '2 eggs' fell out of the 2-entry LRU but is still in the store
+        assert service.tag('2 eggs') == 'CD NN' and service.stats['store_hits'] == 1
+        assert len(batches) == 1
+
+        # A new process reads the store instead of tagging
+        restarted = TaggingService(tagger, store=TagStore(path))
+        assert restarted.tag_many(['1 teaspoon salt', 'flour']) == ['CD NN NN', 'NN']
+        assert len(batches) == 1 and restarted.stats['tagged'] == 0
+    print("✅ Tagging service dedupes batches and memoizes tag sequences")
+    return True
+
+
+def test_quantities():
+    from fractions import Fraction
+    from types import SimpleNamespace
+    from quantities import aggregate, convert, parse_amount, packages_needed
+    from amazon_fresh_service import AmazonFreshService
+    from checkout_service import CheckoutService
+
+    assert parse_amount('1 1/2') == (Fraction(3, 2), None)
+    assert parse_amount('1½ to 2') == (Fraction(3, 2), Fraction(2))
+    assert convert(Fraction(1, 3), 'cup', 'teaspoon') == 16
+    assert convert(Fraction(1), 'pound', 'ounce') == 16
+    assert convert(Fraction(2), 'cup', 'gram', 'all-purpose flour') == 250
+    assert convert(Fraction(1), 'cup', 'gram', 'gravel') is None
+
+    flour, eggs, salt = aggregate(['2 cups flour', '1/3 cup flour, sifted', '2-3 eggs', 'Salt', '⅔ cup flour',
+                                   '12 eggs', '1 tsp salt'])
+    assert (flour.amount, flour.unit, flour.indexes) == (3, 'cup', [0, 1, 4])
+    assert (eggs.amount, eggs.unit, eggs.indexes) == (15, '', [2, 5])
+    assert (salt.amount, salt.unit) == (1, 'teaspoon')
+    assert packages_needed(eggs, '12 count') == 2 and packages_needed(flour, '5 lb') == 1
+
+    # Each item is matched and priced once, in packages
+    cart = [{'id': 7, 'text': '2 cups flour'}, {'id': 8, 'text': '6 large eggs'},
+            {'id': 9, 'text': '1/2 cup flour'}, {'id': 10, 'text': '12 eggs'}]
+    package = AmazonFreshService().get_amazon_fresh_data_package(cart)
+    assert package['item_count'] == 2 and package['line_products'] == [0, 1, 0, 1]
+    assert [product['quantity'] for product in package['products']] == [1, 2]
+    assert package['subtotal'] == round(3.99 + 2 * 4.49, 2)
+
+    # Descriptors, prep words and units differ, the product is the same
+    mixed = AmazonFreshService().get_amazon_fresh_data_package(
+        ['2 cups all-purpose flour', '1 cup chopped onion', '1/2 cup flour, sifted', '2 onions',
+         '1 tsp salt', '1 tablespoon kosher salt', '10 lb flour'])
+    assert [product['product']['name'] for product in mixed['products']] == [
+        'All-Purpose Flour, 5 lb', 'Yellow Onions, 3 lb bag', 'Sea Salt, 26 oz']
+    assert mixed['line_products'] == [0, 1, 0, 1, 2, 2, 0]
+    assert mixed['products'][2]['amount'] == '4 teaspoon'
+    # 2 1/2 cups (about 0.7 lb) on top of 10 lb takes a third bag
+    assert mixed['products'][0]['quantity'] == 3
+
+    # Order items point at the first cart line of their product
+    added = []
+    db = SimpleNamespace(session=SimpleNamespace(add=added.append, flush=lambda: None, commit=lambda: None))
+    user = SimpleNamespace(id=1, name='A', email='a@example.com', address='', phone='')
+    checkout = CheckoutService(db, lambda **kwargs: SimpleNamespace(id=1, **kwargs),
+                               lambda **kwargs: SimpleNamespace(**kwargs), AmazonFreshService())
+    checkout.create_order(user, {}, cart)
+    assert [(item.ingredient_id, item.quantity) for item in added[1:]] == [(7, 1), (8, 2)]
+    print("✅ Quantities add up exactly and the cart prices each product once")
+    return True
+
+
+def test_normalize_spacing():
+    from ingredient_parser import normalize_spacing
+
+    assert normalize_spacing('¼cuppacked  brown sugar ') == '¼ cup packed brown sugar'
+    assert normalize_spacing('1 1/2cupsflour') == '1 1/2 cups flour'
+    assert normalize_spacing('2tspsalt') == '2 tsp salt'
+    # Units keep their own endings, and words that merely start with one stay whole
+    for text in ('2 cups flour', '3 pinches salt', '1 canned tomato', 'headless shrimp', '2 cans beans'):
+        assert normalize_spacing(text) == text, text
+    # The longest unit must not take the next word's first letter
+    for glued, spaced in [('1cupsugar', '1 cup sugar'), ('1 cupspinach', '1 cup spinach'),
+                          ('1lbsausage', '1 lb sausage'), ('½cupsour cream', '½ cup sour cream'),
+                          ('2clovesgarlic', '2 cloves garlic'), ('2 slicedbread', '2 sliced bread')]:
+        assert normalize_spacing(glued) == spaced, glued
+    assert RecipeParser().clean_text('2Cups Flour;') == '2 cups flour'
+    # WPRM-style spans lose their spaces in get_text(strip=True)
+    wprm = ('<ul class="ingredients"><li class="wprm-recipe-ingredient"><span>1</span><span>cup</span><span>sugar</span></li>'
+            '<li class="wprm-recipe-ingredient"><span>2</span><span>cups</span><span>flour</span></li></ul>')
+    assert RecipeParser().extract_ingredients(wprm) == ['1 cup sugar', '2 cups flour']
+    print("✅ Spacing normalizer splits glued amounts and units in one pass")
+    return True
+
+
+def test_product_index():
+    from difflib import SequenceMatcher
+    from product_index import ProductIndex
+    from amazon_fresh_service import AmazonFreshService
+
+    service = AmazonFreshService()
+    index = service.product_index
+    assert index is service.product_index and index is AmazonFreshService().product_index
+
+    def keyword(text):
+        match = service.match_ingredient_to_product(text)
+        return match['product']['name'].split(',')[0] if match['matched'] else None
+
+    assert keyword('1 cup sour cream') == 'Sour Cream'        # phrase over 'cream'
+    assert keyword('1 (8 ounce) package cream cheese') == 'Cream Cheese'
+    assert keyword('1 egg, beaten') == 'Large Brown Eggs'     # plural keyword
+    assert keyword('3 tomatoes') == 'Roma Tomatoes'
+    assert keyword('1/2 cup mayonnaise') == 'Mayonnaise'      # keyword as a word prefix
+    assert keyword('1 stick unsalted butter') == 'Unsalted Butter'
+    assert keyword('flor') == 'All-Purpose Flour'             # fuzzy stage
+
+    # The pruned fuzzy stage scores exactly like a full SequenceMatcher scan
+    catalog = {word: {'name': word} for word in ('flour', 'floor wax', 'flowers', 'sour', 'tofu', 'saffron')}
+    index = ProductIndex(catalog)
+    for text in ('flor', 'flouring agent', 'sauerkraut', 'tof', 'x'):
+        scores = [(SequenceMatcher(None, text, word).ratio(), -rank) for rank, word in enumerate(catalog)]
+        best = max(scores)
+        fuzzy = index.fuzzy(text)
+        assert (fuzzy[1] if fuzzy else None) == (list(catalog)[-best[1]] if best[0] > 0.4 else None), text
+    print("✅ Product index matches phrases, plurals and word prefixes without scanning the catalog")
+    return True
+
+
 if __name__ == '__main__':
-    success = test_parser()
+    success = (test_parser() and test_backends_agree() and test_json_ld_fast_path()
+               and test_selector_set_matches_select() and test_food_density_matches_reference()
+               and test_lexicon_normalizers() and test_phrase_matcher()
+               and test_lexicon_artifact() and test_nltk_is_lazy()
+               and test_extraction_pipeline() and test_ingredient_parser()
+               and test_pos_patterns() and test_tagging_service()
+               and test_quantities() and test_normalize_spacing()
+               and test_product_index())
     exit(0 if success else 1)
@@ -5,6 +5,7 @@ Handles Holistic Market widget embedding and PCP integration
 import secrets
 import hashlib
 import re
+import threading
 from urllib.parse import urlparse
 from datetime import datetime, timedelta
 
@@ -94,12 +95,131 @@ class WidgetService:
         }
 
 
+class CanonicalURLService:
+    """
+    Persistent alias -> canonical URL map
+
+    One recipe is reachable under many URLs (http/https, www, AMP pages,
+    redirecting short links). Every observed redirect chain and
+    <link rel=canonical> target is recorded here, so cache lookups for any
+    alias land on the canonical URL's entry. Resolved aliases are memoized
+    in-process; unknown URLs fall through to one indexed query.
+    """
+
+    MAX_HOPS = 5
+
+    def __init__(self, db, CanonicalURL, memo_size=10000):
+        self.db = db
+        self.CanonicalURL = CanonicalURL
+        self.memo_size = memo_size
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, url_hash):
+        with self._lock:
+            if url_hash in self._memo:
+                return self._memo[url_hash]
+        entry = self.CanonicalURL.query.filter_by(alias_hash=url_hash).first()
+        if entry is None:
+            return None
+        self._remember(url_hash, entry.canonical_url)
+        return entry.canonical_url
+
+    def _remember(self, url_hash, canonical_url):
+        with self._lock:
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            self._memo[url_hash] = canonical_url
+
+    def resolve(self, url):
+        """
+        Get the canonical URL for a URL (the URL itself if no alias is known)
+
+        Follows chains recorded at different times (A -> B, later B -> C).
+        """
+        seen = set()
+        for _ in range(self.MAX_HOPS):
+            url_hash = WidgetService.url_hash(url)
+            if url_hash in seen:
+                break
+            seen.add(url_hash)
+            target = self._lookup(url_hash)
+            if target is None:
+                break
+            url = target
+        return url
+
+    def record(self, url, final_url=None, redirects=(), canonical_url=None):
+        """
+        Record the aliases observed while fetching a URL
+
+        Args:
+            url: URL that was requested
+            final_url: URL the redirect chain ended at
+            redirects: Intermediate URLs of the redirect chain
+            canonical_url: The page's <link rel=canonical> target; only
+                trusted when it stays on the same site as final_url
+
+        Returns:
+            The canonical URL all aliases now resolve to
+        """
+        final_url = final_url or url
+        canonical, source = final_url, 'redirect'
+        if canonical_url and urlparse(canonical_url).scheme in ('http', 'https') \
+                and WidgetService.extract_domain(canonical_url) == WidgetService.extract_domain(final_url):
+            canonical, source = canonical_url, 'rel-canonical'
+
+        canonical_hash = WidgetService.url_hash(canonical)
+        changed = False
+        recorded = []
+        aliases = {WidgetService.url_hash(alias): alias for alias in [url] + list(redirects) + [final_url]}
+        for alias_hash, alias in aliases.items():
+            if alias_hash == canonical_hash:
+                continue
+            entry = self.CanonicalURL.query.filter_by(alias_hash=alias_hash).first()
+            if entry is None:
+                entry = self.CanonicalURL(alias_hash=alias_hash, alias_url=alias[:500])
+                self.db.session.add(entry)
+            if entry.canonical_url != canonical:
+                entry.canonical_url = canonical[:500]
+                entry.source = source
+                changed = True
+            recorded.append(alias_hash)
+
+        # A canonical URL is never an alias of something else
+        stale = self.CanonicalURL.query.filter_by(alias_hash=canonical_hash).first()
+        if stale:
+            self.db.session.delete(stale)
+            changed = True
+        with self._lock:
+            self._memo.pop(canonical_hash, None)
+
+        if changed:
+            # A concurrent insert of the same alias raises here (IntegrityError);
+            # the memo is only updated once the rows are committed
+            self.db.session.commit()
+        for alias_hash in recorded:
+            self._remember(alias_hash, canonical)
+        return canonical
+
+
 class LocalStorageService:
     """Service for managing local storage cache"""
 
-    def __init__(self, db, LocalStorageCache):
+    def __init__(self, db, LocalStorageCache, canonical_urls=None):
+        """
+        Args:
+            db: SQLAlchemy database
+            LocalStorageCache: Cache model
+            canonical_urls: Optional CanonicalURLService; lookups then
+                resolve through it so every alias shares one cache entry
+        """
         self.db = db
         self.LocalStorageCache = LocalStorageCache
+        self.canonical_urls = canonical_urls
+
+    def _canonical(self, url):
+        return self.canonical_urls.resolve(url) if self.canonical_urls else url
 
     def get_cached_data(self, url):
         """
@@ -107,7 +227,7 @@ class LocalStorageService:
 
         Returns cached data if available and not expired, None otherwise
         """
-        url_hash = WidgetService.url_hash(url)
+        url_hash = WidgetService.url_hash(self._canonical(url))
         cache = self.LocalStorageCache.query.filter_by(url_hash=url_hash).first()
 
         if cache and not cache.is_expired():
@@ -124,6 +244,7 @@ class LocalStorageService:
 
         Implements: "Recipe page 'information' is null" check in process flow
         """
+        url = self._canonical(url)
         url_hash = WidgetService.url_hash(url)
         cache = self.LocalStorageCache.query.filter_by(url_hash=url_hash).first()
 
@@ -146,7 +267,7 @@ class LocalStorageService:
 
         Implements: "Amazon Fresh product data is null" check in process flow
         """
-        url_hash = WidgetService.url_hash(url)
+        url_hash = WidgetService.url_hash(self._canonical(url))
         cache = self.LocalStorageCache.query.filter_by(url_hash=url_hash).first()
 
         if cache:
@@ -157,7 +278,7 @@ class LocalStorageService:
 
     def invalidate_cache(self, url):
         """Invalidate cached data for a URL"""
-        url_hash = WidgetService.url_hash(url)
+        url_hash = WidgetService.url_hash(self._canonical(url))
         cache = self.LocalStorageCache.query.filter_by(url_hash=url_hash).first()
         if cache:
             self.db.session.delete(cache)